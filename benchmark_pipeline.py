@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Pipeline Benchmark
+Times each stage of generate_core_profiles plus validation and the
+single-pass export of the main file and train/test split at several dataset sizes, recording wall time, rows/sec and
+peak RSS per stage, and flags regressions against a saved baseline
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Stages in pipeline order
+STAGES = [
+    'assign_risk_levels',
+    'generate_basic_profiles',
+    'generate_support_system_data',
+    'generate_academic_performance',
+    'generate_attendance_patterns',
+    'generate_behavioral_indicators',
+    'generate_text_fields',
+    'validate_data_quality',
+    'export_dataset'
+]
+
+# Default regression thresholds (ratio to baseline)
+MAX_SLOWDOWN = 1.25
+MAX_MEMORY_GROWTH = 1.25
+
+# Stages faster than this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Fall back to the lifetime peak (kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRssSampler:
+    """Sample RSS in a background thread and keep the peak"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def measure(results, stage, n_rows, fn, *args):
+    """Run one stage, record its timing and memory, and return its result"""
+
+    with PeakRssSampler() as sampler, open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        value = fn(*args)
+        seconds = time.perf_counter() - start
+
+    results[stage] = {
+        'seconds': seconds,
+        'rows_per_sec': n_rows / seconds if seconds > 0 else None,
+        'peak_rss_mb': sampler.peak / 2**20
+    }
+    return value
+
+
+def run_size(n_students, random_state=42):
+    """Benchmark every stage for one dataset size (run in a fresh process)"""
+
+    from synthetic_data_generator import SyntheticStudentDataGenerator
+    from dataset_splits import SplitAssigner
+
+    results = {}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        generator = SyntheticStudentDataGenerator(n_students=n_students, random_state=random_state)
+
+    risk_levels = measure(results, 'assign_risk_levels', n_students, generator.assign_risk_levels)
+    profiles = measure(results, 'generate_basic_profiles', n_students, generator.generate_basic_profiles, risk_levels)
+    for stage in STAGES[2:7]:
+        profiles = measure(results, stage, n_students, getattr(generator, stage), profiles)
+
+    df = measure(results, 'validate_data_quality', n_students, generator.validate_data_quality, profiles)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        measure(results, 'export_dataset', n_students, generator.export_dataset,
+                df, os.path.join(tmp, 'synthetic_student_data.csv'), 'csv', None, SplitAssigner(n_students))
+
+    return results
+
+
+def best_of(runs):
+    """Combine repeated runs, keeping each stage's fastest time and lowest peak"""
+
+    best = {}
+    for stage in runs[0]:
+        fastest = min(runs, key=lambda run: run[stage]['seconds'])[stage]
+        best[stage] = dict(fastest, peak_rss_mb=min(run[stage]['peak_rss_mb'] for run in runs))
+    return best
+
+
+def compare(current, baseline, max_slowdown=MAX_SLOWDOWN, max_memory_growth=MAX_MEMORY_GROWTH):
+    """List regressions of current results against a baseline results file"""
+
+    regressions = []
+    for size, stages in current['results'].items():
+        for stage, metrics in stages.items():
+            reference = baseline.get('results', {}).get(size, {}).get(stage)
+            if not reference:
+                continue
+            if (reference['seconds'] >= MIN_COMPARABLE_SECONDS and
+                    metrics['seconds'] > reference['seconds'] * max_slowdown):
+                regressions.append(f"{stage} @ {size}: {metrics['seconds']:.3f}s vs {reference['seconds']:.3f}s "
+                                   f"(>{max_slowdown:.2f}x slower)")
+            if metrics['peak_rss_mb'] > reference['peak_rss_mb'] * max_memory_growth:
+                regressions.append(f"{stage} @ {size}: {metrics['peak_rss_mb']:.0f} MB vs "
+                                   f"{reference['peak_rss_mb']:.0f} MB peak RSS (>{max_memory_growth:.2f}x)")
+    return regressions
+
+
+def print_results(results):
+    for size, stages in results.items():
+        print(f"\n=== {int(size):,} STUDENTS ===")
+        print(f"  {'stage':<32} {'seconds':>9} {'rows/sec':>13} {'peak RSS MB':>12}")
+        for stage, metrics in stages.items():
+            rate = f"{metrics['rows_per_sec']:,.0f}" if metrics['rows_per_sec'] else '-'
+            print(f"  {stage:<32} {metrics['seconds']:>9.3f} {rate:>13} {metrics['peak_rss_mb']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the synthetic data pipeline stage by stage")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="dataset sizes to benchmark (default: 1k 10k 100k 1M)")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="runs per size; the best time and peak RSS of each stage are kept")
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help="results file to write (default: benchmark_results.json)")
+    parser.add_argument('--baseline', default=None,
+                        help="earlier results file to compare against; exits 1 on regression")
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN,
+                        help=f"allowed wall time ratio to baseline (default: {MAX_SLOWDOWN})")
+    parser.add_argument('--max-memory-growth', type=float, default=MAX_MEMORY_GROWTH,
+                        help=f"allowed peak RSS ratio to baseline (default: {MAX_MEMORY_GROWTH})")
+    args = parser.parse_args()
+
+    print("=== SYNTHETIC DATA PIPELINE BENCHMARK ===")
+
+    # Each size runs in a fresh process so peak RSS is not inherited
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for size in args.sizes:
+        print(f"✓ Benchmarking {size:,} students...")
+        runs = []
+        for _ in range(args.repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(run_size, size).result())
+        results[str(size)] = best_of(runs)
+
+    import numpy as np
+    import pandas as pd
+    current = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+
+    print_results(results)
+
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.max_slowdown, args.max_memory_growth)
+        if regressions:
+            print(f"\n! {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"✓ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Binary Cache
+Memory-mapped binary copy of a student dataset: every numeric column as a
+.npy file and every categorical or text column as a .npy of codes plus its
+dictionary in the manifest. Loading maps the files instead of parsing text,
+so a 10M-row dataset opens in milliseconds and every process that maps it
+shares one physical copy through the page cache. Loaders first check the
+cache against its source file's stat stamp, and only on a stamp mismatch
+against the source's content hash (about a second per GB).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+import numpy as np
+import pandas as pd
+
+CACHE_SUFFIX = '.npcache'
+MANIFEST_NAME = 'manifest.json'
+CACHE_VERSION = 1
+
+# Fixed .npy header size, so chunks can be appended before the row count is
+# known and the header rewritten in place on close (a multiple of 64 keeps
+# the data aligned)
+HEADER_BYTES = 128
+CODE_DTYPE = np.int32
+
+
+def binary_cache_path(filename):
+    """The cache directory kept next to a dataset file"""
+    return os.path.splitext(filename)[0] + CACHE_SUFFIX
+
+
+def file_sha256(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stat_stamp(filename):
+    """Size, modification and change times and inode: any rewrite changes at least one"""
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'ctime_ns': stat.st_ctime_ns, 'ino': stat.st_ino}
+
+
+def source_stamp(filename):
+    return {'path': os.path.basename(filename), **stat_stamp(filename), 'sha256': file_sha256(filename)}
+
+
+def write_manifest(path, manifest):
+    tmp_path = os.path.join(path, f'{MANIFEST_NAME}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, default=str)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+
+
+def code_dtype(n_categories):
+    """Narrowest code dtype, as pandas picks it, so Categoricals wrap the codes without copying"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def npy_header(dtype, rows):
+    """NPY 1.0 header for a 1-d array, space-padded to HEADER_BYTES"""
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (rows,)})
+    header = header.ljust(HEADER_BYTES - 11) + '\n'
+    return np.lib.format.magic(1, 0) + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class NpyAppender:
+    """A .npy file of one 1-d array, appended to chunk by chunk"""
+
+    def __init__(self, filename, dtype):
+        self.filename = filename
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self.file = open(filename, 'wb')
+        self.file.write(npy_header(self.dtype, 0))
+
+    def write(self, values):
+        np.ascontiguousarray(values, dtype=self.dtype).tofile(self.file)
+        self.rows += len(values)
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(npy_header(self.dtype, self.rows))
+        self.file.close()
+
+
+class BinaryCacheWriter:
+    """Append DataFrame chunks to a binary cache directory
+
+    Columns with a NumPy dtype are stored as is; nullable integer and
+    boolean columns as values plus a mask; categorical and text columns as
+    codes into one dictionary that grows as chunks bring new values (pass
+    category_domains to fix it up front). The manifest is written last, on
+    close, so a cache without one is incomplete and never loaded. Pass the
+    dataset file the cache mirrors as source; loaders then skip the cache
+    once that file changes.
+    """
+
+    def __init__(self, path, category_domains=None, source=None):
+        self.path = path
+        self.category_domains = category_domains or {}
+        self.source = source
+        self.rows = 0
+        self.columns = None
+
+    def _open(self, df):
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+        self.columns = []
+        for i, name in enumerate(df.columns):
+            dtype = df[name].dtype
+            entry = {'name': name, 'file': f'c{i:03d}.npy'}
+            if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+                entry.update(kind='array', writer=NpyAppender(self._file(entry['file']), dtype))
+            elif isinstance(df[name].array, pd.arrays.IntegerArray | pd.arrays.FloatingArray | pd.arrays.BooleanArray):
+                entry.update(kind='masked', dtype=str(dtype), mask=f'c{i:03d}.mask.npy',
+                             writer=NpyAppender(self._file(entry['file']), df[name].array._data.dtype),
+                             mask_writer=NpyAppender(self._file(f'c{i:03d}.mask.npy'), bool))
+            else:
+                categories = list(self.category_domains.get(name, []))
+                dtype = code_dtype(len(categories)) if name in self.category_domains else CODE_DTYPE
+                entry.update(kind='category', categories=categories, positions={v: c for c, v in enumerate(categories)},
+                             writer=NpyAppender(self._file(entry['file']), dtype))
+            self.columns.append(entry)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _codes(self, entry, values):
+        """Codes of values in the column's dictionary, adding unseen values"""
+
+        codes, uniques = pd.factorize(values)
+        positions = entry['positions']
+        for value in uniques:
+            if value not in positions:
+                if entry['name'] in self.category_domains:
+                    raise ValueError(f"Column '{entry['name']}' has values outside its category domain: {value!r}")
+                positions[value] = len(entry['categories'])
+                entry['categories'].append(value)
+        lookup = np.array([positions[value] for value in uniques] + [-1], dtype=np.int64)
+        return lookup[codes]
+
+    def write(self, df):
+        if self.columns is None:
+            self._open(df)
+        if [entry['name'] for entry in self.columns] != list(df.columns):
+            raise ValueError("Chunk columns differ from the first chunk's")
+        for entry in self.columns:
+            column = df[entry['name']]
+            if entry['kind'] == 'array':
+                entry['writer'].write(column.to_numpy())
+            elif entry['kind'] == 'masked':
+                entry['writer'].write(column.array._data)
+                entry['mask_writer'].write(column.array._mask)
+            else:
+                entry['writer'].write(self._codes(entry, column.array))
+        self.rows += len(df)
+
+    def close(self):
+        if self.columns is None:
+            return
+        for entry in self.columns:
+            entry['writer'].close()
+            if entry['kind'] == 'masked':
+                entry['mask_writer'].close()
+            elif entry['kind'] == 'category' and entry['writer'].dtype != code_dtype(len(entry['categories'])):
+                # Narrow the codes now the dictionary is final
+                filename = self._file(entry['file'])
+                codes = np.load(filename, mmap_mode='r').astype(code_dtype(len(entry['categories'])))
+                np.save(filename, codes)
+
+        manifest = {
+            'version': CACHE_VERSION,
+            'rows': self.rows,
+            'source': source_stamp(self.source) if self.source else None,
+            'written_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'columns': [{key: value for key, value in entry.items()
+                         if key not in ('writer', 'mask_writer', 'positions')} for entry in self.columns]
+        }
+        write_manifest(self.path, manifest)
+        self.columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BinaryCache:
+    """A written cache, opened read-only through memory maps"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest['version'] != CACHE_VERSION:
+            raise ValueError(f"{path} is a version {self.manifest['version']} cache, expected {CACHE_VERSION}")
+        self.entries = {entry['name']: entry for entry in self.manifest['columns']}
+
+    @property
+    def rows(self):
+        return self.manifest['rows']
+
+    @property
+    def columns(self):
+        return list(self.entries)
+
+    def is_fresh(self, source):
+        """True if the cache was written from source as it is now
+
+        An unchanged stat stamp (which a rewrite with preserved times still
+        changes, through ctime or the inode) answers without reading the
+        source. Otherwise the source's content hash decides; if it still
+        matches, e.g. after a touch or a copy, the stamp is refreshed so
+        the next load skips the hash again.
+        """
+        stamp = self.manifest['source']
+        if stamp is None or 'sha256' not in stamp or not os.path.exists(source):
+            return False
+        current = stat_stamp(source)
+        if all(stamp.get(key) == value for key, value in current.items()):
+            return True
+        if current['size'] != stamp['size'] or file_sha256(source) != stamp['sha256']:
+            return False
+        stamp.update(current)
+        try:
+            write_manifest(self.path, self.manifest)
+        except OSError:
+            pass  # a read-only cache still loads; it just rehashes next time
+        return True
+
+    def array(self, column):
+        """Memory-mapped values (codes, for categorical columns) of one column"""
+        return np.load(os.path.join(self.path, self.entries[column]['file']), mmap_mode='r')
+
+    def categories(self, column):
+        return self.entries[column].get('categories')
+
+    def series_values(self, column):
+        """Zero-copy pandas array over one column's memory maps"""
+
+        entry = self.entries[column]
+        values = self.array(column)
+        if entry['kind'] == 'category':
+            return pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(entry['categories']), validate=False)
+        if entry['kind'] == 'masked':
+            mask = np.load(os.path.join(self.path, entry['mask']), mmap_mode='r')
+            array_type = pd.array([], dtype=entry['dtype']).__class__
+            return array_type(values, mask, copy=False)
+        return values
+
+    def frame(self, columns=None):
+        """The cached dataset as a DataFrame backed by the memory maps"""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({column: self.series_values(column) for column in columns}, copy=False)
+
+
+def fresh_binary_cache(filename):
+    """The cache next to filename if it mirrors the file as it is now, else None"""
+
+    path = filename if filename.endswith(CACHE_SUFFIX) else binary_cache_path(filename)
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        return None
+    cache = BinaryCache(path)
+    if path != filename and not cache.is_fresh(filename):
+        return None
+    return cache
+
+
+def load_binary_cache(path, columns=None):
+    """Open a cache directory as a zero-copy DataFrame"""
+    return BinaryCache(path).frame(columns)
+
+
+def build_binary_cache(filename, chunk_size=500000):
+    """Write the cache for an existing CSV, Parquet or Feather dataset"""
+
+    from columnar_export import read_dataset_chunks
+
+    with BinaryCacheWriter(binary_cache_path(filename), source=filename) as writer:
+        for chunk in read_dataset_chunks(filename, chunk_size, use_cache=False):
+            writer.write(chunk)
+    return writer.rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build or inspect memory-mapped binary caches of student datasets")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="write the cache next to each dataset file")
+    build.add_argument('datasets', nargs='+', help="CSV, Parquet or Feather files, e.g. the cleaning step's output")
+    build.add_argument('--chunk-size', type=int, default=500000)
+
+    info = commands.add_parser('info', help="show a dataset's cache and time a full load")
+    info.add_argument('dataset', help="dataset file or .npcache directory")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == 'build':
+        for dataset in args.datasets:
+            start = time.perf_counter()
+            rows = build_binary_cache(dataset, args.chunk_size)
+            print(f"✓ Cached {rows} rows of {dataset} → {binary_cache_path(dataset)} "
+                  f"in {time.perf_counter() - start:.2f}s")
+    else:
+        cache = fresh_binary_cache(args.dataset)
+        if cache is None:
+            print(f"! No up-to-date cache for {args.dataset}")
+        else:
+            start = time.perf_counter()
+            df = cache.frame()
+            print(f"✓ {cache.path}: {cache.rows} rows × {len(cache.columns)} columns, "
+                  f"opened in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Column Profiler
+Single-pass, out-of-core profile of a student dataset: value counts,
+distinct and missing counts for categorical columns, running moments for
+numeric columns, updated chunk by chunk and mergeable across partitions.
+In approximate mode the per-value state is replaced by fixed-size sketches
+(see sketches), so memory no longer grows with the number of distinct values
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from columnar_export import read_dataset_chunks
+from sketches import CountMinTopK, HyperLogLog, KllSketch
+from streaming_validation import RunningMoments, add_counts
+
+# Attendance bins reported for each attendance column (right-closed, as pd.cut)
+ATTENDANCE_BINS = [0, 50, 70, 85, 100]
+ATTENDANCE_LABELS = ['<50%', '50-70%', '70-85%', '85-100%']
+
+# Quantiles reported for numeric columns in approximate mode
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# Default error bounds for approximate mode
+SKETCH_DEFAULTS = {'distinct_error': 0.01, 'rank_error': 0.01, 'frequency_error': 0.001, 'top_k': 50}
+
+
+class ColumnProfiler:
+    """Running statistics for every column of a dataset
+
+    A column's kind is fixed by the first chunk it appears in: numeric
+    dtypes get running moments, everything else value counts. Missing
+    values are counted for both.
+
+    With approximate=True categorical columns keep a HyperLogLog distinct
+    count and Count-Min top_k frequencies, and numeric columns add a KLL
+    sketch for quantiles and attendance bins. Error bounds are taken from
+    SKETCH_DEFAULTS unless overridden; profilers are only mergeable with
+    profilers built with the same settings.
+    """
+
+    def __init__(self, approximate=False, **sketch_options):
+        unknown = set(sketch_options) - set(SKETCH_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown sketch options: {sorted(unknown)}")
+        self.approximate = approximate
+        self.sketch_options = {**SKETCH_DEFAULTS, **sketch_options}
+        self.rows = 0
+        self.kinds = {}
+        self.dtypes = {}
+        self.missing = {}
+        self.counts = {}
+        self.moments = {}
+        self.attendance_bins = {}
+        self.distinct = {}
+        self.frequencies = {}
+        self.quantiles = {}
+
+    def _distinct_sketch(self, column):
+        if column not in self.distinct:
+            self.distinct[column] = HyperLogLog(self.sketch_options['distinct_error'])
+        return self.distinct[column]
+
+    def _frequency_sketch(self, column):
+        if column not in self.frequencies:
+            self.frequencies[column] = CountMinTopK(self.sketch_options['frequency_error'],
+                                                    top_k=self.sketch_options['top_k'])
+        return self.frequencies[column]
+
+    def _quantile_sketch(self, column):
+        if column not in self.quantiles:
+            self.quantiles[column] = KllSketch(self.sketch_options['rank_error'])
+        return self.quantiles[column]
+
+    def update(self, df):
+        self.rows += len(df)
+
+        for column in df.columns:
+            values = df[column]
+            if column not in self.kinds:
+                numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+                self.kinds[column] = 'numeric' if numeric else 'categorical'
+                self.dtypes[column] = str(values.dtype)
+                self.missing[column] = 0
+
+            missing = int(values.isna().sum())
+            self.missing[column] += missing
+
+            if self.kinds[column] == 'numeric':
+                numbers = values.to_numpy(dtype=float, na_value=np.nan)
+                self.moments.setdefault(column, RunningMoments()).update(numbers)
+                if self.approximate:
+                    self._quantile_sketch(column).update(numbers)
+                elif column.startswith('attendance_'):
+                    bins = pd.cut(values, bins=ATTENDANCE_BINS, labels=ATTENDANCE_LABELS).value_counts(sort=False)
+                    add_counts(self.attendance_bins.setdefault(column, {}), bins)
+            else:
+                counts = values.value_counts()
+                counts = counts[counts > 0]
+                if self.approximate:
+                    # Only the chunk's distinct values are hashed
+                    self._distinct_sketch(column).update(counts.index)
+                    self._frequency_sketch(column).update_counts(counts.index, counts.to_numpy())
+                else:
+                    add_counts(self.counts.setdefault(column, {}), counts)
+
+        return self
+
+    def merge(self, other):
+        if (self.approximate, self.sketch_options) != (other.approximate, other.sketch_options):
+            raise ValueError("Profilers built with different sketch settings cannot be merged")
+        self.rows += other.rows
+        for column, kind in other.kinds.items():
+            self.kinds.setdefault(column, kind)
+            self.dtypes.setdefault(column, other.dtypes[column])
+            self.missing[column] = self.missing.get(column, 0) + other.missing[column]
+        for column, counts in other.counts.items():
+            add_counts(self.counts.setdefault(column, {}), counts)
+        for column, moments in other.moments.items():
+            self.moments.setdefault(column, RunningMoments()).merge(moments)
+        for column, bins in other.attendance_bins.items():
+            add_counts(self.attendance_bins.setdefault(column, {}), bins)
+        for column, sketch in other.distinct.items():
+            self._distinct_sketch(column).merge(sketch)
+        for column, sketch in other.frequencies.items():
+            self._frequency_sketch(column).merge(sketch)
+        for column, sketch in other.quantiles.items():
+            self._quantile_sketch(column).merge(sketch)
+        return self
+
+    def report(self):
+        """Machine-readable profile of everything seen so far"""
+
+        columns = {}
+        for column, kind in self.kinds.items():
+            profile = {'kind': kind, 'dtype': self.dtypes[column], 'missing': self.missing[column],
+                       'non_null': self.rows - self.missing[column]}
+            if kind == 'numeric':
+                moments = self.moments.get(column, RunningMoments()).to_dict()
+                profile.update({key: moments[key] for key in ('mean', 'std', 'min', 'max')})
+                if column in self.quantiles:
+                    sketch = self.quantiles[column]
+                    profile['quantiles'] = {f'p{round(q * 100):02d}': sketch.quantile(q) for q in QUANTILES}
+                    if column.startswith('attendance_'):
+                        profile['bins'] = dict(zip(ATTENDANCE_LABELS, sketch.bin_counts(ATTENDANCE_BINS)))
+                elif column in self.attendance_bins:
+                    profile['bins'] = {label: self.attendance_bins[column].get(label, 0) for label in ATTENDANCE_LABELS}
+            elif self.approximate:
+                profile['unique'] = round(self.distinct[column].estimate()) if column in self.distinct else 0
+                profile['counts'] = self.frequencies[column].top() if column in self.frequencies else {}
+            else:
+                counts = self.counts.get(column, {})
+                profile['unique'] = len(counts)
+                profile['counts'] = dict(sorted(counts.items(), key=lambda item: -item[1]))
+            columns[column] = profile
+        report = {'rows': self.rows, 'columns': columns}
+        if self.approximate:
+            report['approximate'] = dict(self.sketch_options)
+        return report
+
+    def write_json(self, path):
+        report = self.report()
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        return report
+
+
+def profile_dataset(filename, chunk_size=100000, approximate=False, **sketch_options):
+    """Profile a CSV, Parquet or Feather file in one chunked pass"""
+
+    profiler = ColumnProfiler(approximate, **sketch_options)
+    for chunk in read_dataset_chunks(filename, chunk_size):
+        profiler.update(chunk)
+    return profiler
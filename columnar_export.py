@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Columnar Export
+Parquet and Feather (Arrow IPC) output for the synthetic student dataset,
+with the dictionary-encoded categoricals and compact numeric dtypes of
+student_schema
+"""
+
+import os
+import pandas as pd
+from binary_cache import CACHE_SUFFIX, fresh_binary_cache
+from student_schema import apply_schema, csv_dtypes, text_frame
+
+# File extension per supported output format
+FILE_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+# Codec used when no compression is requested explicitly
+DEFAULT_COMPRESSION = {'parquet': 'snappy', 'feather': 'lz4'}
+
+
+def dataset_path(filename, file_format):
+    """Swap the extension of filename for the one matching file_format"""
+    return os.path.splitext(filename)[0] + FILE_EXTENSIONS[file_format]
+
+
+def portable_schema(df):
+    """Arrow schema for df that later chunks of the same table still fit
+
+    Chunks read without fixed category domains can differ in dictionary
+    size and in which columns are entirely empty, so dictionaries are
+    widened to string values with int32 indices and all-null columns typed
+    as strings.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+class ColumnarWriter:
+    """Append DataFrame chunks to a single Parquet or Feather file"""
+
+    def __init__(self, filename, file_format='parquet', compression=None):
+        if file_format not in DEFAULT_COMPRESSION:
+            raise ValueError(f"Unsupported columnar format: {file_format}")
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(f"Writing {file_format} output requires pyarrow (pip install pyarrow)")
+
+        self.filename = filename
+        self.file_format = file_format
+        self.compression = compression or DEFAULT_COMPRESSION[file_format]
+        if self.compression == 'none':
+            self.compression = None
+        self.schema = None
+        self.rows = 0
+        self._writer = None
+
+    def _open(self, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = schema
+        if self.file_format == 'parquet':
+            self._writer = pq.ParquetWriter(self.filename, schema, compression=self.compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self.filename, schema, options=options)
+
+    def to_table(self, df):
+        """Convert a chunk to an Arrow table in this file's schema"""
+        import pyarrow as pa
+
+        schema = self.schema or pa.Schema.from_pandas(df, preserve_index=False)
+        return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    def write(self, df):
+        self.write_table(self.to_table(df))
+
+    def write_table(self, table):
+        if self._writer is None:
+            self._open(table.schema)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvWriter:
+    """Append DataFrame chunks to a CSV file, writing the header once"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.rows = 0
+        self._started = False
+
+    def write(self, df):
+        text_frame(df).to_csv(self.filename, index=False, mode='a' if self._started else 'w', header=not self._started)
+        self._started = True
+        self.rows += len(df)
+
+    def write_lines(self, header, lines):
+        """Append already rendered CSV rows, writing header first if needed"""
+        with open(self.filename, 'a' if self._started else 'w') as f:
+            if not self._started:
+                f.write(header + '\n')
+            if len(lines):
+                f.write('\n'.join(lines) + '\n')
+        self._started = True
+        self.rows += len(lines)
+
+    def close(self):
+        if not self._started:
+            # Nothing written: leave an empty file rather than a stale one
+            open(self.filename, 'w').close()
+            self._started = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_dataset_writer(filename, file_format='csv', compression=None):
+    """Open a chunk writer for filename in the given output format"""
+    filename = dataset_path(filename, file_format)
+    if file_format == 'csv':
+        return CsvWriter(filename)
+    return ColumnarWriter(filename, file_format, compression)
+
+
+def read_dataset_chunks(filename, chunk_size, use_cache=True):
+    """Yield a CSV, Parquet or Feather dataset as DataFrames of ~chunk_size rows
+
+    CSV chunks are parsed into the student_schema dtypes; columnar files
+    already store them. A binary cache directory, or a file with an
+    up-to-date cache next to it (unless use_cache is False), is read as
+    slices of its memory maps instead.
+    """
+
+    cache = fresh_binary_cache(filename) if use_cache or filename.endswith(CACHE_SUFFIX) else None
+    if cache is not None:
+        df = cache.frame()
+        for start in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+    elif filename.endswith('.csv'):
+        columns = pd.read_csv(filename, nrows=0).columns
+        for chunk in pd.read_csv(filename, chunksize=chunk_size, dtype=csv_dtypes(columns)):
+            yield apply_schema(chunk)
+    elif filename.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(filename).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif filename.endswith('.feather'):
+        import pyarrow as pa
+        with pa.memory_map(filename) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+    else:
+        raise ValueError(f"Unsupported dataset file: {filename}")
+
+
+def read_dataset(filename):
+    """A whole dataset as one DataFrame, zero-copy when it has a binary cache"""
+
+    cache = fresh_binary_cache(filename)
+    if cache is not None:
+        return cache.frame()
+    return pd.concat(read_dataset_chunks(filename, 500000, use_cache=False), ignore_index=True)
@@ -4,81 +4,143 @@ Student Data Analysis Script
 Analyzes original dataset to extract patterns for synthetic data generation
 """
 
-import pandas as pd
-import numpy as np
-from collections import Counter
-
-def analyze_original_data():
-    """Analyze the original student dataset to understand patterns"""
-    
-    # Load the original dataset
-    df = pd.read_csv('file_converter/output_csv/student_data.csv')
-    
+import argparse
+from column_profiler import ATTENDANCE_LABELS, SKETCH_DEFAULTS, profile_dataset
+from columnar_export import read_dataset
+
+ORIGINAL_DATA_PATH = 'file_converter/output_csv/student_data.csv'
+
+def analyze_original_data(path=ORIGINAL_DATA_PATH, chunk_size=100000, report_path=None,
+                          approximate=False, **sketch_options):
+    """Analyze the original student dataset to understand patterns
+
+    Prints the profile summary (see profile_original_data) and returns the
+    dataset itself, loaded with the compact student_schema dtypes.
+    """
+
+    profile_original_data(path, chunk_size, report_path, approximate, **sketch_options)
+    return read_dataset(path)
+
+def profile_original_data(path=ORIGINAL_DATA_PATH, chunk_size=100000, report_path=None,
+                          approximate=False, **sketch_options):
+    """Print the profile summary of a dataset and return the profile report
+
+    The file is profiled in one chunked pass (see column_profiler), so it
+    never has to fit in memory; the printed summary and the returned report
+    come from the merged statistics. approximate=True profiles with sketches
+    instead of exact value counts (error bounds via sketch_options).
+    """
+
+    # Profile the original dataset
+    profiler = profile_dataset(path, chunk_size, approximate, **sketch_options)
+    report = profiler.report()
+    columns = report['columns']
+    total = report['rows']
+
     print("=== ORIGINAL DATASET ANALYSIS ===")
-    print(f"Dataset shape: {df.shape}")
-    print(f"Total students: {len(df)}")
-    
+    print(f"Dataset shape: ({total}, {len(columns)})")
+    print(f"Total students: {total}")
+    if approximate:
+        bounds = report['approximate']
+        print(f"Approximate mode: distinct ±{bounds['distinct_error']:.1%}, quantile rank ±{bounds['rank_error']:.1%}, "
+              f"frequencies +{bounds['frequency_error']:.2%} of rows (top {bounds['top_k']} values)")
+
     # Basic info
     print("\n=== COLUMN INFORMATION ===")
-    print(df.info())
-    
+    print(f" {'#':>3}  {'Column':<30} {'Non-Null Count':<16} Dtype")
+    for i, (col, profile) in enumerate(columns.items()):
+        print(f" {i:>3}  {col:<30} {profile['non_null']:>6} non-null     {profile['dtype']}")
+
     print("\n=== CATEGORICAL VALUES ANALYSIS ===")
-    
+
     categorical_columns = [
         'course', 'student_cohort', 'academic_status', 'failed_subjects',
         'study_skills(attended)', 'referral', 'pp_meeting', 'self_assessment',
         'readiness_assessment_results', 'follow_up', 'follow_up_type',
         'learn_jcu_issues_1', 'lecturer_referral_1',
-        'learn_jcu_issues_2', 'lecturer_referral_2', 
+        'learn_jcu_issues_2', 'lecturer_referral_2',
         'learn_jcu_issues_3', 'lecturer_referral_3'
     ]
-    
+
     for col in categorical_columns:
-        if col in df.columns:
+        if col in columns:
+            profile = columns[col]
             print(f"\n{col}:")
-            value_counts = df[col].value_counts(dropna=False)
-            print(value_counts)
-            print(f"  Unique values: {df[col].nunique()}")
-            print(f"  Missing values: {df[col].isnull().sum()}")
-    
+            for value, count in profile.get('counts', {}).items():
+                print(f"  {value}: {count}")
+            if profile['missing']:
+                print(f"  NaN: {profile['missing']}")
+            print(f"  Unique values: {profile.get('unique', 0)}")
+            print(f"  Missing values: {profile['missing']}")
+
     print("\n=== NUMERICAL STATISTICS ===")
-    
+
     numerical_columns = [
         'subject_1_assess_1', 'subject_1_assess_2', 'subject_1_assess_3', 'subject_1_assess_4',
-        'attendance_1', 'subject_2_assess_1', 'subject_2_assess_2', 'subject_2_assess_3', 
-        'subject_2_assess_4', 'attendance_2', 'subject_3_assess_1', 'subject_3_assess_2', 
+        'attendance_1', 'subject_2_assess_1', 'subject_2_assess_2', 'subject_2_assess_3',
+        'subject_2_assess_4', 'attendance_2', 'subject_3_assess_1', 'subject_3_assess_2',
         'subject_3_assess_3', 'attendance_3'
     ]
-    
+
+    def fmt(value):
+        return f"{value:.2f}" if value is not None else "nan"
+
     for col in numerical_columns:
-        if col in df.columns:
+        if col in columns and columns[col]['kind'] == 'numeric':
+            profile = columns[col]
             print(f"\n{col}:")
-            print(f"  Mean: {df[col].mean():.2f}")
-            print(f"  Std: {df[col].std():.2f}")
-            print(f"  Min: {df[col].min():.2f}")
-            print(f"  Max: {df[col].max():.2f}")
-            print(f"  Missing: {df[col].isnull().sum()}")
-    
+            print(f"  Mean: {fmt(profile['mean'])}")
+            print(f"  Std: {fmt(profile['std'])}")
+            print(f"  Min: {fmt(profile['min'])}")
+            print(f"  Max: {fmt(profile['max'])}")
+            for name, value in profile.get('quantiles', {}).items():
+                print(f"  {name.upper()}: {fmt(value)}")
+            print(f"  Missing: {profile['missing']}")
+
     print("\n=== RISK DISTRIBUTION ANALYSIS ===")
-    
+
     # Analyze academic status distribution
-    if 'academic_status' in df.columns:
-        status_counts = df['academic_status'].value_counts()
-        total = len(df)
+    if 'academic_status' in columns:
         print("Academic Status Distribution:")
-        for status, count in status_counts.items():
+        for status, count in columns['academic_status'].get('counts', {}).items():
             percentage = (count / total) * 100
             print(f"  {status}: {count} ({percentage:.1f}%)")
-    
+
     # Analyze attendance patterns
     print("\n=== ATTENDANCE PATTERNS ===")
-    if 'attendance_1' in df.columns:
-        attendance_ranges = pd.cut(df['attendance_1'], bins=[0, 50, 70, 85, 100], 
-                                 labels=['<50%', '50-70%', '70-85%', '85-100%'])
+    if 'bins' in columns.get('attendance_1', {}):
         print("Attendance_1 Distribution:")
-        print(attendance_ranges.value_counts())
-    
-    return df
+        for label in ATTENDANCE_LABELS:
+            print(f"  {label}: {columns['attendance_1']['bins'][label]}")
+
+    if report_path:
+        profiler.write_json(report_path)
+        print(f"\n✓ Profile report written to {report_path}")
+
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Profile the original student dataset in one chunked pass")
+    parser.add_argument('path', nargs='?', default=ORIGINAL_DATA_PATH,
+                        help=f"CSV, Parquet or Feather file to analyze (default: {ORIGINAL_DATA_PATH})")
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help="rows read per chunk (default: 100000)")
+    parser.add_argument('--report', default=None, metavar='PATH',
+                        help="also write the full profile as JSON to PATH")
+    parser.add_argument('--approximate', action='store_true',
+                        help="profile with constant-memory sketches instead of exact counts")
+    parser.add_argument('--distinct-error', type=float, default=SKETCH_DEFAULTS['distinct_error'],
+                        help="relative error of approximate distinct counts (default: %(default)s)")
+    parser.add_argument('--rank-error', type=float, default=SKETCH_DEFAULTS['rank_error'],
+                        help="rank error of approximate quantiles and attendance bins (default: %(default)s)")
+    parser.add_argument('--frequency-error', type=float, default=SKETCH_DEFAULTS['frequency_error'],
+                        help="overcount bound of approximate frequencies, as a fraction of rows (default: %(default)s)")
+    parser.add_argument('--top-k', type=int, default=SKETCH_DEFAULTS['top_k'],
+                        help="most frequent values kept per categorical column (default: %(default)s)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    df = analyze_original_data()
\ No newline at end of file
+    args = parse_args()
+    report = profile_original_data(args.path, args.chunk_size, args.report, args.approximate,
+                                   distinct_error=args.distinct_error, rank_error=args.rank_error,
+                                   frequency_error=args.frequency_error, top_k=args.top_k)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Dataset Splits
+Train/test routing and cross-validation fold manifests for the synthetic
+student dataset, written alongside the main file in a single pass
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from binary_cache import BinaryCacheWriter, binary_cache_path
+from columnar_export import CsvWriter, open_dataset_writer
+from student_schema import text_frame
+
+# Supported ways of choosing the training rows
+SPLIT_STRATEGIES = ['positional', 'stratified']
+
+
+class SplitAssigner:
+    """Assign rows to train/test and to cross-validation folds, chunk by chunk
+
+    positional keeps the first int(n_total * train_fraction) rows for
+    training, as the original 80/20 cut did. stratified deals the rows of
+    each stratify_column value systematically, so after k rows of a stratum
+    floor(k * train_fraction) of them are in the training set; this needs no
+    totals up front and stays exact in streaming mode.
+
+    With n_folds > 1 the training rows are also dealt round-robin into folds
+    (within each stratum when stratified); test rows get no fold.
+    """
+
+    def __init__(self, n_total, train_fraction=0.8, strategy='positional', stratify_column='academic_status',
+                 n_folds=0):
+        if strategy not in SPLIT_STRATEGIES:
+            raise ValueError(f"Unknown split strategy: {strategy}")
+        self.n_total = n_total
+        self.train_fraction = train_fraction
+        self.strategy = strategy
+        self.stratify_column = stratify_column
+        self.n_folds = n_folds
+        self.train_size = int(n_total * train_fraction)
+        self.rows = 0
+        self.seen = {}
+        self.train_seen = {}
+
+    def assign(self, df):
+        """Return (train mask, fold per row with -1 for test rows) for the next chunk"""
+
+        n = len(df)
+        train = np.empty(n, dtype=bool)
+        folds = np.full(n, -1, dtype=np.int16)
+
+        if self.strategy == 'positional':
+            groups = [(None, np.ones(n, dtype=bool))]
+        else:
+            codes, values = pd.factorize(df[self.stratify_column], use_na_sentinel=False)
+            groups = [(value, codes == code) for code, value in enumerate(values)]
+
+        for key, mask in groups:
+            count = int(mask.sum())
+            position = self.seen.get(key, 0) + np.arange(1, count + 1)
+            if self.strategy == 'positional':
+                in_train = position <= self.train_size
+            else:
+                in_train = np.floor(position * self.train_fraction) > np.floor((position - 1) * self.train_fraction)
+            train[mask] = in_train
+
+            if self.n_folds > 1:
+                train_rank = self.train_seen.get(key, 0) + np.cumsum(in_train) - 1
+                folds[mask] = np.where(in_train, train_rank % self.n_folds, -1)
+
+            self.seen[key] = self.seen.get(key, 0) + count
+            self.train_seen[key] = self.train_seen.get(key, 0) + int(in_train.sum())
+
+        self.rows += n
+        return train, folds
+
+
+class SplitDatasetWriter:
+    """Write the main dataset, its train/test splits and a fold manifest in one pass
+
+    Each chunk is rendered once (CSV text or an Arrow table) and the rows are
+    routed to every sink from that, instead of re-serialising train and test
+    from the finished main file.
+
+    With binary_cache each of the three data files also gets a memory-mapped
+    binary cache (see binary_cache), whose categorical dictionaries are
+    category_domains when given.
+    """
+
+    def __init__(self, filename, assigner, file_format='csv', compression=None, binary_cache=False,
+                 category_domains=None):
+        stem = os.path.splitext(filename)[0]
+        self.assigner = assigner
+        self.file_format = file_format
+        self.main = open_dataset_writer(filename, file_format, compression)
+        self.train = open_dataset_writer(f'{stem}_train.csv', file_format, compression)
+        self.test = open_dataset_writer(f'{stem}_test.csv', file_format, compression)
+        self.manifest = CsvWriter(f'{stem}_folds.csv') if assigner.n_folds > 1 else None
+        self.filenames = [writer.filename for writer in (self.main, self.train, self.test, self.manifest) if writer]
+        self.caches = [
+            BinaryCacheWriter(binary_cache_path(writer.filename), category_domains, source=writer.filename)
+            for writer in (self.main, self.train, self.test)
+        ] if binary_cache else []
+        self.fold_counts = {}
+
+    @property
+    def rows(self):
+        return self.main.rows
+
+    def write(self, df):
+        train, folds = self.assigner.assign(df)
+        start = self.main.rows
+
+        if self.file_format == 'csv':
+            self._write_csv(df, train)
+        else:
+            self._write_table(df, train)
+
+        for cache, rows in zip(self.caches, (slice(None), train, ~train)):
+            cache.write(df[rows])
+
+        if self.manifest is not None:
+            self.manifest.write(pd.DataFrame({
+                'row': np.arange(start, start + len(df)),
+                'student_id': df['student_id'].to_numpy(),
+                'split': np.where(train, 'train', 'test'),
+                'fold': pd.Series(folds, dtype='Int16').where(train)
+            }))
+            for fold, count in zip(*np.unique(folds[train], return_counts=True)):
+                self.fold_counts[int(fold)] = self.fold_counts.get(int(fold), 0) + int(count)
+
+    def _write_csv(self, df, train):
+        header, _, body = text_frame(df).to_csv(index=False, lineterminator='\n').partition('\n')
+        if body.count('\n') != len(df):
+            # A quoted field spans lines, so rows cannot be split on newlines
+            self.main.write(df)
+            self.train.write(df[train])
+            self.test.write(df[~train])
+            return
+        lines = np.array(body.split('\n')[:-1], dtype=object)
+        self.main.write_lines(header, lines)
+        self.train.write_lines(header, lines[train])
+        self.test.write_lines(header, lines[~train])
+
+    def _write_table(self, df, train):
+        import pyarrow as pa
+
+        table = self.main.to_table(df)
+        self.main.write_table(table)
+        for writer, mask in ((self.train, train), (self.test, ~train)):
+            if mask.any():
+                writer.write_table(table.filter(pa.array(mask)))
+
+    def summary(self):
+        summary = {
+            'strategy': self.assigner.strategy,
+            'train': self.train.rows,
+            'test': self.test.rows,
+            'files': self.filenames
+        }
+        if self.manifest is not None:
+            summary['folds'] = dict(sorted(self.fold_counts.items()))
+        return summary
+
+    def close(self):
+        for writer in (self.train, self.test):
+            if self.file_format != 'csv' and writer.schema is None and self.main.schema is not None:
+                # No rows were routed here: still leave a readable empty file
+                writer.write_table(self.main.schema.empty_table())
+        for writer in (self.main, self.train, self.test, self.manifest):
+            if writer is not None:
+                writer.close()
+        # After the data files, so the caches record their final size and mtime
+        for cache in self.caches:
+            cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
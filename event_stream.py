@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Event Stream
+Week-by-week events for the synthetic students: weekly attendance per
+subject, assessment submissions (on time, late or missed), lecturer and
+support referrals, follow-ups and PP meetings. Each generated chunk of
+profiles is expanded into its events as soon as it is produced and spilled
+to disk; the spilled chunks are then merged day by day, so the stream is
+written in date order and never held in memory as a whole.
+"""
+
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from columnar_export import dataset_path, open_dataset_writer
+from synthetic_data_generator import RISK_LEVELS, per_risk, risk_codes
+
+logger = logging.getLogger(__name__)
+
+# Mid-semester window the snapshot dataset describes
+SEMESTER_START = np.datetime64('2025-02-24')  # a Monday
+TEACHING_WEEKS = 8
+SESSIONS_PER_WEEK = 2
+N_SUBJECTS = 3
+
+# Teaching week each assessment is due (on the Friday)
+ASSESSMENT_DUE_WEEKS = {1: 4, 2: 7}
+DUE_WEEKDAY = 4
+MAX_DAYS_LATE = 7
+
+# Week from which low cumulative attendance triggers a lecturer referral
+ATTENDANCE_CHECK_WEEK = 3
+ATTENDANCE_REFERRAL_RATE = 0.5
+
+# Share of submitted assessments handed in late
+LATE_SUBMISSION_PROB = {
+    'low_risk': 0.05,
+    'medium_risk': 0.25,
+    'high_risk': 0.35,
+    'critical_risk': 0.50
+}
+
+# Event types in the order same-day events of one student are listed
+EVENT_TYPES = ['attendance', 'submission', 'missed_submission', 'lecturer_referral', 'referral',
+               'study_skills', 'follow_up', 'pp_meeting']
+EVENT_COLUMNS = ['event_id', 'student_id', 'event_date', 'week', 'event_type', 'subject', 'value', 'detail']
+
+LECTURER_REFERRAL_TYPES = ['Attendance', 'Non Submission', 'Concern for Welfare']
+
+# Rows held at once while merging the spilled chunks into date order
+MERGE_BATCH_ROWS = 65536
+
+
+def merge_sorted_runs(runs, key, batch_rows=MERGE_BATCH_ROWS):
+    """Merge arrays each sorted by key(array) into key-sorted batches
+
+    Reads batch_rows / len(runs) rows of every run per round and emits
+    everything up to the smallest last key among the runs not yet read to
+    the end, so about batch_rows rows are in memory however long the runs
+    are (the runs can be memory maps). Equal keys keep their run's order.
+    """
+
+    runs = [run for run in runs if len(run)]
+    step = max(1, batch_rows // max(len(runs), 1))
+    positions = [0] * len(runs)
+    while runs:
+        buffers = [run[position:position + step] for run, position in zip(runs, positions)]
+        keys = [key(buffer) for buffer in buffers]
+        unfinished = [k[-1] for k, run, position in zip(keys, runs, positions) if position + step < len(run)]
+        limit = min(unfinished) if unfinished else None
+        counts = [len(k) if limit is None else int(np.searchsorted(k, limit, side='right')) for k in keys]
+        batch = np.concatenate([buffer[:count] for buffer, count in zip(buffers, counts)])
+        batch_keys = np.concatenate([k[:count] for k, count in zip(keys, counts)])
+        yield batch[np.argsort(batch_keys, kind='stable')]
+
+        positions = [position + count for position, count in zip(positions, counts)]
+        remaining = [i for i, (run, position) in enumerate(zip(runs, positions)) if position < len(run)]
+        runs, positions = [runs[i] for i in remaining], [positions[i] for i in remaining]
+
+
+class StudentEventStream:
+    """Expand generated student profiles into dated weekly events
+
+    The profiles come from the generator's chunk plan, so they are exactly
+    the students of the snapshot dataset generated with the same seed and
+    chunk size. The events draw from their own random stream per chunk:
+    the snapshot output is unchanged, and the stream is identical for any
+    number of workers.
+
+    Weekly attendance follows each student's snapshot percentage for the
+    subject, shaped by the risk level's decline factor over the weeks (the
+    mean over the window matches the snapshot) and lifted by the
+    intervention effect after a follow-up. Submissions carry the snapshot
+    scores; referrals, follow-ups and meetings are dated from the snapshot's
+    support fields.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        domains = generator.category_domains()
+        self.details = list(dict.fromkeys(
+            ['on_time', 'late'] + LECTURER_REFERRAL_TYPES + domains['referral'] + domains['study_skills(attended)'] +
+            domains['follow_up_type'] + domains['pp_meeting']
+        ))
+        self.events = 0
+
+    def chunk_rng(self, index):
+        """Random stream for one chunk's events, separate from the profile streams"""
+        return np.random.default_rng(np.random.SeedSequence(self.generator.random_state, spawn_key=(2, index)))
+
+    def detail_codes(self, values):
+        return pd.Categorical(np.asarray(values, dtype=object), categories=self.details).codes.astype(np.int16)
+
+    def expand(self, profiles, index=0):
+        """All events of one chunk of profiles, by date, then student and event type"""
+
+        rng = self.chunk_rng(index)
+        n = len(profiles)
+        codes = risk_codes(profiles['risk_level'])
+        weeks = np.arange(TEACHING_WEEKS)
+        blocks = []
+
+        def block(student, day, event_type, subject=0, value=np.nan, detail=-1):
+            size = len(student)
+            blocks.append({
+                'student': student,
+                'day': np.broadcast_to(day, size),
+                'type': np.full(size, EVENT_TYPES.index(event_type), dtype=np.int8),
+                'subject': np.broadcast_to(np.asarray(subject, dtype=np.int8), size),
+                'value': np.broadcast_to(np.asarray(value, dtype=np.float32), size),
+                'detail': np.broadcast_to(np.asarray(detail, dtype=np.int16), size),
+            })
+
+        def random_day(size, first_week=2):
+            return (rng.integers(first_week, TEACHING_WEEKS + 1, size) - 1) * 7 + rng.integers(0, 5, size)
+
+        # Support referral, then a follow-up the week after it (or at some
+        # point in the window for students who were not referred)
+        referral = profiles['referral'].notna().to_numpy()
+        referral_day = random_day(n)
+        student = np.flatnonzero(referral)
+        block(student, referral_day[student], 'referral', detail=self.detail_codes(profiles['referral'].to_numpy()[student]))
+
+        followed_up = (profiles['follow_up'] == 'Yes').to_numpy()
+        follow_up_week = np.where(referral, np.minimum(referral_day // 7 + 2, TEACHING_WEEKS), rng.integers(3, TEACHING_WEEKS + 1, n))
+        follow_up_day = (follow_up_week - 1) * 7 + rng.integers(0, 5, n)
+        student = np.flatnonzero(followed_up)
+        block(student, follow_up_day[student], 'follow_up',
+              detail=self.detail_codes(profiles['follow_up_type'].to_numpy()[student]))
+
+        has_meeting = followed_up & (profiles['pp_meeting'] != 'Not relevant').to_numpy()
+        student = np.flatnonzero(has_meeting)
+        meeting_day = np.minimum(follow_up_day[student] + rng.integers(1, 8, len(student)), TEACHING_WEEKS * 7 - 1)
+        block(student, meeting_day, 'pp_meeting', detail=self.detail_codes(profiles['pp_meeting'].to_numpy()[student]))
+
+        student = np.flatnonzero(profiles['study_skills(attended)'].notna().to_numpy())
+        block(student, random_day(len(student)), 'study_skills',
+              detail=self.detail_codes(profiles['study_skills(attended)'].to_numpy()[student]))
+
+        # Weekly attendance: the decline factor compounds over the window
+        # (twice over, as from attendance_1 to attendance_3 in the snapshot),
+        # normalised so the window mean is the snapshot percentage
+        decline = per_risk(self.generator.decline_factor, codes)
+        shape = decline[:, None] ** (2 * weeks / (TEACHING_WEEKS - 1))
+        shape /= shape.mean(axis=1, keepdims=True)
+        intervention = followed_up & (profiles['pp_meeting'] != 'Not relevant').to_numpy()
+        effect = np.where(intervention, rng.uniform(5, 15, n), 0) / 100
+        lift = 1 + effect[:, None] * (weeks[None, :] + 1 > follow_up_week[:, None])
+
+        elevated_risk = codes >= RISK_LEVELS.index('high_risk')
+        for subject in range(1, N_SUBJECTS + 1):
+            rate = profiles[f'attendance_{subject}'].to_numpy(dtype=float, na_value=np.nan) / 100
+            probability = np.clip(np.nan_to_num(rate)[:, None] * shape * lift, 0, 1)
+            attended = rng.binomial(SESSIONS_PER_WEEK, probability)
+            block(np.repeat(np.arange(n), TEACHING_WEEKS), np.tile(weeks * 7 + subject - 1, n), 'attendance',
+                  subject, attended.ravel())
+
+            # Submissions on the due Friday, some late; missed ones are logged at the deadline
+            for assessment, due_week in ASSESSMENT_DUE_WEEKS.items():
+                score = profiles[f'subject_{subject}_assess_{assessment}'].to_numpy(dtype=float, na_value=np.nan)
+                due_day = (due_week - 1) * 7 + DUE_WEEKDAY
+                submitted = ~np.isnan(score)
+                late = submitted & (rng.random(n) < per_risk(LATE_SUBMISSION_PROB, codes))
+                days_late = np.where(late, rng.integers(1, MAX_DAYS_LATE + 1, n), 0)
+                student = np.flatnonzero(submitted)
+                block(student, due_day + days_late[student], 'submission', subject, score[student],
+                      np.where(late[student], self.details.index('late'), self.details.index('on_time')))
+                block(np.flatnonzero(~submitted), due_day, 'missed_submission', subject)
+
+            # Lecturer referrals for the same triggers as the snapshot's
+            # rule-based lecturer_referral values, dated when they occur
+            cumulative = attended.cumsum(axis=1) / (SESSIONS_PER_WEEK * (weeks + 1))
+            below = (cumulative < ATTENDANCE_REFERRAL_RATE) & (weeks + 1 >= ATTENDANCE_CHECK_WEEK)
+            first_score = profiles[f'subject_{subject}_assess_1'].to_numpy(dtype=float, na_value=np.nan)
+            reason = np.select(
+                [below.any(axis=1), np.isnan(first_score) | (first_score < 30), elevated_risk],
+                LECTURER_REFERRAL_TYPES, default=''
+            )
+            referral_day = np.select(
+                [reason == 'Attendance', reason == 'Non Submission'],
+                [below.argmax(axis=1) * 7 + 4, ASSESSMENT_DUE_WEEKS[1] * 7 + rng.integers(0, 5, n)],
+                default=random_day(n)
+            )
+            student = np.flatnonzero(reason != '')
+            block(student, referral_day[student], 'lecturer_referral', subject, detail=self.detail_codes(reason[student]))
+
+        columns = {key: np.concatenate([b[key] for b in blocks]) for key in blocks[0]}
+        student_ids = profiles['student_id'].to_numpy()
+        order = np.lexsort((columns['type'], student_ids[columns['student']], columns['day']))
+        events = self.events_frame(self.events, student_ids[columns['student'][order]], columns['day'][order],
+                                   columns['type'][order], columns['subject'][order], columns['value'][order],
+                                   columns['detail'][order])
+        self.events += len(events)
+        return events
+
+    def events_frame(self, first_id, student_id, day, event_type, subject, value, detail):
+        """Event rows from day offsets and type and detail codes, numbered from first_id"""
+
+        day = np.asarray(day, dtype=np.int64)
+        return pd.DataFrame({
+            'event_id': np.arange(first_id, first_id + len(day), dtype=np.int64),
+            'student_id': student_id,
+            'event_date': SEMESTER_START + day.astype('timedelta64[D]'),
+            'week': (day // 7 + 1).astype(np.int8),
+            'event_type': pd.Categorical.from_codes(event_type, categories=EVENT_TYPES),
+            'subject': np.asarray(subject, dtype=np.int8),
+            'value': np.asarray(value, dtype=np.float32),
+            'detail': pd.Categorical.from_codes(detail, categories=self.details),
+        }, columns=EVENT_COLUMNS)
+
+    @staticmethod
+    def spill_records(events):
+        """A chunk of events as one structured array, as spilled to disk"""
+
+        records = np.empty(len(events), dtype=[
+            ('student_id', events['student_id'].dtype), ('day', np.int16), ('type', np.int8),
+            ('subject', np.int8), ('value', np.float32), ('detail', np.int16)
+        ])
+        records['student_id'] = events['student_id'].to_numpy()
+        records['day'] = (events['event_date'].to_numpy() - SEMESTER_START).astype('timedelta64[D]').astype(np.int64)
+        records['type'] = events['event_type'].cat.codes.to_numpy()
+        records['subject'] = events['subject'].to_numpy()
+        records['value'] = events['value'].to_numpy()
+        records['detail'] = events['detail'].cat.codes.to_numpy()
+        return records
+
+    def iter_events(self, n_students, chunk_size=100000, workers=1):
+        """Yield the events one chunk of students at a time
+
+        Each chunk is in date order on its own; the next chunk starts over
+        from the first day. iter_dated_events orders the whole stream.
+        """
+
+        self.events = 0
+        self.generator.n_students = n_students
+        for index, (profiles, _) in enumerate(self.generator.generate_profile_chunks(n_students, chunk_size, workers)):
+            yield self.generator.run_stage('expand_events', self.expand, profiles, index)
+
+    def iter_dated_events(self, n_students, chunk_size=100000, workers=1, spill_dir=None):
+        """Yield the whole event stream in date order, in batches
+
+        Each chunk is spilled as it is expanded to a .npy file under
+        spill_dir (already in date order, then student and event type).
+        Every day is then a k-way merge of the chunks' runs for that day,
+        read through memory maps, and event_id is assigned as the merged
+        batches are emitted, so about MERGE_BATCH_ROWS events are held in
+        memory at a time, however many students there are.
+        """
+
+        def key(records):
+            return records['student_id'].astype(np.int64) * len(EVENT_TYPES) + records['type']
+
+        with tempfile.TemporaryDirectory(prefix='events-', dir=spill_dir) as tmp:
+            paths = []
+            for index, events in enumerate(self.iter_events(n_students, chunk_size, workers)):
+                paths.append(os.path.join(tmp, f'chunk{index:05d}.npy'))
+                np.save(paths[-1], self.spill_records(events))
+                logger.info(f"✓ Expanded {len(events)} events ({self.events} so far)")
+
+            runs = [np.load(path, mmap_mode='r') for path in paths]
+            n_days = max((int(run['day'][-1]) + 1 for run in runs if len(run)), default=0)
+            offsets = [np.searchsorted(run['day'], np.arange(n_days + 1)) for run in runs]
+            event_id = 0
+            for day in range(n_days):
+                day_runs = [run[bounds[day]:bounds[day + 1]] for run, bounds in zip(runs, offsets)]
+                for records in merge_sorted_runs(day_runs, key):
+                    yield self.events_frame(event_id, records['student_id'], records['day'], records['type'],
+                                            records['subject'], records['value'], records['detail'])
+                    event_id += len(records)
+
+    def write(self, n_students, chunk_size=100000, filename='synthetic_student_events.csv', workers=1,
+              file_format='csv', compression=None):
+        """Write the event stream in date order; returns the number of events"""
+
+        filename = dataset_path(filename, file_format)
+        logger.info(f"=== STREAMING STUDENT EVENTS ({n_students} students, chunks of {chunk_size}, {workers} worker(s)) ===")
+        spill_dir = os.path.dirname(os.path.abspath(filename))
+        with open_dataset_writer(filename, file_format, compression) as writer:
+            for events in self.iter_dated_events(n_students, chunk_size, workers, spill_dir):
+                self.generator.run_stage('export_events', writer.write, events)
+        logger.info(f"✓ Streamed {self.events} events for {n_students} students to {filename}")
+        return self.events
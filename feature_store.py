@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Feature Store
+Student records and their derived features keyed by student_id, updated
+from weekly deltas (new attendance, newly submitted assessments, new
+referrals). Only students whose records changed are recomputed and
+written, and every ingest is kept as a numbered version so past features
+can be looked up.
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from columnar_export import read_dataset
+from student_features import feature_columns
+from student_schema import apply_schema
+
+STORE_DIR = '.cache/feature_store'
+MANIFEST_NAME = 'manifest.json'
+
+# Ingests append only the rows they change; every COMPACT_EVERY versions the
+# current state and the feature history are rewritten as one file each
+COMPACT_EVERY = 10
+HISTORY_ROW_GROUP = 65536
+
+
+class FeatureStore:
+    """Current records and features plus per-version deltas
+
+    Layout under path: versions/r00001.parquet and versions/v00001.parquet
+    ... hold the records and feature rows each ingest changed, and
+    manifest.json the version log. Compaction folds them into
+    records.vNNNNN.parquet and features.vNNNNN.parquet (the state as of
+    version NNNNN, the manifest's base_version) and history.vNNNNN.parquet
+    (every feature row up to it, sorted by student_id). Opening the store
+    reads the base plus the versions after it, so an ingest costs I/O in
+    the rows it changed and a compaction every compact_every versions costs
+    one rewrite of the cohort.
+    """
+
+    def __init__(self, path=STORE_DIR, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.compact_every = compact_every
+        self.versions = []
+        self.base_version = 0
+        self.records = None
+        self.features = None
+        if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+            with open(os.path.join(path, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+            self.versions = manifest['versions']
+            self.base_version = manifest['base_version']
+            self.records = apply_schema(self.load_current('records', self.records_path, lambda df: df))
+            self.features = self.load_current('features', self.version_path,
+                                              lambda df: df.drop(columns='version').set_index('student_id'))
+
+    @property
+    def version(self):
+        return self.versions[-1]['version'] if self.versions else 0
+
+    def version_path(self, version):
+        return os.path.join(self.path, 'versions', f'v{version:05d}.parquet')
+
+    def records_path(self, version):
+        return os.path.join(self.path, 'versions', f'r{version:05d}.parquet')
+
+    def base_path(self, name, version=None):
+        version = self.base_version if version is None else version
+        return os.path.join(self.path, f'{name}.v{version:05d}.parquet')
+
+    def later_versions(self):
+        return [entry['version'] for entry in self.versions if entry['version'] > self.base_version]
+
+    def load_current(self, name, delta_path, index_delta):
+        """Base state plus the rows each later version changed, latest wins"""
+
+        frames = [pd.read_parquet(self.base_path(name))] if self.base_version else []
+        frames += [index_delta(pd.read_parquet(delta_path(version))) for version in self.later_versions()]
+        current = pd.concat(frames)
+        return current[~current.index.duplicated(keep='last')]
+
+    def changed_students(self, delta):
+        """Ids in delta that are new or whose non-missing delta values differ"""
+
+        existing = delta.index.intersection(self.records.index)
+        changed = pd.Series(False, index=existing)
+        for column in delta.columns:
+            new = delta.loc[existing, column]
+            old = self.records.loc[existing, column]
+            differs = new.to_numpy(dtype=object, na_value=None) != old.to_numpy(dtype=object, na_value=None)
+            changed |= new.notna().to_numpy() & (old.isna().to_numpy() | differs)
+        return changed.index[changed.to_numpy()].append(delta.index.difference(self.records.index))
+
+    def ingest(self, delta, week=None, source=None):
+        """Apply a delta of student records and recompute the affected features
+
+        Rows are matched on student_id; non-missing delta values overwrite
+        the stored ones and unknown ids are added as new students. Returns
+        the new version number (unchanged if nothing changed).
+        """
+
+        start = time.perf_counter()
+        # Cast to the schema first so values compare equal to the stored ones
+        delta = apply_schema(delta.drop_duplicates('student_id', keep='last')).set_index('student_id')
+        if self.records is None:
+            self.records = apply_schema(delta.iloc[:0])
+            self.features = pd.DataFrame()
+        unknown = set(delta.columns) - set(self.records.columns)
+        if unknown and len(self.records):
+            raise ValueError(f"Delta has columns the store does not: {sorted(unknown)}")
+
+        affected = self.changed_students(delta)
+        if len(affected) == 0:
+            return self.version
+
+        # Overwrite changed values column by column on NumPy copies (the
+        # schema is reapplied below), then append new students
+        existing = affected.intersection(self.records.index)
+        records = self.records.copy()
+        for column in delta.columns:
+            new = delta.loc[existing, column]
+            new = new[new.notna()]
+            if len(new) == 0:
+                continue
+            plain = isinstance(records[column].dtype, np.dtype)
+            values = records[column].to_numpy(dtype=None if plain else object, copy=True)
+            values[records.index.get_indexer(new.index)] = new.to_numpy()
+            records[column] = values
+        added = affected.difference(self.records.index)
+        records = pd.concat([records, delta.loc[added]]) if len(added) else records
+        self.records = apply_schema(records.rename_axis('student_id'))
+
+        # Recompute features for the affected students only
+        changed = self.records.loc[affected]
+        features = pd.DataFrame(feature_columns(changed), index=affected)
+        features.index.name = 'student_id'
+        self.features = pd.concat([self.features.drop(index=affected, errors='ignore'), features])
+
+        # Only the changed rows are written; the manifest entry commits them
+        version = self.version + 1
+        os.makedirs(os.path.dirname(self.version_path(version)), exist_ok=True)
+        self.records.loc[affected].to_parquet(self.records_path(version))
+        features.assign(version=version).reset_index().to_parquet(self.version_path(version), index=False)
+        self.versions.append({'version': version, 'week': week, 'source': source,
+                              'students': int(len(affected)), 'added': int(len(added)),
+                              'ingested_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                              'seconds': round(time.perf_counter() - start, 3)})
+        self.write_manifest()
+        if self.compact_every and len(self.later_versions()) >= self.compact_every:
+            self.compact()
+        return version
+
+    def write_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, f'{MANIFEST_NAME}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'base_version': self.base_version, 'versions': self.versions}, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_NAME))
+
+    def compact(self):
+        """Fold the versions since the last compaction into new base and history files
+
+        The new files are written under the new base version's names before
+        the manifest points at them, and the files they replace are removed
+        only after, so an interrupted compaction leaves the store readable.
+        """
+
+        if not self.later_versions():
+            return
+        version, old_base, folded = self.version, self.base_version, self.later_versions()
+        history = self.feature_rows().sort_values(['student_id', 'version'], kind='stable')
+        self.records.to_parquet(self.base_path('records', version))
+        self.features.to_parquet(self.base_path('features', version))
+        history.to_parquet(self.base_path('history', version), index=False, row_group_size=HISTORY_ROW_GROUP)
+        self.base_version = version
+        self.write_manifest()
+
+        stale = [self.records_path(v) for v in folded] + [self.version_path(v) for v in folded]
+        if old_base:
+            stale += [self.base_path(name, old_base) for name in ('records', 'features', 'history')]
+        for path in stale:
+            os.remove(path)
+
+    def feature_rows(self, filters=None):
+        """Feature rows of every version, with their version number, oldest version first per student"""
+
+        paths = [self.base_path('history')] if self.base_version else []
+        paths += [self.version_path(version) for version in self.later_versions()]
+        rows = [pd.read_parquet(path, filters=filters) for path in paths]
+        return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame()
+
+    def features_as_of(self, version):
+        """Every student's features as they stood after the given version"""
+        features = self.feature_rows(filters=[('version', '<=', version)])
+        if features.empty:
+            return pd.DataFrame()
+        features = features.drop_duplicates('student_id', keep='last')
+        return features.drop(columns='version').set_index('student_id')
+
+    def history(self, student_id):
+        """One student's feature rows across versions, oldest first
+
+        Reads the sorted history file (only the row groups that can hold
+        student_id) and the versions ingested since the last compaction.
+        """
+        rows = self.feature_rows(filters=[('student_id', '==', student_id)])
+        weeks = {entry['version']: entry['week'] for entry in self.versions}
+        return rows.assign(week=rows['version'].map(weeks)) if len(rows) else rows
+
+
+def read_delta(path):
+    return read_dataset(path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Incremental weekly feature store keyed by student_id")
+    parser.add_argument('--store', default=STORE_DIR, help=f"store directory (default: {STORE_DIR})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="apply a delta (or full) dataset file")
+    ingest.add_argument('delta', help="CSV, Parquet or Feather file with student_id and changed columns")
+    ingest.add_argument('--week', type=int, default=None, help="teaching week the delta belongs to")
+
+    commands.add_parser('versions', help="list ingested versions")
+    commands.add_parser('compact', help="fold the versions since the last compaction into the base files")
+
+    show = commands.add_parser('show', help="print one student's feature history")
+    show.add_argument('student_id', type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = FeatureStore(args.store)
+
+    if args.command == 'ingest':
+        version = store.ingest(read_delta(args.delta), args.week, os.path.basename(args.delta))
+        if store.versions and store.versions[-1]['version'] == version:
+            entry = store.versions[-1]
+            print(f"✓ Version {version}: recomputed {entry['students']} students "
+                  f"({entry['added']} new) in {entry['seconds']:.2f}s")
+        else:
+            print(f"✓ No changes; store stays at version {version}")
+    elif args.command == 'compact':
+        folded = len(store.later_versions())
+        store.compact()
+        print(f"✓ Folded {folded} versions into the version {store.base_version} base")
+    elif args.command == 'versions':
+        for entry in store.versions:
+            print(f"  v{entry['version']}: week {entry['week']}, {entry['students']} students "
+                  f"({entry['added']} new) from {entry['source']} at {entry['ingested_at']}")
+    else:
+        print(store.history(args.student_id).T.to_string())
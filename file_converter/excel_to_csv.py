@@ -1,75 +1,308 @@
 import pandas as pd
+import argparse
+import hashlib
+import json
 import os
+import re
 import sys
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
-def convert_excel_to_csv(input_file, output_dir="output_csv"):
+# student_schema and columnar_export live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from student_schema import apply_schema
+from columnar_export import FILE_EXTENSIONS, open_dataset_writer, portable_schema
+
+# Rows per chunk on the streaming path
+STREAM_CHUNK_ROWS = 50000
+
+# Record of converted workbooks kept in the output directory
+MANIFEST_NAME = '.conversion_manifest.json'
+MANIFEST_VERSION = 1
+
+# XML namespaces of the .xlsx workbook part
+XLSX_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+XLSX_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+# Shared-string cells in a worksheet part, capturing the string index
+SHARED_STRING_CELL = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+
+def output_path(output_dir, file_name, sheet_name, n_sheets, file_format):
+    stem = file_name if n_sheets == 1 else f"{file_name}_{sheet_name}"
+    return os.path.join(output_dir, stem + FILE_EXTENSIONS[file_format])
+
+def write_frames(frames, output_file, file_format, schema=False):
+    # Sheets are copied through as read unless schema is set; then each
+    # chunk gets the student schema's compact dtypes (float32 scores, so
+    # lossy), keeping any column that does not fit it as read. Columnar
+    # files take their types from the first chunk, widened so later chunks
+    # still fit
+    with open_dataset_writer(output_file, file_format) as writer:
+        for df in frames:
+            if schema:
+                df = apply_schema(df, errors='ignore')
+            if file_format != 'csv' and writer.schema is None:
+                writer.schema = portable_schema(df)
+            writer.write(df)
+
+def cell_value(value):
+    # openpyxl reads every number as a float; integral ones become ints, as
+    # pandas' own openpyxl reader does, so both paths write "20", not "20.0"
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def iter_sheet_rows(worksheet, chunk_rows):
+    # Read-only worksheets yield rows lazily, so only one chunk is held at a time
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [f"Unnamed: {i}" if name is None else str(name) for i, name in enumerate(header)]
+
+    batch = []
+    emitted = False
+    for row in rows:
+        if all(value is None for value in row):
+            continue
+        batch.append([cell_value(value) for value in row[:len(columns)]])
+        if len(batch) == chunk_rows:
+            yield pd.DataFrame(batch, columns=columns)
+            batch = []
+            emitted = True
+    if batch or not emitted:
+        yield pd.DataFrame(batch, columns=columns)
+
+def stream_excel_sheets(input_file, output_dir, file_format='csv', chunk_rows=STREAM_CHUNK_ROWS, sheets=None,
+                        schema=False):
+    from openpyxl import load_workbook
+
+    file_name = Path(input_file).stem
+    workbook = load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            if sheets is not None and worksheet.title not in sheets:
+                continue
+            output_file = output_path(output_dir, file_name, worksheet.title, len(workbook.worksheets), file_format)
+            write_frames(iter_sheet_rows(worksheet, chunk_rows), output_file, file_format, schema)
+            print(f"Streamed sheet '{worksheet.title}': {input_file} -> {output_file}")
+    finally:
+        workbook.close()
+
+def convert_excel_to_csv(input_file, output_dir="output_csv", file_format='csv', stream=False, sheets=None,
+                         schema=False):
     try:
         if not os.path.exists(input_file):
             print(f"Error: Input file '{input_file}' not found.")
             return False
-        
+
         os.makedirs(output_dir, exist_ok=True)
-        
+
         file_name = Path(input_file).stem
-        
-        if input_file.endswith(('.xlsx', '.xls')):
-            excel_file = pd.ExcelFile(input_file)
-            
-            if len(excel_file.sheet_names) == 1:
-                df = pd.read_excel(input_file)
-                output_file = os.path.join(output_dir, f"{file_name}.csv")
-                df.to_csv(output_file, index=False)
-                print(f"Converted: {input_file} -> {output_file}")
-            else:
+
+        if input_file.endswith('.xlsx') and stream:
+            stream_excel_sheets(input_file, output_dir, file_format, sheets=sheets, schema=schema)
+        elif input_file.endswith(('.xlsx', '.xls')):
+            # Parse the workbook once and read every sheet from it
+            with pd.ExcelFile(input_file) as excel_file:
+                n_sheets = len(excel_file.sheet_names)
                 for sheet_name in excel_file.sheet_names:
-                    df = pd.read_excel(input_file, sheet_name=sheet_name)
-                    output_file = os.path.join(output_dir, f"{file_name}_{sheet_name}.csv")
-                    df.to_csv(output_file, index=False)
-                    print(f"Converted sheet '{sheet_name}': {input_file} -> {output_file}")
+                    if sheets is not None and sheet_name not in sheets:
+                        continue
+                    output_file = output_path(output_dir, file_name, sheet_name, n_sheets, file_format)
+                    write_frames([excel_file.parse(sheet_name)], output_file, file_format, schema)
+                    if n_sheets == 1:
+                        print(f"Converted: {input_file} -> {output_file}")
+                    else:
+                        print(f"Converted sheet '{sheet_name}': {input_file} -> {output_file}")
         else:
             print(f"Error: '{input_file}' is not a valid Excel file.")
             return False
-        
+
         return True
-    
+
     except Exception as e:
         print(f"Error converting {input_file}: {str(e)}")
         return False
 
-def convert_all_excel_files(input_dir=".", output_dir="output_csv"):
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def sheet_fingerprints(input_file):
+    # Per-sheet content hashes of an .xlsx, read from its zip parts without
+    # loading the workbook. Each hash covers the sheet's part, the shared
+    # strings it references and the styles, so a string added for one sheet
+    # does not invalidate the others. Returns None for other formats.
+    if not input_file.endswith('.xlsx'):
+        return None
+    with zipfile.ZipFile(input_file) as archive:
+        names = set(archive.namelist())
+        styles = hashlib.sha256(archive.read('xl/styles.xml') if 'xl/styles.xml' in names else b'')
+        strings = []
+        if 'xl/sharedStrings.xml' in names:
+            for item in ET.fromstring(archive.read('xl/sharedStrings.xml')).iter(f'{XLSX_MAIN_NS}si'):
+                strings.append(''.join(text.text or '' for text in item.iter(f'{XLSX_MAIN_NS}t')))
+        relationships = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target') for rel in relationships}
+
+        fingerprints = {}
+        for sheet in ET.fromstring(archive.read('xl/workbook.xml')).iter(f'{XLSX_MAIN_NS}sheet'):
+            target = targets[sheet.get(f'{XLSX_REL_NS}id')]
+            part = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+            content = archive.read(part)
+            digest = styles.copy()
+            digest.update(content)
+            for index in sorted({int(i) for i in SHARED_STRING_CELL.findall(content)}):
+                digest.update(strings[index].encode() + b'\0')
+            fingerprints[sheet.get('name')] = digest.hexdigest()
+    return fingerprints
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest.get('files', {}) if manifest.get('version') == MANIFEST_VERSION else {}
+
+def save_manifest(output_dir, files):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'files': files}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def update_workbook(input_file, output_dir="output_csv", file_format='csv', stream=False, entry=None, schema=False):
+    # Convert one workbook if it changed since the manifest entry was
+    # recorded, rebuilding only the sheets whose content changed.
+    # Returns (status, new entry) with status 'unchanged', 'converted' or 'failed'.
+    stat = os.stat(input_file)
+    # Entries from before schema casting was optional were written with it
+    entry = entry if entry and entry.get('format') == file_format and entry.get('schema', True) == schema else None
+
+    def outputs_present(entry):
+        return all(os.path.exists(sheet['output']) for sheet in entry['sheets'].values())
+
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns and outputs_present(entry):
+        return 'unchanged', entry
+
+    sha256 = file_sha256(input_file)
+    if entry and entry['sha256'] == sha256 and outputs_present(entry):
+        # Touched but identical: just refresh the recorded stat
+        return 'unchanged', dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    try:
+        fingerprints = sheet_fingerprints(input_file)
+        if fingerprints is None:
+            with pd.ExcelFile(input_file) as excel_file:
+                fingerprints = dict.fromkeys(excel_file.sheet_names)
+    except Exception as e:
+        print(f"Error converting {input_file}: {str(e)}")
+        return 'failed', None
+
+    file_name = Path(input_file).stem
+    sheets = {
+        name: {'hash': digest, 'output': output_path(output_dir, file_name, name, len(fingerprints), file_format)}
+        for name, digest in fingerprints.items()
+    }
+    previous = entry['sheets'] if entry else {}
+    stale = {
+        name for name, sheet in sheets.items()
+        if sheet['hash'] is None or previous.get(name) != sheet or not os.path.exists(sheet['output'])
+    }
+
+    if stale and not convert_excel_to_csv(input_file, output_dir, file_format, stream, sheets=stale, schema=schema):
+        return 'failed', None
+
+    # Drop outputs of sheets that no longer exist (or were renamed)
+    current_outputs = {sheet['output'] for sheet in sheets.values()}
+    for sheet in previous.values():
+        if sheet['output'] not in current_outputs and os.path.exists(sheet['output']):
+            os.remove(sheet['output'])
+
+    if not stale:
+        print(f"Unchanged sheets: {input_file}")
+    return 'converted', {
+        'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256, 'format': file_format, 'schema': schema,
+        'sheets': sheets
+    }
+
+def convert_all_excel_files(input_dir=".", output_dir="output_csv", file_format='csv', stream=False, workers=None,
+                            incremental=True, schema=False):
     excel_files = []
     for ext in ['*.xlsx', '*.xls']:
-        excel_files.extend(Path(input_dir).glob(ext))
-    
+        excel_files.extend(str(path) for path in Path(input_dir).glob(ext))
+
     if not excel_files:
         print(f"No Excel files found in '{input_dir}'")
         return
-    
-    success_count = 0
-    for excel_file in excel_files:
-        if convert_excel_to_csv(str(excel_file), output_dir):
-            success_count += 1
-    
-    print(f"\nConversion complete: {success_count}/{len(excel_files)} files converted successfully.")
+
+    # Workbooks unchanged since the manifest was written are skipped
+    manifest = load_manifest(output_dir) if incremental else {}
+    keys = [str(Path(excel_file).resolve()) for excel_file in excel_files]
+    entries = [manifest.get(key) for key in keys]
+
+    # Convert the files in a process pool (workbook parsing is CPU bound)
+    workers = min(workers or os.cpu_count() or 1, len(excel_files))
+    arguments = (excel_files, repeat(output_dir), repeat(file_format), repeat(stream), entries, repeat(schema))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(update_workbook, *arguments))
+    else:
+        results = list(map(update_workbook, *arguments))
+
+    for key, (status, entry) in zip(keys, results):
+        if entry is not None:
+            manifest[key] = entry
+        else:
+            manifest.pop(key, None)
+    save_manifest(output_dir, manifest)
+
+    statuses = [status for status, _ in results]
+    success_count = len(statuses) - statuses.count('failed')
+    print(f"\nConversion complete: {success_count}/{len(excel_files)} files converted successfully "
+          f"({statuses.count('unchanged')} unchanged, skipped).")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage:")
-        print("  python excel_to_csv.py <excel_file>")
-        print("  python excel_to_csv.py --all [input_directory]")
-        print("\nExamples:")
-        print("  python excel_to_csv.py data.xlsx")
-        print("  python excel_to_csv.py --all")
-        print("  python excel_to_csv.py --all /path/to/excel/files")
-        return
-    
-    if sys.argv[1] == "--all":
-        input_dir = sys.argv[2] if len(sys.argv) > 2 else "."
-        convert_all_excel_files(input_dir)
+    parser = argparse.ArgumentParser(
+        description="Convert Excel workbooks to CSV (or Parquet), one file per sheet",
+        epilog="Examples:\n"
+               "  python excel_to_csv.py data.xlsx\n"
+               "  python excel_to_csv.py --all\n"
+               "  python excel_to_csv.py --all /path/to/excel/files --workers 8 --stream --format parquet",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('excel_file', nargs='?', help="workbook to convert")
+    parser.add_argument('--all', nargs='?', const='.', default=None, metavar='INPUT_DIRECTORY',
+                        help="convert every workbook in a directory (default: current directory)")
+    parser.add_argument('--output-dir', default='output_csv', help="output directory (default: output_csv)")
+    parser.add_argument('--format', dest='file_format', choices=['csv', 'parquet'], default='csv',
+                        help="output format (default: csv)")
+    parser.add_argument('--stream', action='store_true',
+                        help="read .xlsx sheets row by row in read-only mode to bound memory")
+    parser.add_argument('--schema', action='store_true',
+                        help="cast student columns to the compact schema dtypes (float32 scores; lossy)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes for --all (default: one per CPU)")
+    parser.add_argument('--force', action='store_true',
+                        help="with --all, reconvert every workbook even if the manifest shows it unchanged")
+    args = parser.parse_args()
+
+    if args.all is not None:
+        convert_all_excel_files(args.all, args.output_dir, args.file_format, args.stream, args.workers,
+                                incremental=not args.force, schema=args.schema)
+    elif args.excel_file:
+        convert_excel_to_csv(args.excel_file, args.output_dir, args.file_format, args.stream, schema=args.schema)
     else:
-        input_file = sys.argv[1]
-        convert_excel_to_csv(input_file)
+        parser.print_help()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
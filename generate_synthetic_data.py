@@ -5,40 +5,160 @@ Production script to create full synthetic dataset based on research patterns
 """
 
 from synthetic_data_generator import SyntheticStudentDataGenerator
-import pandas as pd
+from event_stream import StudentEventStream
+from columnar_export import FILE_EXTENSIONS
+from dataset_splits import SPLIT_STRATEGIES, SplitAssigner
+from stage_cache import DEFAULT_MAX_MB, STAGE_CACHE_DIR, StageCache
+from stage_profiling import StageProfiler
+import argparse
+import logging
 import sys
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the JCUB synthetic student dataset")
+    parser.add_argument('n_students', nargs='?', type=int, default=2000,
+                        help="number of students to generate (default: 2000)")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="stream the dataset in chunks of this many students to keep memory flat")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="generate chunks as shards in this many processes (implies streaming)")
+    parser.add_argument('--format', dest='file_format', choices=list(FILE_EXTENSIONS), default='csv',
+                        help="output format; parquet/feather use categorical and compact numeric dtypes")
+    parser.add_argument('--compression', default=None,
+                        help="codec for parquet/feather output, e.g. snappy, zstd, lz4 or none")
+    parser.add_argument('--validation-report', default=None, metavar='PATH',
+                        help="also write the data quality report as JSON to PATH")
+    parser.add_argument('--split', choices=SPLIT_STRATEGIES, default='positional',
+                        help="train/test split: first rows (positional) or stratified by academic_status")
+    parser.add_argument('--train-fraction', type=float, default=0.8,
+                        help="share of records in the training set (default: 0.8)")
+    parser.add_argument('--folds', type=int, default=0,
+                        help="also write a K-fold cross-validation manifest of the training set")
+    parser.add_argument('--events', action='store_true',
+                        help="write the week-by-week event stream (synthetic_student_events) instead of the snapshot dataset")
+    parser.add_argument('--id-range', type=int, nargs=2, default=None, metavar=('LOW', 'HIGH'),
+                        help="draw student IDs from [LOW, HIGH) (default: the smallest range of 5+ digits that fits)")
+    parser.add_argument('--binary-cache', action='store_true',
+                        help="also write a memory-mapped binary cache (.npcache) next to each data file")
+    parser.add_argument('--stage-cache', nargs='?', const=STAGE_CACHE_DIR, default=None, metavar='DIR',
+                        help=f"memoize the profile stages on disk (default directory: {STAGE_CACHE_DIR})")
+    parser.add_argument('--stage-cache-mb', type=int, default=DEFAULT_MAX_MB,
+                        help=f"evict least recently used stage outputs beyond this size (default: {DEFAULT_MAX_MB})")
+    parser.add_argument('--approximate-patterns', action='store_true',
+                        help="fit categorical patterns from constant-memory sketches of the original data")
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help="record time, memory and rows per pipeline stage and write them to PATH")
+    parser.add_argument('--profile-format', choices=['json', 'chrome'], default='json',
+                        help="stage profile format: summary JSON or Chrome trace events (default: json)")
+    parser.add_argument('--profile-memory', action=argparse.BooleanOptionalAction, default=True,
+                        help="trace stage allocations with tracemalloc (slower; default: on)")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="verbosity of the generator's stage output (default: INFO)")
+    return parser.parse_args()
+
+def print_split_summary(summary, ext):
+    """Print the train/test (and fold) counts written alongside the main file"""
+    
+    print("\n=== CREATING ADDITIONAL EXPORTS ===")
+    print(f"✓ Training set: {summary['train']} records → synthetic_student_data_train{ext} ({summary['strategy']} split)")
+    print(f"✓ Test set: {summary['test']} records → synthetic_student_data_test{ext}")
+    if 'folds' in summary:
+        folds = ', '.join(str(count) for count in summary['folds'].values())
+        print(f"✓ Fold manifest: {len(summary['folds'])} folds ({folds} records) → synthetic_student_data_folds.csv")
+
+def write_stage_profile(profiler, path, trace_format):
+    """Write the stage profile and print the per-stage totals"""
+    
+    if profiler is None:
+        return
+    
+    profiler.write(path, trace_format)
+    print("\n=== STAGE PROFILE ===")
+    for stage, totals in profiler.summary().items():
+        print(f"  {stage:<32} {totals['seconds']:>8.3f}s {totals['rows']:>10} rows {totals['allocated_mb']:>8.1f} MB peak")
+    print(f"✓ Stage profile written to {path} ({trace_format})")
+
 def main():
+    # Get number of students from command line or use default
+    args = parse_args()
+    logging.basicConfig(level=args.log_level, format='%(message)s', stream=sys.stdout)
+    
     print("=" * 80)
     print("JCUB STUDENT RETENTION PREDICTIVE MODEL")
     print("Synthetic Data Generation")
     print("=" * 80)
     
-    # Get number of students from command line or use default
-    n_students = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_students = args.n_students
+    if (args.workers > 1 or args.events) and not args.chunk_size:
+        args.chunk_size = 100000
+    ext = FILE_EXTENSIONS[args.file_format]
     
     print(f"Generating {n_students} synthetic student records...")
     print("This dataset follows research-backed patterns for student retention prediction.\n")
     
     # Initialize generator
-    generator = SyntheticStudentDataGenerator(n_students=n_students, random_state=42)
+    generator = SyntheticStudentDataGenerator(n_students=n_students, random_state=42,
+                                              approximate_patterns=args.approximate_patterns,
+                                              id_range=tuple(args.id_range) if args.id_range else None,
+                                              binary_cache=args.binary_cache,
+                                              stage_cache=StageCache(args.stage_cache, args.stage_cache_mb * 2**20)
+                                              if args.stage_cache else None)
     
-    # Generate full dataset
-    df = generator.generate_full_dataset(n_students=n_students)
+    splits = SplitAssigner(n_students, args.train_fraction, args.split, n_folds=args.folds)
     
-    # Create additional exports
-    print("\n=== CREATING ADDITIONAL EXPORTS ===")
+    profiler = None
+    if args.profile:
+        profiler = StageProfiler(trace_memory=args.profile_memory)
+        generator.stage_hooks.append(profiler)
+    
+    if args.events:
+        # Event stream mode: chunks of students expanded into dated events
+        events = StudentEventStream(generator).write(
+            n_students, chunk_size=args.chunk_size, workers=args.workers,
+            file_format=args.file_format, compression=args.compression
+        )
+        
+        print("\n=== EVENT STREAM SUMMARY ===")
+        print(f"Students: {n_students}")
+        print(f"Events: {events} ({events / n_students:.1f} per student) → synthetic_student_events{ext}")
+        
+        write_stage_profile(profiler, args.profile, args.profile_format)
+        print("\n=== GENERATION COMPLETE ===")
+        return
     
-    # Export training/testing splits
-    train_size = int(len(df) * 0.8)
-    df_train = df.iloc[:train_size]
-    df_test = df.iloc[train_size:]
+    if args.chunk_size:
+        # Streaming mode: bounded memory, summary comes from the run totals
+        report = generator.generate_full_dataset(
+            n_students=n_students, chunk_size=args.chunk_size, workers=args.workers,
+            file_format=args.file_format, compression=args.compression, report_path=args.validation_report,
+            splits=splits
+        )
+        
+        print_split_summary(generator.split_summary, ext)
+        
+        print("\n=== DATASET SUMMARY ===")
+        print(f"Total records: {report['rows']}")
+        print(f"Academic status distribution:")
+        for status, count in sorted(report['academic_status'].items(), key=lambda item: -item[1]):
+            print(f"  {status}: {count} ({count/report['rows']*100:.1f}%)")
+        
+        followed_up = report['follow_up'].get('Yes', 0)
+        print(f"\nAttendance vs Performance correlation: {report['attendance_grade_correlation']:.3f}")
+        print(f"Average first assessment score: {report['numeric']['subject_1_assess_1']['mean']:.1f}")
+        print(f"Students with follow-up support: {followed_up} ({followed_up/report['rows']*100:.1f}%)")
+        
+        write_stage_profile(profiler, args.profile, args.profile_format)
+        print("\n=== GENERATION COMPLETE ===")
+        return
     
-    df_train.to_csv('synthetic_student_data_train.csv', index=False)
-    df_test.to_csv('synthetic_student_data_test.csv', index=False)
+    # Generate full dataset
+    df = generator.generate_full_dataset(
+        n_students=n_students, file_format=args.file_format, compression=args.compression,
+        report_path=args.validation_report, splits=splits
+    )
     
-    print(f"✓ Training set: {len(df_train)} records → synthetic_student_data_train.csv")
-    print(f"✓ Test set: {len(df_test)} records → synthetic_student_data_test.csv")
+    # Training/testing splits were written in the same pass as the main file
+    print_split_summary(generator.split_summary, ext)
     
     # Generate summary statistics
     print("\n=== DATASET SUMMARY ===")
@@ -53,11 +173,14 @@ def main():
     print(f"Average first assessment score: {df['subject_1_assess_1'].mean():.1f}")
     print(f"Students with follow-up support: {(df['follow_up'] == 'Yes').sum()} ({(df['follow_up'] == 'Yes').mean()*100:.1f}%)")
     
+    write_stage_profile(profiler, args.profile, args.profile_format)
     print("\n=== GENERATION COMPLETE ===")
     print("Files created:")
-    print("  - synthetic_student_data.csv (main dataset)")
-    print("  - synthetic_student_data_train.csv (training set)")
-    print("  - synthetic_student_data_test.csv (test set)")
+    print(f"  - synthetic_student_data{ext} (main dataset)")
+    print(f"  - synthetic_student_data_train{ext} (training set)")
+    print(f"  - synthetic_student_data_test{ext} (test set)")
+    if args.folds > 1:
+        print(f"  - synthetic_student_data_folds.csv ({args.folds}-fold manifest)")
     print("\\nDataset ready for student retention prediction modeling!")
 
 if __name__ == "__main__":
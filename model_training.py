@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Model Training
+Builds the encoded feature matrix once (cached on disk by data hash and
+preprocessing config), ranks features by Random Forest importance, searches
+hyperparameters and feature subsets across a process pool with early
+stopping, and saves the preprocessing pipeline and risk model for scoring
+"""
+
+import argparse
+import hashlib
+import inspect
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.utils.class_weight import compute_class_weight
+from columnar_export import read_dataset
+from scoring_service import MODEL_PATH, PIPELINE_PATH
+from stage_cache import code_digest
+from student_features import ATTENDANCE_COLUMNS, SCORE_COLUMNS, feature_columns, has_column
+
+logger = logging.getLogger(__name__)
+
+TRAIN_PATH = 'synthetic_student_data_train.csv'
+TEST_PATH = 'synthetic_student_data_test.csv'
+
+# Students in these academic standings are the positive (at-risk) class
+TARGET_COLUMN = 'academic_status'
+AT_RISK_STATUSES = ['Academic Caution', 'At Risk', 'Excluded']
+
+# Raw categorical columns one-hot encoded next to the engineered features
+ONE_HOT_COLUMNS = [
+    'course', 'student_cohort', 'failed_subjects', 'study_skills(attended)', 'referral',
+    'pp_meeting', 'self_assessment', 'follow_up', 'follow_up_type',
+    'learn_jcu_issues_1', 'lecturer_referral_1', 'learn_jcu_issues_2', 'lecturer_referral_2',
+    'learn_jcu_issues_3', 'lecturer_referral_3'
+]
+PREPROCESSING_CONFIG = {'one_hot_columns': ONE_HOT_COLUMNS, 'max_categories': 50, 'scale': True}
+
+# Encoded matrices are cached here, keyed by data hash and preprocessing config
+FEATURE_CACHE_DIR = '.cache/features'
+FEATURE_CACHE_VERSION = 1
+# Modules the encoding runs through, with StudentPreprocessor's own source;
+# an edit to any of them changes the cache key
+FEATURE_CODE_MODULES = ['student_features', 'text_flags', 'student_schema']
+
+# Step 7.3 feature selection
+CORRELATION_THRESHOLD = 0.9
+TOP_N_FEATURES = [20, 40]
+
+# Hyperparameter grid; every point is tried with every feature subset
+SEARCH_GRID = {
+    'max_depth': [None, 12],
+    'min_samples_leaf': [1, 5],
+    'max_features': ['sqrt', 0.3],
+}
+
+# Early stopping: forests grow TREE_STEP trees at a time until validation
+# AUC has not improved by MIN_DELTA for PATIENCE steps
+TREE_STEP = 50
+MAX_TREES = 500
+PATIENCE = 2
+MIN_DELTA = 0.001
+
+
+class StudentPreprocessor:
+    """Raw student records -> float32 model matrix
+
+    Engineered features (student_features) are median-imputed and
+    standardized; ONE_HOT_COLUMNS and grade_trajectory are one-hot encoded
+    over the most frequent values seen in fit. Plain NumPy at transform
+    time, so scoring one student stays cheap. select() narrows the output
+    to a feature subset. input_columns lists the raw score, attendance and
+    categorical columns fit saw, which scoring requires of every record.
+    """
+
+    def __init__(self, one_hot_columns=ONE_HOT_COLUMNS, max_categories=50, scale=True):
+        self.one_hot_columns = list(one_hot_columns)
+        self.max_categories = max_categories
+        self.scale = scale
+        self.selected = None
+
+    def _source(self, column, df, features):
+        """A one-hot column's values, from the engineered features or the raw record"""
+        if column in features:
+            return pd.Series(features[column])
+        return df[column] if column in df.columns else None
+
+    def fit(self, df, y=None):
+        self.input_columns = [column for column in SCORE_COLUMNS + ATTENDANCE_COLUMNS + self.one_hot_columns
+                              if has_column(df.columns, column)]
+        features = feature_columns(df)
+        self.numeric_columns = [column for column, values in features.items() if values.dtype.kind in 'biuf']
+        categorical_columns = [column for column in features if column not in self.numeric_columns]
+        categorical_columns += [column for column in self.one_hot_columns if column in df.columns]
+        numeric = np.column_stack([features[column] for column in self.numeric_columns]).astype(float)
+
+        observed = ~np.isnan(numeric)
+        with np.errstate(invalid='ignore'):
+            medians = np.array([np.median(numeric[observed[:, j], j]) if observed[:, j].any() else 0.0
+                                for j in range(numeric.shape[1])])
+        self.medians = medians
+        filled = np.where(observed, numeric, medians)
+        self.means = filled.mean(axis=0) if self.scale else np.zeros(len(medians))
+        scales = filled.std(axis=0) if self.scale else np.ones(len(medians))
+        self.scales = np.where(scales > 0, scales, 1.0)
+
+        self.categories = {}
+        for column in categorical_columns:
+            counts = self._source(column, df, features).value_counts()
+            self.categories[column] = list(counts[counts > 0].index[:self.max_categories])
+
+        self.feature_names = self.numeric_columns + [f'{column}={value}' for column, values in self.categories.items()
+                                                     for value in values]
+        self.feature_names_all = list(self.feature_names)
+        self._category_positions = None
+        return self
+
+    def transform(self, df):
+        features = feature_columns(df)
+        numeric = np.column_stack([features[column] for column in self.numeric_columns]).astype(float)
+        numeric = (np.where(np.isnan(numeric), self.medians, numeric) - self.means) / self.scales
+
+        # One-hot columns are filled into a single preallocated block; only
+        # each column's distinct values are looked up in the fitted categories
+        one_hot = np.zeros((len(df), len(self.feature_names_all) - numeric.shape[1]), dtype=np.float32)
+        rows = np.arange(len(df))
+        for column, (offset, positions) in self.category_positions().items():
+            values = self._source(column, df, features)
+            if values is None:
+                continue
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+            # The trailing -1 keeps the missing-value code unmatched
+            lookup = np.array([positions.get(value, -1) for value in uniques] + [-1])
+            codes = lookup[codes]
+            hit = codes >= 0
+            one_hot[rows[hit], offset + codes[hit]] = 1
+        matrix = np.hstack([numeric.astype(np.float32), one_hot])
+        return matrix if self.selected is None else matrix[:, self.selected]
+
+    def category_positions(self):
+        """Column -> (offset in the one-hot block, {category: position}), built once"""
+        if getattr(self, '_category_positions', None) is None:
+            self._category_positions, offset = {}, 0
+            for column, values in self.categories.items():
+                self._category_positions[column] = (offset, {value: i for i, value in enumerate(values)})
+                offset += len(values)
+        return self._category_positions
+
+    def fit_transform(self, df, y=None):
+        return self.fit(df, y).transform(df)
+
+    def select(self, indices):
+        """Copy whose transform returns only the given feature columns"""
+        selected = StudentPreprocessor(self.one_hot_columns, self.max_categories, self.scale)
+        selected.__dict__.update(self.__dict__)
+        selected.selected = np.asarray(indices)
+        selected.feature_names = [self.feature_names[i] for i in indices]
+        return selected
+
+
+def at_risk_target(df):
+    return df[TARGET_COLUMN].isin(AT_RISK_STATUSES).to_numpy()
+
+
+def balanced_class_weight(y):
+    """'balanced' weights fixed up front (warm-started forests must not recompute them)"""
+    classes = np.unique(y)
+    return dict(zip(classes.tolist(), compute_class_weight('balanced', classes=classes, y=y)))
+
+
+def feature_cache_key(paths, config):
+    """Content hash of the data files, the preprocessing config and the feature code"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256(f'v{FEATURE_CACHE_VERSION}'.encode())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    digest.update(code_digest([os.path.join(here, f'{module}.py') for module in FEATURE_CODE_MODULES]).encode())
+    digest.update(inspect.getsource(StudentPreprocessor).encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def build_feature_cache(train_path, test_path, config=PREPROCESSING_CONFIG, use_cache=True):
+    """Path of the cached encoded train/test matrices, building them on a miss
+
+    The entry holds the fitted preprocessor, X/y for train and test and the
+    feature names; arrays are stored uncompressed so workers can memory-map
+    them.
+    """
+
+    key = feature_cache_key([train_path, test_path], config)
+    cache_path = os.path.join(FEATURE_CACHE_DIR, f'features_{key}.joblib')
+    if use_cache and os.path.exists(cache_path):
+        logger.info(f"✓ Reused cached feature matrix {cache_path}")
+        return cache_path
+
+    start = time.perf_counter()
+    train, test = read_dataset(train_path), read_dataset(test_path)
+    preprocessor = StudentPreprocessor(**config)
+    entry = {
+        'preprocessor': preprocessor.fit(train),
+        'X_train': preprocessor.transform(train), 'y_train': at_risk_target(train),
+        'X_test': preprocessor.transform(test), 'y_test': at_risk_target(test),
+        'feature_names': preprocessor.feature_names,
+    }
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    joblib.dump(entry, tmp_path)
+    os.replace(tmp_path, cache_path)
+    logger.info(f"✓ Encoded {entry['X_train'].shape[0]} + {entry['X_test'].shape[0]} students into "
+                f"{entry['X_train'].shape[1]} features in {time.perf_counter() - start:.2f}s → {cache_path}")
+    return cache_path
+
+
+def rank_features(X, y, random_state=42):
+    """Random Forest importance ranking (Step 7.2) minus redundant features (Step 7.3)
+
+    Constant columns are dropped, then features are kept in importance order
+    unless they correlate above CORRELATION_THRESHOLD with one already kept.
+    """
+
+    forest = RandomForestClassifier(n_estimators=100, min_samples_leaf=5, class_weight='balanced',
+                                    random_state=random_state, n_jobs=-1).fit(X, y)
+    importances = forest.feature_importances_
+    varying = X.std(axis=0) > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = np.nan_to_num(np.abs(np.corrcoef(X[:, varying], rowvar=False)))
+    position = np.cumsum(varying) - 1
+
+    kept = []
+    for index in np.argsort(-importances, kind='stable'):
+        if not varying[index]:
+            continue
+        if all(correlation[position[index], position[other]] <= CORRELATION_THRESHOLD for other in kept):
+            kept.append(index)
+    return np.array(kept), importances
+
+
+# Search data shared by each worker process (memory-mapped from the cache)
+_search_data = None
+
+
+def _init_search_worker(cache_path, fit_rows, validation_rows):
+    global _search_data
+    entry = joblib.load(cache_path, mmap_mode='r')
+    X, y = entry['X_train'], entry['y_train']
+    _search_data = (X[fit_rows], y[fit_rows], X[validation_rows], y[validation_rows])
+
+
+def evaluate_candidate(candidate):
+    """Grow one candidate forest until validation AUC stops improving"""
+
+    X_fit, y_fit, X_val, y_val = _search_data
+    features = candidate['features']
+    start = time.perf_counter()
+    forest = RandomForestClassifier(n_estimators=0, warm_start=True, class_weight=balanced_class_weight(y_fit),
+                                    random_state=candidate['random_state'], n_jobs=1, **candidate['params'])
+    best_auc, best_trees, stale, history = -np.inf, 0, 0, []
+    for trees in range(TREE_STEP, MAX_TREES + 1, TREE_STEP):
+        forest.set_params(n_estimators=trees)
+        forest.fit(X_fit[:, features], y_fit)
+        auc = roc_auc_score(y_val, forest.predict_proba(X_val[:, features])[:, 1])
+        history.append(round(float(auc), 5))
+        if auc > best_auc + MIN_DELTA:
+            best_auc, best_trees, stale = auc, trees, 0
+        else:
+            stale += 1
+            if stale >= PATIENCE:
+                break
+    return {'subset': candidate['subset'], 'params': candidate['params'], 'validation_auc': float(best_auc),
+            'n_estimators': best_trees, 'auc_history': history, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def search_candidates(cache_path, candidates, fit_rows, validation_rows, workers):
+    """Evaluate candidates across a process pool (in process for workers=1)"""
+
+    if workers <= 1:
+        _init_search_worker(cache_path, fit_rows, validation_rows)
+        return [evaluate_candidate(candidate) for candidate in candidates]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker,
+                             initargs=(cache_path, fit_rows, validation_rows)) as pool:
+        return list(pool.map(evaluate_candidate, candidates))
+
+
+def train_model(train_path=TRAIN_PATH, test_path=TEST_PATH, output_dir='models', workers=None,
+                top_n=TOP_N_FEATURES, use_cache=True, random_state=42):
+    """Run the full training pipeline and write the scoring artifacts"""
+
+    workers = workers or os.cpu_count()
+    cache_path = build_feature_cache(train_path, test_path, PREPROCESSING_CONFIG, use_cache)
+    entry = joblib.load(cache_path, mmap_mode='r')
+    X_train, y_train = entry['X_train'], entry['y_train']
+    names = entry['feature_names']
+
+    # Feature subsets from the importance ranking
+    start = time.perf_counter()
+    ranking, importances = rank_features(np.asarray(X_train), y_train, random_state)
+    subsets = {'all': np.arange(X_train.shape[1]), 'decorrelated': np.sort(ranking)}
+    for n in top_n:
+        if n < len(ranking):
+            subsets[f'top_{n}'] = np.sort(ranking[:n])
+    logger.info(f"✓ Ranked {len(names)} features ({len(ranking)} kept after correlation pruning) "
+                f"in {time.perf_counter() - start:.2f}s")
+
+    # Hyperparameter x feature subset search on a stratified validation split
+    fit_rows, validation_rows = train_test_split(np.arange(len(y_train)), test_size=0.2, stratify=y_train,
+                                                 random_state=random_state)
+    candidates = [
+        {'subset': subset, 'features': features, 'params': dict(zip(SEARCH_GRID, values)),
+         'random_state': random_state}
+        for subset, features in subsets.items() for values in itertools.product(*SEARCH_GRID.values())
+    ]
+    start = time.perf_counter()
+    results = search_candidates(cache_path, candidates, fit_rows, validation_rows, workers)
+    results.sort(key=lambda result: -result['validation_auc'])
+    best = results[0]
+    logger.info(f"✓ Searched {len(candidates)} candidates on {workers} worker(s) in {time.perf_counter() - start:.2f}s; "
+                f"best {best['subset']} {best['params']} with {best['n_estimators']} trees "
+                f"(validation AUC {best['validation_auc']:.4f})")
+
+    # Refit the winner on the whole training set and evaluate on the test set
+    features = subsets[best['subset']]
+    model = RandomForestClassifier(n_estimators=best['n_estimators'], class_weight='balanced',
+                                   random_state=random_state, n_jobs=-1, **best['params'])
+    model.fit(X_train[:, features], y_train)
+    X_test, y_test = entry['X_test'][:, features], entry['y_test']
+    scores = model.predict_proba(X_test)[:, 1]
+    predicted = scores >= 0.5
+    metrics = {
+        'test_auc': float(roc_auc_score(y_test, scores)) if len(set(y_test)) > 1 else None,
+        'test_accuracy': float(accuracy_score(y_test, predicted)),
+        'test_precision': float(precision_score(y_test, predicted, zero_division=0)),
+        'test_recall': float(recall_score(y_test, predicted, zero_division=0)),
+    }
+    logger.info("✓ Test set: " + ', '.join(f"{key[5:]} {value:.4f}" for key, value in metrics.items() if value is not None))
+
+    # Scoring artifacts: the preprocessor narrowed to the winning subset, and the model
+    os.makedirs(output_dir, exist_ok=True)
+    pipeline_path = os.path.join(output_dir, os.path.basename(PIPELINE_PATH))
+    model_path = os.path.join(output_dir, os.path.basename(MODEL_PATH))
+    joblib.dump(entry['preprocessor'].select(features), pipeline_path)
+    model.set_params(n_jobs=1)
+    joblib.dump(model, model_path)
+
+    report = {
+        'train_path': train_path, 'test_path': test_path, 'feature_cache': cache_path,
+        'target': f"{TARGET_COLUMN} in {AT_RISK_STATUSES}",
+        'best': best, 'features': [names[i] for i in features], **metrics,
+        'feature_importance': {names[i]: float(importances[i]) for i in np.argsort(-importances)},
+        'search': results,
+    }
+    report_path = os.path.join(output_dir, 'training_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Saved {pipeline_path}, {model_path} and {report_path}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the student risk model with a parallel hyperparameter search")
+    parser.add_argument('--train', default=TRAIN_PATH, help=f"training dataset (default: {TRAIN_PATH})")
+    parser.add_argument('--test', default=TEST_PATH, help=f"test dataset (default: {TEST_PATH})")
+    parser.add_argument('--output-dir', default='models', help="where the artifacts are written (default: models)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="search processes (default: one per CPU)")
+    parser.add_argument('--top-n', type=int, nargs='*', default=TOP_N_FEATURES,
+                        help=f"feature subset sizes to search besides all features (default: {TOP_N_FEATURES})")
+    parser.add_argument('--no-cache', action='store_true', help="re-encode the feature matrix even if cached")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    # Go through the importable module so the pickled preprocessor refers to
+    # model_training.StudentPreprocessor rather than __main__
+    import model_training
+    model_training.train_model(args.train, args.test, args.output_dir, args.workers, args.top_n, not args.no_cache)
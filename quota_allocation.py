@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Quota Allocation
+Exact-count stratified assignment of category labels (risk levels,
+submission patterns, ...) with optional eligibility constraints
+"""
+
+import numpy as np
+
+
+def quota_counts(n, proportions):
+    """Exact integer counts per category that sum to n
+
+    Uses the largest remainder method: every category gets the floor of its
+    share and the leftover slots go to the largest fractional parts, ties
+    broken by category order.
+    """
+
+    categories = list(proportions)
+    shares = np.array([proportions[c] for c in categories], dtype=float)
+    shares = shares / shares.sum() * n
+
+    counts = np.floor(shares).astype(int)
+    leftover = n - counts.sum()
+    if leftover > 0:
+        order = np.argsort(-(shares - counts), kind='stable')
+        counts[order[:leftover]] += 1
+
+    return {category: int(count) for category, count in zip(categories, counts)}
+
+
+def split_quota(rng, remaining, n):
+    """Draw the category counts for the next n slots without replacement
+
+    Decrements ``remaining`` in place, so drawing chunk after chunk until it
+    is exhausted reproduces the whole-run totals exactly.
+    """
+
+    counts = {}
+    left = sum(remaining.values())
+    for category, count in remaining.items():
+        left -= count
+        if n == 0 or count == 0:
+            take = 0
+        elif left == 0:
+            take = n
+        else:
+            take = int(rng.hypergeometric(count, left, n))
+        counts[category] = take
+        remaining[category] -= take
+        n -= take
+    return counts
+
+
+def assign_quota(rng, counts, eligible=None):
+    """Assign exactly counts[category] labels across sum(counts) items
+
+    ``eligible`` maps a category to a boolean mask of the items allowed to
+    take it. Constrained categories are filled first, at random from their
+    eligible items that are still free, topping up from the other free items
+    only if too few are eligible. Unconstrained categories then share the
+    rest at random. Runs in O(n) with masks and one permutation per category.
+    """
+
+    eligible = eligible or {}
+    n = sum(counts.values())
+    labels = np.empty(n, dtype=object)
+    assigned = np.zeros(n, dtype=bool)
+
+    for category, mask in eligible.items():
+        count = counts[category]
+        preferred = rng.permutation(np.flatnonzero(mask & ~assigned))[:count]
+        if len(preferred) < count:
+            others = rng.permutation(np.flatnonzero(~mask & ~assigned))[:count - len(preferred)]
+            preferred = np.concatenate([preferred, others])
+        labels[preferred] = category
+        assigned[preferred] = True
+
+    free = rng.permutation(np.flatnonzero(~assigned))
+    start = 0
+    for category, count in counts.items():
+        if category in eligible:
+            continue
+        labels[free[start:start + count]] = category
+        start += count
+
+    return labels
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Scoring Service
+Loads the fitted preprocessing pipeline and risk model once and scores
+students: single records over a local HTTP endpoint (micro-batched, with
+p50/p99 latency metrics), or whole cohorts in bulk batches from the CLI
+"""
+
+import argparse
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+from columnar_export import FILE_EXTENSIONS, open_dataset_writer, read_dataset_chunks
+from student_features import has_column
+
+logger = logging.getLogger(__name__)
+
+# Artifacts written by model training (Step 8 outputs)
+PIPELINE_PATH = 'models/preprocessing_pipeline.pkl'
+MODEL_PATH = 'models/risk_model.pkl'
+
+# Batches up to this size walk a forest's trees directly instead of going
+# through predict_proba, whose per-call dispatch costs ~5ms for 50 trees
+DIRECT_FOREST_ROWS = 256
+
+
+def forest_trees(model):
+    """The fitted trees of a plain single-output random or extra-trees forest, else None
+
+    Only these exact classes are walked directly (a subclass may change how
+    probabilities are formed); anything else is scored through predict_proba.
+    """
+
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+    if type(model) not in (RandomForestClassifier, ExtraTreesClassifier) or getattr(model, 'n_outputs_', None) != 1:
+        return None
+    trees = getattr(model, 'estimators_', None)
+    if not trees or not all(callable(getattr(getattr(tree, 'tree_', None), 'predict', None)) for tree in trees):
+        return None
+    return trees
+
+
+class LatencyTracker:
+    """Thread-safe latency samples over a sliding window, summarized as percentiles"""
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def summary(self):
+        with self.lock:
+            samples = np.array(self.samples) * 1000
+            count = self.count
+        if len(samples) == 0:
+            return {'count': count, 'p50_ms': None, 'p99_ms': None, 'mean_ms': None}
+        p50, p99 = np.percentile(samples, [50, 99])
+        return {'count': count, 'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3),
+                'mean_ms': round(float(samples.mean()), 3)}
+
+
+class RiskScorer:
+    """Fitted preprocessing pipeline plus classifier, loaded once
+
+    The pipeline maps raw student records (the exported dataset's columns)
+    to the model's feature matrix; the risk score is the model's probability
+    of positive_class (by default its last class). Records must carry every
+    raw column the pipeline was fitted on (values may be null).
+    """
+
+    def __init__(self, pipeline_path=PIPELINE_PATH, model_path=MODEL_PATH, positive_class=None):
+        self.pipeline = joblib.load(pipeline_path)
+        self.model = joblib.load(model_path)
+        classes = list(self.model.classes_)
+        self.positive_index = classes.index(positive_class) if positive_class is not None else len(classes) - 1
+        self.trees = forest_trees(self.model)
+        self.input_columns = getattr(self.pipeline, 'input_columns', None)
+        if self.input_columns is None:
+            logger.warning(f"! {pipeline_path} does not record its input columns; retrain to validate records")
+            self.input_columns = []
+        logger.info(f"✓ Loaded preprocessing pipeline {pipeline_path} and model {model_path}")
+
+    def check_records(self, records):
+        """Raise ValueError unless records is a non-empty list of objects with every input column"""
+
+        if not isinstance(records, list) or not records:
+            raise ValueError("expected a student record (JSON object) or a non-empty list of them")
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise ValueError(f"record {i} is not a JSON object")
+            missing = [column for column in self.input_columns if not has_column(record, column)]
+            if missing:
+                raise ValueError(f"record {i} is missing {', '.join(missing)}")
+
+    def predict_proba(self, features):
+        """Positive-class probabilities; small batches through a forest's trees directly
+
+        Sums the trees' normalised leaf values in estimator order, exactly
+        as the forest's own predict_proba does, so the scores are identical.
+        """
+
+        trees = self.trees
+        if trees is None or len(features) > DIRECT_FOREST_ROWS:
+            return self.model.predict_proba(features)[:, self.positive_index]
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        n_classes = self.model.n_classes_
+        total = np.zeros((len(features), n_classes))
+        for tree in trees:
+            proba = tree.tree_.predict(features)[:, :n_classes]
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            total += proba / normalizer
+        return total[:, self.positive_index] / len(trees)
+
+    def score_frame(self, df):
+        """Risk scores for every row of a frame of student records"""
+        return self.predict_proba(self.pipeline.transform(df))
+
+    def score_records(self, records):
+        """Score a list of record dicts, returning one result dict each"""
+        self.check_records(records)
+        df = pd.DataFrame.from_records(records)
+        scores = self.score_frame(df)
+        ids = df['student_id'].tolist() if 'student_id' in df.columns else [None] * len(df)
+        return [{'student_id': student_id, 'risk_score': float(score)} for student_id, score in zip(ids, scores)]
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-record requests into batched scorer calls
+
+    One worker thread takes the first waiting request, then everything else
+    already queued (up to max_batch), waiting at most max_wait seconds for
+    more; with max_wait=0 a lone request is scored immediately and batches
+    only form under load. Records are checked before they are queued, and
+    if a batch still fails its records are rescored one at a time, so a bad
+    request only fails itself.
+    """
+
+    def __init__(self, scorer, max_batch=64, max_wait=0.0):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.latency = LatencyTracker()
+        self.batch_sizes = deque(maxlen=10000)
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self.worker.start()
+
+    def submit(self, record):
+        self.scorer.check_records([record])
+        future = Future()
+        self.requests.put((record, future, time.perf_counter()))
+        return future
+
+    def score(self, record, timeout=None):
+        return self.submit(record).result(timeout)
+
+    def close(self):
+        self.requests.put(None)
+        self.worker.join()
+
+    def _next_batch(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Leave the shutdown marker for the main loop
+                self.requests.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            batch = self._next_batch(first)
+            try:
+                results = self.scorer.score_records([record for record, _, _ in batch])
+            except Exception as error:
+                results = [error] if len(batch) == 1 else [self._score_one(record) for record, _, _ in batch]
+            done = time.perf_counter()
+            for (_, future, start), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                    continue
+                future.set_result(result)
+                self.latency.record(done - start)
+            self.batch_sizes.append(len(batch))
+
+    def _score_one(self, record):
+        """One record's result, or the exception scoring it raised"""
+        try:
+            return self.scorer.score_records([record])[0]
+        except Exception as error:
+            return error
+
+    def metrics(self):
+        sizes = np.array(self.batch_sizes)
+        return {
+            'latency': self.latency.summary(),
+            'batches': len(sizes),
+            'mean_batch_size': round(float(sizes.mean()), 2) if len(sizes) else None,
+            'max_batch_size': int(sizes.max()) if len(sizes) else None,
+        }
+
+
+def make_handler(batcher):
+    """HTTP handler bound to a batcher
+
+    POST /score takes one record (a JSON object, micro-batched) or a list
+    of records (scored as one batch); GET /metrics reports latency and
+    batching; GET /health is a liveness check.
+    """
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            elif self.path == '/metrics':
+                self._send(200, batcher.metrics())
+            else:
+                self._send(404, {'error': f'unknown path {self.path}'})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._send(404, {'error': f'unknown path {self.path}'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if isinstance(payload, list):
+                    result = batcher.scorer.score_records(payload)
+                else:
+                    result = batcher.score(payload)
+            except (ValueError, KeyError, TypeError) as error:
+                self._send(400, {'error': str(error)})
+                return
+            except Exception as error:
+                logger.exception("! Scoring request failed")
+                self._send(500, {'error': f'{type(error).__name__}: {error}'})
+                return
+            self._send(200, result)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ScoringHandler
+
+
+def serve(scorer, host='127.0.0.1', port=8765, max_batch=64, max_wait=0.0):
+    """Run the HTTP scoring endpoint until interrupted"""
+
+    batcher = MicroBatcher(scorer, max_batch, max_wait)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    logger.info(f"✓ Scoring service listening on http://{host}:{port} (POST /score, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        logger.info(f"✓ Served {json.dumps(batcher.metrics())}")
+
+
+def score_dataset(scorer, input_path, output_path, file_format='csv', chunk_size=100000):
+    """Bulk-score a CSV, Parquet or Feather dataset chunk by chunk"""
+
+    rows = 0
+    start = time.perf_counter()
+    with open_dataset_writer(output_path, file_format) as writer:
+        for chunk in read_dataset_chunks(input_path, chunk_size):
+            writer.write(pd.DataFrame({'student_id': chunk['student_id'].to_numpy(),
+                                       'risk_score': scorer.score_frame(chunk)}))
+            rows += len(chunk)
+    elapsed = time.perf_counter() - start
+    logger.info(f"✓ Scored {rows} students in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s) → {output_path}")
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score student risk with the fitted preprocessing pipeline and model")
+    parser.add_argument('--pipeline', default=PIPELINE_PATH, help=f"preprocessing pipeline (default: {PIPELINE_PATH})")
+    parser.add_argument('--model', default=MODEL_PATH, help=f"fitted classifier (default: {MODEL_PATH})")
+    parser.add_argument('--positive-class', default=None,
+                        help="class whose probability is the risk score (default: the model's last class)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    server = commands.add_parser('serve', help="run the local HTTP endpoint")
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8765)
+    server.add_argument('--max-batch', type=int, default=64,
+                        help="most requests scored together (default: 64)")
+    server.add_argument('--max-wait-ms', type=float, default=0.0,
+                        help="how long a request may wait for others to join its batch (default: 0)")
+
+    batch = commands.add_parser('batch', help="score a whole dataset file")
+    batch.add_argument('input', help="CSV, Parquet or Feather student dataset")
+    batch.add_argument('--output', default='risk_scores.csv', help="scores file (default: risk_scores.csv)")
+    batch.add_argument('--format', dest='file_format', choices=list(FILE_EXTENSIONS), default='csv')
+    batch.add_argument('--chunk-size', type=int, default=100000)
+
+    single = commands.add_parser('score', help="score one student given as a JSON record")
+    single.add_argument('record', help="JSON object with the student's dataset columns")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    scorer = RiskScorer(args.pipeline, args.model, args.positive_class)
+
+    if args.command == 'serve':
+        serve(scorer, args.host, args.port, args.max_batch, args.max_wait_ms / 1000)
+    elif args.command == 'batch':
+        score_dataset(scorer, args.input, args.output, args.file_format, args.chunk_size)
+    else:
+        start = time.perf_counter()
+        result = scorer.score_records([json.loads(args.record)])[0]
+        print(json.dumps({**result, 'latency_ms': round((time.perf_counter() - start) * 1000, 3)}))
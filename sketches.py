@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Sketches
+Mergeable constant-memory summaries for approximate profiling of very large
+datasets: HyperLogLog distinct counts, KLL quantiles and Count-Min
+frequencies with top-k heavy hitters, each sized from an error bound
+"""
+
+import math
+import numpy as np
+import pandas as pd
+
+# Keys for the hash functions; sketches built with the same parameters
+# hash identically, which is what makes them mergeable
+HASH_KEY = '5eed0fa11c0ffee5'
+ROW_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5,
+                            0x85EBCA77C2B2AE63, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0xD6E8FEB86659FD93],
+                           dtype=np.uint64)
+
+
+def hash_values(values):
+    """Stable 64-bit hashes of arbitrary values (categoricals hash their categories once)"""
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        values = pd.Categorical(values)
+        category_hashes = pd.util.hash_array(np.asarray(values.categories, dtype=object), hash_key=HASH_KEY)
+        return category_hashes[values.codes[values.codes >= 0]]
+    values = np.asarray(values, dtype=object)
+    return pd.util.hash_array(values[pd.notna(values)], hash_key=HASH_KEY)
+
+
+class HyperLogLog:
+    """Distinct count estimate with relative standard error ~1.04/sqrt(2**precision)"""
+
+    def __init__(self, relative_error=0.01):
+        self.precision = min(18, max(4, math.ceil(2 * math.log2(1.04 / relative_error))))
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values):
+        return self.update_hashes(hash_values(values))
+
+    def update_hashes(self, hashes):
+        if len(hashes) == 0:
+            return self
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - p)) - 1)
+        # Rank is the position of the first set bit in the remaining 64-p bits
+        bit_length = np.frexp(remainder.astype(np.float64))[1]
+        rank = (64 - p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return m * math.log(m / zeros)
+        return float(raw)
+
+
+class KllSketch:
+    """Quantile sketch with normalized rank error ~rank_error (Karnin-Lang-Liberty)
+
+    Items are kept in compactor levels; a full level is sorted and every
+    other item (random offset) is promoted to the next level with double
+    weight.
+    """
+
+    def __init__(self, rank_error=0.01, seed=0):
+        # Empirical KLL bound: rank error ~ 2.296 / k**0.9723
+        self.k = max(8, math.ceil((2.296 / rank_error) ** (1 / 0.9723)))
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+        return self
+
+    def compress(self):
+        while True:
+            full = [level for level in range(len(self.levels)) if len(self.levels[level]) > self.capacity(level)]
+            if not full:
+                return
+            level = full[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            odd = len(items) % 2
+            promoted = items[odd:][int(self.rng.integers(2))::2]
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def _sorted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        if self.n == 0:
+            return None
+        items, cumulative = self._sorted()
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(items[min(position, len(items) - 1)])
+
+    def cdf(self, x):
+        """Estimated fraction of items <= x"""
+        if self.n == 0:
+            return 0.0
+        items, cumulative = self._sorted()
+        position = np.searchsorted(items, x, side='right')
+        return float(cumulative[position - 1] / cumulative[-1]) if position else 0.0
+
+    def bin_counts(self, edges):
+        """Estimated counts for right-closed bins (edges[i], edges[i + 1]], as pd.cut"""
+        fractions = np.diff([self.cdf(edge) for edge in edges])
+        return [int(round(fraction * self.n)) for fraction in fractions]
+
+
+class CountMinTopK:
+    """Count-Min frequency estimates plus the top_k most frequent values
+
+    Estimates never undercount and overcount by at most frequency_error * N
+    with probability 1 - confidence_failure.
+    """
+
+    def __init__(self, frequency_error=0.001, confidence_failure=0.01, top_k=50):
+        self.width = math.ceil(math.e / frequency_error)
+        self.depth = min(len(ROW_MULTIPLIERS), math.ceil(math.log(1 / confidence_failure)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.top_k = top_k
+        self.total = 0
+        self.candidates = {}
+
+    def _columns(self, hashes):
+        with np.errstate(over='ignore'):
+            mixed = hashes[None, :] * ROW_MULTIPLIERS[:self.depth, None]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts()
+        return self.update_counts(counts.index, counts.to_numpy())
+
+    def update_counts(self, values, counts):
+        """Add pre-aggregated (value, count) pairs, e.g. one chunk's value_counts"""
+        values = np.asarray(values, dtype=object)
+        counts = np.asarray(counts, dtype=np.int64)
+        keep = counts > 0
+        values, counts = values[keep], counts[keep]
+        if len(values) == 0:
+            return self
+        columns = self._columns(pd.util.hash_array(values, hash_key=HASH_KEY))
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        self.total += int(counts.sum())
+        self._refresh_candidates(values)
+        return self
+
+    def estimate(self, values):
+        values = np.asarray(values, dtype=object)
+        if len(values) == 0:
+            return np.empty(0, dtype=np.int64)
+        columns = self._columns(pd.util.hash_array(values, hash_key=HASH_KEY))
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def _refresh_candidates(self, values):
+        pool = np.array(list(dict.fromkeys(list(self.candidates) + list(values))), dtype=object)
+        estimates = self.estimate(pool)
+        order = np.argsort(-estimates, kind='stable')[:self.top_k]
+        self.candidates = {pool[i]: int(estimates[i]) for i in order}
+
+    def merge(self, other):
+        self.table += other.table
+        self.total += other.total
+        self._refresh_candidates(np.array(list(other.candidates), dtype=object))
+        return self
+
+    def top(self):
+        """Heavy hitters with their estimated counts, most frequent first"""
+        return dict(self.candidates)
+
+    @property
+    def max_overcount(self):
+        return math.ceil(math.e / self.width * self.total)
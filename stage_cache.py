@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Stage Cache
+On-disk memoization of the generator's pipeline stages. Each entry is a
+stage's output plus the random stream state after it, keyed by the stage's
+code and parameters, the random state it started from and the key of the
+stage before it, so a changed knob only re-runs its own stage and the ones
+downstream. Least recently used entries are evicted past a size or count
+limit.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+
+STAGE_CACHE_DIR = '.cache/stages'
+STAGE_CACHE_VERSION = 1
+DEFAULT_MAX_MB = 2048
+
+_code_digests = {}
+
+
+def stage_key(*parts):
+    """Short content hash of JSON-serialisable key parts"""
+    digest = hashlib.sha256(f'v{STAGE_CACHE_VERSION}'.encode())
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()[:24]
+
+
+def code_digest(filenames):
+    """Content hash of source files, read once per process"""
+
+    key = tuple(filenames)
+    if key not in _code_digests:
+        digest = hashlib.sha256()
+        for filename in filenames:
+            with open(filename, 'rb') as f:
+                digest.update(f.read())
+            digest.update(b'\0')
+        _code_digests[key] = digest.hexdigest()[:24]
+    return _code_digests[key]
+
+
+class StageCache:
+    """Pickled stage outputs under path, evicted least recently used first
+
+    An entry's modification time is its last use (hits touch it), so the
+    cache needs no index file and several processes can share it: entries
+    are written to a temporary name and renamed into place.
+    """
+
+    def __init__(self, path=STAGE_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 2**20, max_entries=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, key):
+        return os.path.join(self.path, f'{key}.pkl')
+
+    def get(self, key):
+        """(output, rng_state) for key, or None on a miss"""
+
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return entry
+
+    def put(self, key, output, rng_state):
+        os.makedirs(self.path, exist_ok=True)
+        path = self.entry_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((output, rng_state), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def entries(self):
+        """(path, size, last used) of every entry, least recently used first"""
+
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        """Drop least recently used entries until within max_bytes and max_entries"""
+
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and (total > self.max_bytes or (self.max_entries is not None and len(entries) > self.max_entries)):
+            path, size, _ = entries.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            os.remove(path)
+
+    def stats(self):
+        entries = self.entries()
+        return {'entries': len(entries), 'mb': round(sum(size for _, size, _ in entries) / 2**20, 1),
+                'hits': self.hits, 'misses': self.misses}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect or clear the generator's stage cache")
+    parser.add_argument('command', choices=['info', 'clear'])
+    parser.add_argument('--path', default=STAGE_CACHE_DIR, help=f"cache directory (default: {STAGE_CACHE_DIR})")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cache = StageCache(args.path)
+    if args.command == 'clear':
+        count = len(cache.entries())
+        cache.clear()
+        print(f"✓ Removed {count} cached stage outputs from {args.path}")
+    else:
+        stats = cache.stats()
+        print(f"✓ {args.path}: {stats['entries']} entries, {stats['mb']} MB")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Stage Profiling
+Instrumentation hooks around generator stages, with a profiler that records
+elapsed time, tracemalloc memory and row counts and writes JSON or Chrome
+trace files
+"""
+
+import json
+import os
+import time
+import tracemalloc
+
+
+class StageHook:
+    """Base class for hooks called around every generator stage
+
+    ``context`` carries the stage's row count (``rows``), whether its output
+    came from the stage cache (``cached``) and, in chunked runs, the chunk
+    index (``chunk``).
+    """
+
+    def on_stage_start(self, stage, context):
+        pass
+
+    def on_stage_end(self, stage, context):
+        pass
+
+
+class StageProfiler(StageHook):
+    """Record elapsed time, memory and rows for each stage run
+
+    With trace_memory=True tracemalloc is started on first use and each
+    record carries the stage's peak allocation above its starting point and
+    the memory it left allocated. Tracing slows generation down noticeably,
+    so it can be turned off to keep timings only.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._open = []
+
+    def on_stage_start(self, stage, context):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        memory = None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+        self._open.append((stage, time.time(), time.perf_counter(), memory))
+
+    def on_stage_end(self, stage, context):
+        name, wall_start, start, memory = self._open.pop()
+        record = {
+            'stage': name,
+            'start': wall_start,
+            'seconds': time.perf_counter() - start,
+            'rows': context.get('rows'),
+            'chunk': context.get('chunk'),
+            'cached': context.get('cached', False),
+            'pid': os.getpid()
+        }
+        if memory is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            record['allocated_mb'] = (peak - memory) / 2**20
+            record['retained_mb'] = (current - memory) / 2**20
+        self.records.append(record)
+
+    def drain(self):
+        """Hand over and clear the records (used to ship shard records back)"""
+        records, self.records = self.records, []
+        return records
+
+    def absorb(self, records):
+        """Add records drained from another process's profiler"""
+        self.records.extend(records)
+
+    def summary(self):
+        """Total seconds, rows and peak allocation per stage across all runs"""
+        totals = {}
+        for record in self.records:
+            stage = totals.setdefault(record['stage'], {'runs': 0, 'cached': 0, 'seconds': 0.0, 'rows': 0,
+                                                        'allocated_mb': 0.0})
+            stage['runs'] += 1
+            stage['cached'] += bool(record.get('cached'))
+            stage['seconds'] += record['seconds']
+            stage['rows'] += record['rows'] or 0
+            stage['allocated_mb'] = max(stage['allocated_mb'], record.get('allocated_mb', 0.0))
+        return totals
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'records': self.records}, f, indent=2)
+
+    def write_chrome_trace(self, path):
+        """Write the records in Chrome trace event format (chrome://tracing, Perfetto)"""
+        events = []
+        for record in self.records:
+            events.append({
+                'name': record['stage'],
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': record['start'] * 1e6,
+                'dur': record['seconds'] * 1e6,
+                'pid': record['pid'],
+                'tid': record['chunk'] if record['chunk'] is not None else 0,
+                'args': {key: value for key, value in record.items()
+                         if key in ('rows', 'chunk', 'cached', 'allocated_mb', 'retained_mb')}
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def write(self, path, trace_format='json'):
+        if trace_format == 'chrome':
+            self.write_chrome_trace(path)
+        else:
+            self.write_json(path)
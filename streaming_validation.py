@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Streaming Validation
+Accumulator-based data quality statistics for the synthetic student dataset,
+updated chunk by chunk and mergeable across parallel shards
+"""
+
+import json
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns tracked with running moments
+NUMERIC_COLUMNS = [
+    f'subject_{subject_num}_assess_{assess_num}' for subject_num in range(1, 4) for assess_num in (1, 2)
+] + [f'attendance_{subject_num}' for subject_num in range(1, 4)]
+
+# Categorical columns tracked with value counts
+COUNTED_COLUMNS = ['risk_level', 'academic_status', 'follow_up', 'submission_pattern', 'course']
+
+# Columns whose missing values are counted
+MISSING_COLUMNS = ['failed_subjects', 'study_skills(attended)', 'referral', 'subject_1_assess_1', 'subject_1_assess_2']
+
+
+def add_counts(total, counts):
+    """Add a mapping of value counts into a running total in place"""
+    for value, count in counts.items():
+        total[value] = total.get(value, 0) + int(count)
+    return total
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max, updated and merged batch-wise
+
+    Uses the pairwise update of Chan et al., so merging partial results from
+    shards gives the same answer as one pass over all the data.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        batch = RunningMoments()
+        batch.n = len(values)
+        batch.mean = values.mean()
+        batch.m2 = ((values - batch.mean) ** 2).sum()
+        batch.min = values.min()
+        batch.max = values.max()
+        return self.merge(batch)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.n = n
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1, matching pandas)"""
+        return self.m2 / (self.n - 1) if self.n > 1 else float('nan')
+
+    def to_dict(self):
+        if self.n == 0:
+            return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+        return {
+            'count': self.n,
+            'mean': float(self.mean),
+            'std': float(np.sqrt(self.variance)) if self.n > 1 else None,
+            'min': float(self.min),
+            'max': float(self.max)
+        }
+
+
+class RunningCovariance:
+    """Pairwise-complete covariance and correlation of two columns"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        keep = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[keep], y[keep]
+        if len(x) == 0:
+            return self
+        batch = RunningCovariance()
+        batch.n = len(x)
+        batch.mean_x, batch.mean_y = x.mean(), y.mean()
+        dx, dy = x - batch.mean_x, y - batch.mean_y
+        batch.m2_x, batch.m2_y, batch.c_xy = (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum()
+        return self.merge(batch)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.m2_x += other.m2_x + dx * dx * weight
+        self.m2_y += other.m2_y + dy * dy * weight
+        self.c_xy += other.c_xy + dx * dy * weight
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def correlation(self):
+        denominator = np.sqrt(self.m2_x * self.m2_y)
+        return float(self.c_xy / denominator) if self.n > 1 and denominator > 0 else float('nan')
+
+
+class ValidationAccumulator:
+    """Running data quality statistics for generated profiles
+
+    Call update() with each chunk of profiles (before export, while the
+    internal risk_level and submission_pattern columns are present), merge()
+    accumulators from other shards, then report() for the summary.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.counts = {column: {} for column in COUNTED_COLUMNS}
+        self.status_by_risk = {}
+        self.high_risk_students = 0
+        self.high_risk_followed_up = 0
+        self.non_submitters_eligible = 0
+        self.missing = {column: 0 for column in MISSING_COLUMNS}
+        self.moments = {column: RunningMoments() for column in NUMERIC_COLUMNS}
+        self.attendance_grade = RunningCovariance()
+
+    def update(self, df):
+        self.rows += len(df)
+
+        for column in COUNTED_COLUMNS:
+            if column in df.columns:
+                # Categoricals also list their unused categories; skip those
+                counts = df[column].value_counts()
+                add_counts(self.counts[column], counts[counts > 0])
+
+        for (risk, status), count in df.groupby(['risk_level', 'academic_status'], observed=True).size().items():
+            add_counts(self.status_by_risk.setdefault(risk, {}), {status: count})
+
+        high_risk = df['risk_level'].isin(['high_risk', 'critical_risk'])
+        self.high_risk_students += int(high_risk.sum())
+        self.high_risk_followed_up += int((high_risk & (df['follow_up'] == 'Yes')).sum())
+
+        if 'submission_pattern' in df.columns:
+            non_submitters = df[df['submission_pattern'] == 'none_submitted']
+            self.non_submitters_eligible += int((
+                non_submitters['student_cohort'].isin(['New', 'First year']) |
+                non_submitters['failed_subjects'].notna()
+            ).sum())
+
+        for column in MISSING_COLUMNS:
+            self.missing[column] += int(df[column].isna().sum())
+
+        for column in NUMERIC_COLUMNS:
+            self.moments[column].update(df[column].to_numpy(dtype=float))
+
+        self.attendance_grade.update(
+            df['attendance_1'].to_numpy(dtype=float), df['subject_1_assess_1'].to_numpy(dtype=float)
+        )
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column in COUNTED_COLUMNS:
+            add_counts(self.counts[column], other.counts[column])
+        for risk, statuses in other.status_by_risk.items():
+            add_counts(self.status_by_risk.setdefault(risk, {}), statuses)
+        self.high_risk_students += other.high_risk_students
+        self.high_risk_followed_up += other.high_risk_followed_up
+        self.non_submitters_eligible += other.non_submitters_eligible
+        for column in MISSING_COLUMNS:
+            self.missing[column] += other.missing[column]
+        for column in NUMERIC_COLUMNS:
+            self.moments[column].merge(other.moments[column])
+        self.attendance_grade.merge(other.attendance_grade)
+        return self
+
+    def report(self, course_resolution=None):
+        """Machine-readable summary of everything accumulated so far"""
+
+        report = {
+            'rows': self.rows,
+            'attendance_grade_correlation': self.attendance_grade.correlation,
+            'risk_distribution': self.counts['risk_level'],
+            'academic_status': self.counts['academic_status'],
+            'academic_status_by_risk': self.status_by_risk,
+            'follow_up': self.counts['follow_up'],
+            'high_risk_follow_up_rate': (
+                self.high_risk_followed_up / self.high_risk_students if self.high_risk_students else 0.0
+            ),
+            'numeric': {column: moments.to_dict() for column, moments in self.moments.items()},
+            'submission_patterns': self.counts['submission_pattern'],
+            'non_submitters': self.counts['submission_pattern'].get('none_submitted', 0),
+            'non_submitters_meeting_criteria': self.non_submitters_eligible,
+            'missing': self.missing
+        }
+
+        if course_resolution is not None:
+            resolution_counts = {}
+            for course, count in self.counts['course'].items():
+                add_counts(resolution_counts, {course_resolution.get(course, 'unresolved'): count})
+            report['course_resolution'] = resolution_counts
+            report['unresolved_courses'] = sorted(
+                course for course in self.counts['course'] if course_resolution.get(course, 'unresolved') == 'unresolved'
+            )
+
+        return report
+
+    def write_json(self, path, course_resolution=None):
+        report = self.report(course_resolution)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+        return report
+
+
+def print_validation_report(report):
+    """Log a validation report at INFO level in the generator's console format"""
+
+    rows = report['rows']
+
+    logger.info(f"✓ Attendance-grade correlation: {report['attendance_grade_correlation']:.3f} (target: ~0.44)")
+
+    logger.info(f"✓ Risk distribution:")
+    for risk, count in report['risk_distribution'].items():
+        logger.info(f"  {risk}: {count} ({count / rows * 100:.1f}%)")
+
+    logger.info(f"✓ Academic status by risk level:")
+    for risk, statuses in sorted(report['academic_status_by_risk'].items()):
+        for status, count in sorted(statuses.items(), key=lambda item: -item[1]):
+            logger.info(f"  {risk:<14} {status:<18} {count}")
+
+    logger.info(f"✓ High-risk students receiving follow-up: {report['high_risk_follow_up_rate']:.1%}")
+
+    logger.info(f"✓ Assessment score progression (Subject 1):")
+    for assess_num in (1, 2):
+        mean = report['numeric'][f'subject_1_assess_{assess_num}']['mean']
+        logger.info(f"  Assess {assess_num} mean: {mean if mean is not None else float('nan'):.1f}")
+    logger.info(f"  Assess 3: Not available (mid-semester)")
+    logger.info(f"  Assess 4: Not available (mid-semester)")
+
+    if report['submission_patterns']:
+        logger.info(f"✓ Submission pattern validation:")
+        for pattern, count in report['submission_patterns'].items():
+            logger.info(f"  {pattern}: {count} ({count / rows * 100:.1f}%)")
+        non_submitters = report['non_submitters']
+        eligible = report['non_submitters_meeting_criteria']
+        eligibility_rate = eligible / non_submitters if non_submitters > 0 else 0
+        logger.info(f"  Non-submitters meeting criteria: {eligible}/{non_submitters} ({eligibility_rate:.1%})")
+
+    missing = report['missing']
+    logger.info(f"✓ Missing data patterns:")
+    logger.info(f"  Failed subjects missing: {missing['failed_subjects']}/{rows} ({missing['failed_subjects'] / rows:.1%})")
+    logger.info(f"  Study skills missing: {missing['study_skills(attended)']}/{rows} ({missing['study_skills(attended)'] / rows:.1%})")
+    logger.info(f"  Referral missing: {missing['referral']}/{rows} ({missing['referral'] / rows:.1%})")
+    logger.info(f"  Assessment 1 missing: {missing['subject_1_assess_1']}/{rows} ({missing['subject_1_assess_1'] / rows:.1%})")
+    logger.info(f"  Assessment 2 missing: {missing['subject_1_assess_2']}/{rows} ({missing['subject_1_assess_2'] / rows:.1%})")
+
+    if 'course_resolution' in report:
+        logger.info(f"✓ Course-subject resolution:")
+        for method, count in report['course_resolution'].items():
+            logger.info(f"  {method}: {count} students")
+        if report['unresolved_courses']:
+            logger.info(f"  Unresolved courses: {', '.join(report['unresolved_courses'])}")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Student Features
+Academic performance (pipeline Step 3) and attendance (Step 4.1) features,
+computed column-wise over score and attendance matrices so millions of
+students are processed without any per-row apply, plus the keyword flags
+from text_flags
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+from columnar_export import FILE_EXTENSIONS, open_dataset_writer, read_dataset_chunks
+from student_schema import SCORE_DTYPE
+from text_flags import text_flag_columns
+
+N_SUBJECTS = 3
+N_ASSESSMENTS = 4
+
+# Thresholds from the processing pipeline specification
+PASS_MARK = 50
+FIRST_ASSESSMENT_RISK_MARK = 45
+EARLY_ATTENDANCE_RISK = 70
+CRITICAL_ATTENDANCE = 50
+# grade_variance below this marks a consistent performer (a 10-point std)
+CONSISTENCY_VARIANCE = 100
+# Mean improvement (points) beyond which the trajectory is improving/declining
+TRAJECTORY_THRESHOLD = 5
+
+# The original export names subject 3's last assessment subject_4_assess_4
+COLUMN_ALIASES = {'subject_3_assess_4': 'subject_4_assess_4'}
+
+SCORE_COLUMNS = [f'subject_{s}_assess_{a}' for s in range(1, N_SUBJECTS + 1) for a in range(1, N_ASSESSMENTS + 1)]
+ATTENDANCE_COLUMNS = [f'attendance_{s}' for s in range(1, N_SUBJECTS + 1)]
+
+
+def has_column(columns, column):
+    """True if column, or its name in the original export, is among columns"""
+    return column in columns or COLUMN_ALIASES.get(column) in columns
+
+
+def column_matrix(df, columns):
+    """Stack columns into an (n, len(columns)) float matrix, NaN for absent ones"""
+
+    # One reindex + to_numpy instead of per-column copies. Values pass through
+    # the schema's float32 so float64 input (e.g. JSON records) gives exactly
+    # the features the compact dataset does.
+    columns = [column if column in df.columns else COLUMN_ALIASES.get(column, column) for column in columns]
+    return df.reindex(columns=columns).to_numpy(dtype=SCORE_DTYPE, na_value=np.nan).astype(float)
+
+
+def score_matrix(df):
+    """Assessment scores as an (n, subjects, assessments) array"""
+    return column_matrix(df, SCORE_COLUMNS).reshape(len(df), N_SUBJECTS, N_ASSESSMENTS)
+
+
+def attendance_matrix(df):
+    """Attendance percentages as an (n, subjects) array"""
+    return column_matrix(df, ATTENDANCE_COLUMNS)
+
+
+def nan_mean(values, axis=-1):
+    """Mean over the observed values along axis, NaN where there are none"""
+    observed = ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(observed, values, 0).sum(axis=axis) / observed.sum(axis=axis)
+
+
+def nan_std(values, axis=-1, ddof=1):
+    """Standard deviation over the observed values, NaN with ddof or fewer"""
+    observed = ~np.isnan(values)
+    count = observed.sum(axis=axis)
+    mean = nan_mean(values, axis)
+    deviation = np.where(observed, values - np.expand_dims(mean, axis), 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (deviation ** 2).sum(axis=axis) / (count - ddof)
+    return np.sqrt(np.where(count > ddof, variance, np.nan))
+
+
+def nan_slope(values):
+    """Least-squares slope of values against their position on the last axis
+
+    Missing points are left out of the fit; fewer than two points give NaN.
+    """
+
+    observed = ~np.isnan(values)
+    x = np.arange(values.shape[-1], dtype=float)
+    y = np.where(observed, values, 0)
+    n = observed.sum(axis=-1)
+    sx = (observed * x).sum(axis=-1)
+    sxx = (observed * x * x).sum(axis=-1)
+    sy = y.sum(axis=-1)
+    sxy = (y * x).sum(axis=-1)
+    denominator = n * sxx - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+
+
+def nan_arg(values, pick):
+    """1-based column of the max/min observed value, 0 when a row has none"""
+    missing = np.isnan(values).all(axis=1)
+    filled = np.where(np.isnan(values), -np.inf if pick == 'max' else np.inf, values)
+    index = (filled.argmax(axis=1) if pick == 'max' else filled.argmin(axis=1)) + 1
+    return np.where(missing, 0, index)
+
+
+def academic_columns(df):
+    """Step 3 academic performance features as a dict of column arrays"""
+
+    scores = score_matrix(df)
+    features = {}
+
+    # 3.1 Grade aggregation: a subject's grade is the mean of its submitted assessments
+    grades = nan_mean(scores)
+    features['avg_subject_grade'] = nan_mean(grades)
+    features['failing_subjects_count'] = (grades < PASS_MARK).sum(axis=1)
+    grade_std = nan_std(grades)
+    features['grade_variance'] = grade_std ** 2
+    features['lowest_subject_grade'] = np.where(np.isnan(grades).all(axis=1), np.nan,
+                                                np.fmin.reduce(grades, axis=1))
+
+    # 3.2 Assessment progression, per subject
+    trend = nan_slope(scores)
+    volatility = nan_std(scores)
+    early = nan_mean(scores[:, :, :2])
+    late = nan_mean(scores[:, :, 2:])
+    improvement = late - early
+    for s in range(N_SUBJECTS):
+        prefix = f'subject_{s + 1}_'
+        features[prefix + 'assessment_trend'] = trend[:, s]
+        features[prefix + 'assessment_volatility'] = volatility[:, s]
+        features[prefix + 'early_performance'] = early[:, s]
+        features[prefix + 'late_performance'] = late[:, s]
+        features[prefix + 'improvement_rate'] = improvement[:, s]
+
+    # 3.3 Critical early warning indicators
+    first = scores[:, :, 0]
+    features['first_assessment_risk'] = (first < FIRST_ASSESSMENT_RISK_MARK).any(axis=1)
+    features['early_failure_pattern'] = (first < PASS_MARK).sum(axis=1)
+    features['assessment_1_avg'] = nan_mean(first)
+
+    # 3.4 Grade quality indicators
+    features['consistent_performer'] = features['grade_variance'] < CONSISTENCY_VARIANCE
+    features['strongest_subject'] = nan_arg(grades, 'max')
+    features['weakest_subject'] = nan_arg(grades, 'min')
+    mean_improvement = nan_mean(improvement)
+    features['grade_trajectory'] = np.select(
+        [mean_improvement > TRAJECTORY_THRESHOLD, mean_improvement < -TRAJECTORY_THRESHOLD],
+        ['improving', 'declining'], 'stable'
+    )
+
+    return features
+
+
+def attendance_columns(df):
+    """Step 4.1 attendance pattern features as a dict of column arrays"""
+
+    attendance = attendance_matrix(df)
+    return {
+        'avg_attendance': nan_mean(attendance),
+        'attendance_decline': attendance[:, 0] - attendance[:, -1],
+        'early_attendance_risk': attendance[:, 0] < EARLY_ATTENDANCE_RISK,
+        'attendance_consistency': nan_std(attendance),
+        'critical_attendance': (attendance < CRITICAL_ATTENDANCE).any(axis=1),
+    }
+
+
+def academic_features(df):
+    """Step 3 academic performance features, one row per student"""
+    return pd.DataFrame(academic_columns(df), index=df.index)
+
+
+def attendance_features(df):
+    """Step 4.1 attendance pattern features, one row per student"""
+    return pd.DataFrame(attendance_columns(df), index=df.index)
+
+
+def feature_columns(df):
+    """Academic, attendance and text features as one dict of column arrays"""
+    return {**academic_columns(df), **attendance_columns(df), **text_flag_columns(df)}
+
+
+def engineer_features(df):
+    """student_id followed by the academic, attendance and text features
+
+    Built as one frame from the column dicts; per-call overhead matters
+    when single students are scored.
+    """
+
+    columns = {'student_id': df['student_id'].to_numpy()} if 'student_id' in df.columns else {}
+    columns.update(feature_columns(df))
+    return pd.DataFrame(columns, index=df.index)
+
+
+def write_features(input_path, output_path, file_format='csv', chunk_size=100000):
+    """Compute features for a CSV, Parquet or Feather dataset chunk by chunk"""
+
+    rows = 0
+    with open_dataset_writer(output_path, file_format) as writer:
+        for chunk in read_dataset_chunks(input_path, chunk_size):
+            writer.write(engineer_features(chunk))
+            rows += len(chunk)
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compute academic, attendance and text features for a student dataset")
+    parser.add_argument('input', help="CSV, Parquet or Feather student dataset")
+    parser.add_argument('--output', default='student_features.csv',
+                        help="features file to write (default: student_features.csv)")
+    parser.add_argument('--format', dest='file_format', choices=list(FILE_EXTENSIONS), default='csv',
+                        help="output format (default: csv)")
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help="students processed per chunk (default: 100000)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rows = write_features(args.input, args.output, args.file_format, args.chunk_size)
+    print(f"✓ Computed features for {rows} students → {args.output}")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Student IDs
+Unique, random-looking student_id values from a keyed permutation of an
+ID range: the student at position i of a run gets permute(i), so IDs never
+collide, need no lookup table, and any chunk or shard can compute its own
+IDs from its starting position alone
+"""
+
+import numpy as np
+
+# The original records use 5-digit IDs; larger runs widen the range a digit
+# at a time (9 digits still fit the schema's int32)
+MIN_ID_DIGITS = 5
+MAX_ID_DIGITS = 9
+
+FEISTEL_ROUNDS = 6
+MASK_64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def id_range_for(n_students):
+    """Smallest [10**(d-1), 10**d) range with at least n_students IDs, d >= 5"""
+
+    for digits in range(MIN_ID_DIGITS, MAX_ID_DIGITS + 1):
+        low, high = 10 ** (digits - 1), 10 ** digits
+        if high - low >= n_students:
+            return low, high
+    raise ValueError(f"{n_students} students do not fit in {MAX_ID_DIGITS}-digit student IDs")
+
+
+def mix64(values):
+    """SplitMix64 finaliser: a cheap, well-spread 64-bit hash of each value"""
+
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class StudentIdAllocator:
+    """Keyed permutation of the IDs in [low, high)
+
+    A balanced Feistel network over the smallest even number of bits that
+    covers the range permutes 0..2**bits-1; positions it maps outside the
+    range are fed through again (cycle walking) until they land inside, which
+    keeps the mapping a permutation of the range itself. The round keys come
+    from the seed, so IDs are deterministic per seed.
+    """
+
+    def __init__(self, id_range, seed=0):
+        self.low, self.high = id_range
+        self.size = self.high - self.low
+        if self.size <= 0:
+            raise ValueError(f"Empty student ID range: {id_range}")
+        bits = max(2, int(self.size - 1).bit_length())
+        self.half_bits = np.uint64((bits + 1) // 2)
+        self.half_mask = np.uint64((1 << int(self.half_bits)) - 1)
+        self.keys = np.random.SeedSequence(seed, spawn_key=(3,)).generate_state(FEISTEL_ROUNDS, dtype=np.uint64)
+
+    def permute(self, values):
+        """One pass of the Feistel network over values < 2**(2 * half_bits)"""
+
+        left = values >> self.half_bits
+        right = values & self.half_mask
+        with np.errstate(over='ignore'):
+            for key in self.keys:
+                left, right = right, left ^ (mix64(right ^ key) & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def ids(self, start, count):
+        """IDs of the students at positions start .. start + count - 1"""
+
+        if start < 0 or start + count > self.size:
+            raise ValueError(f"Positions {start}..{start + count - 1} are outside the {self.size} IDs "
+                             f"in [{self.low}, {self.high})")
+        values = self.permute(np.arange(start, start + count, dtype=np.uint64))
+        outside = values >= self.size
+        while outside.any():
+            values[outside] = self.permute(values[outside])
+            outside = values >= self.size
+        return values.astype(np.int64) + self.low
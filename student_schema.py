@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Student Schema
+Declared compact dtypes for the 38-column student record (and the
+generator's internal columns), applied to generated, loaded and converted
+frames
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+ID_DTYPE = np.int32
+ATTENDANCE_DTYPE = np.uint8
+SCORE_DTYPE = np.float32
+
+# Nullable variants used when an integer column has missing values
+NULLABLE_DTYPES = {np.dtype(ID_DTYPE): 'Int32', np.dtype(ATTENDANCE_DTYPE): 'UInt8'}
+
+# Enumerated fields stored as categoricals
+CATEGORICAL_COLUMNS = [
+    'course', 'student_cohort', 'academic_status', 'failed_subjects',
+    'study_skills(attended)', 'referral', 'pp_meeting', 'self_assessment',
+    'readiness_assessment_results', 'follow_up', 'follow_up_type',
+    'subject_1', 'learn_jcu_issues_1', 'lecturer_referral_1',
+    'subject_2', 'learn_jcu_issues_2', 'lecturer_referral_2',
+    'subject_3', 'learn_jcu_issues_3', 'lecturer_referral_3',
+    'comments', 'identified_issues',
+    # Internal generator columns, dropped on export
+    'risk_level', 'submission_pattern'
+]
+
+# Assessment scores (NaN for unsubmitted work) and attendance percentages;
+# matched by name so the original file's subject_4_assess_4 is covered too
+SCORE_PATTERN = re.compile(r'subject_\d+_assess_\d+$')
+ATTENDANCE_PATTERN = re.compile(r'attendance_\d+$')
+
+
+def column_kind(column):
+    """'id', 'attendance', 'score' or 'category' for schema columns, else None"""
+    if column == 'student_id':
+        return 'id'
+    if ATTENDANCE_PATTERN.match(column):
+        return 'attendance'
+    if SCORE_PATTERN.match(column):
+        return 'score'
+    if column in CATEGORICAL_COLUMNS:
+        return 'category'
+    return None
+
+
+def to_integer(column, values, dtype, round_fractions=False):
+    """Cast whole numbers to dtype, using the nullable variant if any are missing
+
+    Fractional values are rounded to the nearest whole number when
+    round_fractions is set and rejected otherwise; they are never truncated.
+    """
+
+    values = pd.to_numeric(pd.Series(values, copy=False))
+    fractional = values.notna() & (values != np.round(values))
+    if fractional.any():
+        if not round_fractions:
+            raise ValueError(f"Column '{column}' has non-integral values, e.g. {values[fractional].iloc[0]}")
+        values = values.round()
+    info = np.iinfo(dtype)
+    if values.notna().any() and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(f"Column '{column}' has values outside the {np.dtype(dtype).name} range")
+    if values.isna().any():
+        return values.astype(NULLABLE_DTYPES[np.dtype(dtype)]).array
+    return values.to_numpy().astype(dtype)
+
+
+def encode_categories(column, values, categories):
+    """Categorical over a fixed domain, raising on values outside it
+
+    Factorizes first and maps only the distinct values onto the domain, which
+    is much cheaper than looking every value up in the categories index.
+    """
+
+    codes, uniques = pd.factorize(values)
+    positions = {value: code for code, value in enumerate(categories)}
+    unknown = [value for value in uniques if value not in positions]
+    if unknown:
+        raise ValueError(f"Column '{column}' has values outside its category domain: {sorted(unknown)[:5]}")
+    # The trailing -1 keeps factorize's missing-value code pointing at NaN
+    lookup = np.array([positions[value] for value in uniques] + [-1])
+    return pd.Categorical.from_codes(lookup[codes], categories=categories)
+
+
+def cast_column(column, values, categories=None):
+    """Cast one column's values to its declared dtype
+
+    Categoricals use the given categories when provided (so chunks share one
+    dictionary) and raise on values outside them; otherwise the categories
+    are the values present. Columns outside the schema are returned as is.
+    """
+
+    kind = column_kind(column)
+    dtype = getattr(values, 'dtype', None)
+
+    if kind == 'category':
+        if isinstance(dtype, pd.CategoricalDtype) and (categories is None or list(dtype.categories) == list(categories)):
+            return values
+        if categories is None:
+            return pd.Categorical(values)
+        return encode_categories(column, values, categories)
+    if kind == 'id':
+        return values if dtype == ID_DTYPE else to_integer(column, values, ID_DTYPE)
+    if kind == 'attendance':
+        return values if dtype == ATTENDANCE_DTYPE else to_integer(column, values, ATTENDANCE_DTYPE, round_fractions=True)
+    if kind == 'score':
+        return values if dtype == SCORE_DTYPE else np.asarray(pd.to_numeric(values), dtype=SCORE_DTYPE)
+    return values
+
+
+def apply_schema(df, category_domains=None, errors='raise'):
+    """Return df with every schema column cast to its compact dtype
+
+    With errors='ignore' a column that cannot be cast (e.g. a score column
+    holding 'N/A') is kept as it is instead of failing the whole frame.
+    """
+
+    domains = category_domains or {}
+    columns = {}
+    for column in df.columns:
+        try:
+            columns[column] = cast_column(column, df[column], domains.get(column))
+        except (ValueError, TypeError):
+            if errors != 'ignore':
+                raise
+            columns[column] = df[column]
+    return pd.DataFrame(columns, index=df.index)
+
+
+def decimal_float64(values):
+    """float32 values as the float64 of their shortest decimal form
+
+    A plain upcast exposes the float32 rounding (70.12346 becomes
+    70.12345886230469); each value is instead rounded to the fewest
+    decimals that still give back the same float32.
+    """
+
+    values = np.asarray(values, dtype=SCORE_DTYPE)
+    wide = values.astype(np.float64)
+    pending = np.flatnonzero(np.isfinite(values))
+    for decimals in range(13):
+        if len(pending) == 0:
+            break
+        rounded = np.round(wide[pending], decimals)
+        exact = rounded.astype(SCORE_DTYPE) == values[pending]
+        wide[pending[exact]] = rounded[exact]
+        pending = pending[~exact]
+    return wide
+
+
+def text_frame(df):
+    """df with float32 columns widened by decimal_float64, for CSV and other text output"""
+
+    narrow = [column for column in df.columns if df[column].dtype == SCORE_DTYPE]
+    if not narrow:
+        return df
+    return df.assign(**{column: decimal_float64(df[column].to_numpy()) for column in narrow})
+
+
+def csv_dtypes(columns):
+    """read_csv dtype mapping that parses schema columns straight to compact types"""
+
+    dtypes = {}
+    for column in columns:
+        kind = column_kind(column)
+        if kind == 'category':
+            dtypes[column] = 'category'
+        elif kind == 'score':
+            dtypes[column] = SCORE_DTYPE
+    return dtypes
+
+
+def read_student_csv(path, category_domains=None, **kwargs):
+    """Read a student CSV into the compact schema"""
+
+    columns = pd.read_csv(path, nrows=0, **kwargs).columns
+    df = pd.read_csv(path, dtype=csv_dtypes(columns), **kwargs)
+    return apply_schema(df, category_domains)
+
+
+def memory_usage_mb(df):
+    """Deep in-memory size of a frame in megabytes"""
+    return df.memory_usage(deep=True).sum() / 2**20
@@ -6,30 +6,182 @@ Generates realistic student retention data based on research patterns
 
 import pandas as pd
 import numpy as np
-import random
 import json
-from faker import Faker
-from scipy import stats
+import hashlib
+import inspect
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from quota_allocation import quota_counts, split_quota, assign_quota
+from column_profiler import profile_dataset
+from binary_cache import BinaryCacheWriter, binary_cache_path
+from columnar_export import ColumnarWriter, dataset_path
+from dataset_splits import SplitDatasetWriter
+from streaming_validation import ValidationAccumulator, print_validation_report
+from stage_cache import code_digest, stage_key
+from student_ids import StudentIdAllocator, id_range_for
+from student_schema import apply_schema, cast_column, read_student_csv, text_frame
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Source files the generator's patterns are extracted from
+ORIGINAL_DATA_PATH = 'file_converter/output_csv/student_data.csv'
+COURSE_SUBJECT_PATH = 'synthetic_data_gen/course_and_subject.json'
+
+# Cached pattern snapshots, keyed by a content hash of the source files
+PATTERN_CACHE_DIR = '.cache/patterns'
+PATTERN_SNAPSHOT_VERSION = 1
+
+# Generator attributes each memoizable stage reads; with the stage's code,
+# its non-data arguments, the random state and the upstream stage's key they
+# make up the stage cache key (see run_stage)
+STAGE_PARAMETERS = {
+    'assign_risk_levels': ['risk_distribution', 'n_students'],
+    'generate_basic_profiles': ['categorical_values', 'course_subjects', 'cohort_weights', 'academic_status_weights',
+                                'failed_subjects_prob', 'n_students', 'id_range', 'id_offset'],
+    'generate_support_system_data': ['categorical_values', 'study_skills_prob', 'referral_prob', 'pp_meeting_prob',
+                                     'self_assessment_prob', 'follow_up_prob'],
+    'generate_academic_performance': ['categorical_values', 'course_subjects', 'submission_patterns', 'grade_params'],
+    'generate_attendance_patterns': ['attendance_params', 'decline_factor'],
+    'generate_behavioral_indicators': ['categorical_values', 'access_prob'],
+    'generate_text_fields': ['comments_templates', 'identified_issues_templates'],
+}
+
+# Modules the stages' code runs through, helpers included; an edit to any of
+# them changes every stage cache key
+STAGE_CODE_MODULES = ['synthetic_data_generator', 'quota_allocation', 'student_ids', 'student_schema']
+
+# Risk levels in code order; per-risk tables are broadcast through these codes
+RISK_LEVELS = ['low_risk', 'medium_risk', 'high_risk', 'critical_risk']
+
+# Export column order matching the original dataset
+ORIGINAL_COLUMNS = [
+    'student_id', 'course', 'student_cohort', 'academic_status', 'failed_subjects',
+    'study_skills(attended)', 'referral', 'pp_meeting', 'self_assessment',
+    'readiness_assessment_results', 'follow_up', 'follow_up_type',
+    'subject_1', 'subject_1_assess_1', 'subject_1_assess_2', 'subject_1_assess_3', 'subject_1_assess_4',
+    'attendance_1', 'learn_jcu_issues_1', 'lecturer_referral_1',
+    'subject_2', 'subject_2_assess_1', 'subject_2_assess_2', 'subject_2_assess_3', 'subject_2_assess_4',
+    'attendance_2', 'learn_jcu_issues_2', 'lecturer_referral_2',
+    'subject_3', 'subject_3_assess_1', 'subject_3_assess_2', 'subject_3_assess_3', 'subject_3_assess_4',
+    'attendance_3', 'learn_jcu_issues_3', 'lecturer_referral_3',
+    'comments', 'identified_issues'
+]
+
+# Fallback subject codes by course type, for courses missing from the mapping
+FALLBACK_SUBJECTS = {
+    'business': ['LB5113', 'LB5202', 'LB5205'],
+    'information technology': ['CP5046', 'CP5047', 'CP5503'],
+    'data science': ['MA5831', 'MA5840', 'MA5851'],
+    'tourism': ['TO5101', 'TO5103', 'TO5104'],
+    'accounting': ['CO5117', 'CO5103', 'CO5109'],
+    'engineering': ['EG5200', 'EG5220', 'EG5310'],
+    'education': ['ED5097', 'ED5880', 'ED5882']
+}
+
+# Final fallback for courses that cannot be resolved at all
+DEFAULT_SUBJECT = 'LB5113'  # Corporate Strategy
+
+# Previously failed subject codes
+FAILED_SUBJECT_CODES = ['CP5639', 'CP5633', 'CP1401', 'CP1404', 'CP1407', 'CP1406', 'CP5046', 'CP5047']
+
+# Challenging programs that critical risk students are drawn to
+CRITICAL_RISK_COURSES = {
+    'Master of Business Administration': 0.4,
+    'Master of Information Technology': 0.3,
+    'Master of Engineering Management': 0.3
+}
+
+
+def source_hash(paths):
+    """Content hash of the given files (missing files hash as absent)"""
+    digest = hashlib.sha256(f'v{PATTERN_SNAPSHOT_VERSION}'.encode())
+    for path in paths:
+        digest.update(path.encode())
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            digest.update(b'<missing>')
+    return digest.hexdigest()[:16]
+
+
+def risk_codes(risk_levels):
+    """Map risk level labels to integer codes in RISK_LEVELS order"""
+    return pd.Categorical(risk_levels, categories=RISK_LEVELS).codes.astype(np.int8)
+
+
+def per_risk(table, codes):
+    """Broadcast a per-risk-level table to one value per student"""
+    return np.array([table[level] for level in RISK_LEVELS])[codes]
+
+
+def choice_by_risk(rng, table, codes):
+    """Draw one category per student from per-risk-level weight tables"""
+    out = np.empty(len(codes), dtype=object)
+    for code, level in enumerate(RISK_LEVELS):
+        mask = codes == code
+        if mask.any():
+            weights = table[level]
+            out[mask] = rng.choice(
+                np.array(list(weights.keys()), dtype=object),
+                size=int(mask.sum()),
+                p=list(weights.values())
+            )
+    return out
+
+
+def choice_where(rng, options, hit, default=None):
+    """Draw a category for students where hit is True, default elsewhere"""
+    out = np.full(len(hit), default, dtype=object)
+    out[hit] = rng.choice(np.array(options, dtype=object), size=int(hit.sum()))
+    return out
+
+
 class SyntheticStudentDataGenerator:
-    def __init__(self, n_students=2000, random_state=42):
+    def __init__(self, n_students=2000, random_state=42, use_pattern_cache=True, approximate_patterns=False,
+                 id_range=None, binary_cache=False, stage_cache=None):
         self.n_students = n_students
-        self.random_state = random_state
-        self.faker = Faker()
-        
-        # Set random seeds for reproducibility
-        np.random.seed(random_state)
-        random.seed(random_state)
-        Faker.seed(random_state)
-        
-        # Load original data patterns
-        self.original_df = pd.read_csv('file_converter/output_csv/student_data.csv')
-        self.extract_original_patterns()
-        
-        # Load course and subject mapping
-        self.load_course_subject_mapping()
+        # random_state=None draws fresh entropy once, here, so every chunk,
+        # shard and derived stream (student IDs, events) of the run shares it
+        self.random_state = np.random.SeedSequence().entropy if random_state is None else random_state
+        self.use_pattern_cache = use_pattern_cache
+        self.approximate_patterns = approximate_patterns
+        self.id_range = id_range
+        
+        # Also write a memory-mapped binary cache next to each exported file
+        self.binary_cache = binary_cache
+        
+        # Optional StageCache memoizing the core profile stages, and the key
+        # of the last stage run in the current chain
+        self.stage_cache = stage_cache
+        self.stage_key = None
+        self._faker = None
+        self._original_df = None
+        self._category_domains = None
+        
+        # Per-instance random streams for reproducibility (no global state,
+        # so several generators can run side by side)
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.random_state))
+        
+        # Instrumentation hooks run around each pipeline stage (see
+        # stage_profiling.StageHook) and the chunk currently being generated
+        self.stage_hooks = []
+        self.current_chunk = None
+        
+        # Position in the run of the next student generated; the student_id
+        # is a keyed permutation of it (see student_ids)
+        self.id_offset = 0
+        
+        # Row counts of the last train/test split written with an export
+        self.split_summary = None
+        
+        # Load original data patterns and course and subject mapping
+        self.load_patterns()
         
         # Risk distribution based on client data (300/2000 students needing support)
         self.risk_distribution = {
@@ -39,9 +191,204 @@ class SyntheticStudentDataGenerator:
             'critical_risk': 0.03  # 3% - Multiple failures, unresponsive
         }
         
+        # Student cohort with realistic weights
+        self.cohort_weights = {
+            'New': 0.20,
+            'First year': 0.18,
+            'Continuing': 0.15,
+            'Return to Study': 0.12,
+            'Transferred': 0.10,
+            'SRI to JCUB': 0.10,
+            'LOA': 0.08,
+            'Excluded': 0.07
+        }
+        
+        # Academic status mapping to risk levels
+        self.academic_status_weights = {
+            'low_risk': {'Satisfactory': 0.7, 'Conditional': 0.3},
+            'medium_risk': {'Conditional': 0.6, 'Academic Caution': 0.4},
+            'high_risk': {'Academic Caution': 0.4, 'At Risk': 0.6},
+            'critical_risk': {'At Risk': 0.3, 'Excluded': 0.7}
+        }
+        
+        # Failed subjects based on risk level
+        self.failed_subjects_prob = {
+            'low_risk': 0.05,      # 5% have failed subjects
+            'medium_risk': 0.20,   # 20% have failed subjects
+            'high_risk': 0.50,     # 50% have failed subjects
+            'critical_risk': 0.80  # 80% have failed subjects
+        }
+        
+        # Study skills attendance (struggling students more likely to attend)
+        self.study_skills_prob = {
+            'low_risk': 0.10,      # 10% attend
+            'medium_risk': 0.30,   # 30% attend
+            'high_risk': 0.60,     # 60% attend
+            'critical_risk': 0.80  # 80% attend
+        }
+        
+        # Referral system based on risk probability
+        self.referral_prob = {
+            'low_risk': 0.05,      # 5% get referrals
+            'medium_risk': 0.30,   # 30% get referrals
+            'high_risk': 0.70,     # 70% get referrals
+            'critical_risk': 0.90  # 90% get referrals
+        }
+        
+        # PP meeting (reserved for highest risk - 8% of all students)
+        self.pp_meeting_prob = {
+            'low_risk': 0.01,      # 1% get PP meetings
+            'medium_risk': 0.05,   # 5% get PP meetings
+            'high_risk': 0.25,     # 25% get PP meetings
+            'critical_risk': 0.80  # 80% get PP meetings
+        }
+        
+        # Self assessment (students identify their own issues)
+        self.self_assessment_prob = {
+            'low_risk': 0.30,      # 30% do self assessment
+            'medium_risk': 0.50,   # 50% do self assessment
+            'high_risk': 0.70,     # 70% do self assessment
+            'critical_risk': 0.60  # 60% do self assessment (some too disengaged)
+        }
+        
+        # Follow up (institutional response rates)
+        self.follow_up_prob = {
+            'low_risk': 0.20,      # 20% get follow up
+            'medium_risk': 0.50,   # 50% get follow up
+            'high_risk': 0.80,     # 80% get follow up
+            'critical_risk': 0.90  # 90% get follow up
+        }
+        
+        # Submission pattern distribution
+        self.submission_patterns = {
+            'both_submitted': 0.65,    # 65% submit both assessments
+            'assess1_only': 0.32,      # 32% submit only assessment 1
+            'none_submitted': 0.03     # 3% submit neither assessment
+        }
+        
+        # Define grade distributions by risk level (research-backed)
+        self.grade_params = {
+            'low_risk': {'mean': 75, 'std': 12},      # Good performance
+            'medium_risk': {'mean': 60, 'std': 15},   # Average performance
+            'high_risk': {'mean': 45, 'std': 18},     # Poor performance
+            'critical_risk': {'mean': 30, 'std': 20}  # Very poor performance
+        }
+        
+        # Attendance distributions by risk level (research-backed)
+        self.attendance_params = {
+            'low_risk': {'mean': 90, 'std': 8},       # 85-95% average
+            'medium_risk': {'mean': 77, 'std': 10},   # 70-85% average
+            'high_risk': {'mean': 60, 'std': 12},     # 50-70% average
+            'critical_risk': {'mean': 35, 'std': 15}  # <50% average
+        }
+        
+        # Attendance patterns show decline for high-risk students
+        self.decline_factor = {
+            'low_risk': 0.98,      # Slight decline
+            'medium_risk': 0.95,   # Moderate decline
+            'high_risk': 0.90,     # Significant decline
+            'critical_risk': 0.85  # Major decline
+        }
+        
+        # Platform access issues probability by risk level
+        self.access_prob = {
+            'low_risk': 0.25,      # 25% have access issues
+            'medium_risk': 0.35,   # 35% have access issues
+            'high_risk': 0.50,     # 50% have access issues
+            'critical_risk': 0.70  # 70% have access issues
+        }
+        
+        # Sample comments for different risk levels and situations
+        self.comments_templates = {
+            'low_risk': [
+                "Week 3. Student performing well. Consistent attendance and engagement.",
+                "Week 5. Good progress on assessments. No concerns identified.",
+                "Week 7. Student maintaining good academic standards.",
+                "Week 8. Strong performance across all subjects. No intervention needed."
+            ],
+            'medium_risk': [
+                "Week 4. Student submitted first assessment late. Offered academic skills support and advised on extension procedures.",
+                "Week 6. Student submitted assessment late. Extension not requested in advance. Advised to submit future requests on time and referred to Academic Skills team.",
+                "Week 5. Low engagement in tutorials. Follow-up email sent with participation expectations and links to recorded sessions.",
+                "Week 7. Missed second assessment. Student contacted and reported feeling overwhelmed. Referred to Academic Support and encouraged to speak with Counsellor."
+            ],
+            'high_risk': [
+                "Week 3. Student enrolled late. Missing foundational content from Weeks 1–2. Provided links to recorded lectures and encouraged to attend tutorials for extra support.",
+                "Week 5. Student absent from multiple classes. Email sent to check in; student replied citing family issues. Offered flexibility and reminded of support services.",
+                "Week 6. Student reported working long hours. Referred to careers support for managing work–study balance.",
+                "Week 7. Student disclosed high stress levels and lack of sleep. Referred to Wellbeing team and reminded of available mental health support."
+            ],
+            'critical_risk': [
+                "Week 2. Student did not attend orientation. Contacted via email with essential course info and Moodle access guide. No response yet.",
+                "Week 3. First contact made. Student reported internet access issues at home. IT support referral provided.",
+                "Week 3 late enrolment. Student finding it difficult to catch up on Weeks 1 and 2. Week 4. Student contacted on lecturer referral. Student has been sick on arrival.",
+                "booked to see a doctor. Week 5. Student contacted for low attendance. Reminded of the importance of attending classes. Week 7. Student contacted for missing submission due date. Referred to Counsellor for check in for wellbeing as the student advised mental health challenges."
+            ]
+        }
+        
+        self.identified_issues_templates = {
+            'low_risk': ['Academic progression', 'Time management', 'Study skills'],
+            'medium_risk': ['Poor time management', 'Study skills', 'Late enrollment'],
+            'high_risk': ['Mental health', 'Poor time management', 'Late enrollment', 'Financial stress'],
+            'critical_risk': ['Mental health', 'Sickness', 'Death in family', 'Late enrollment', 'Financial stress']
+        }
+        
+    @property
+    def faker(self):
+        """Seeded Faker instance, imported on first use"""
+        if self._faker is None:
+            from faker import Faker
+            self._faker = Faker()
+            self._faker.seed_instance(self.random_state)
+        return self._faker
+        
+    @property
+    def original_df(self):
+        """Original dataset, read on first use"""
+        if self._original_df is None:
+            self._original_df = read_student_csv(ORIGINAL_DATA_PATH)
+        return self._original_df
+        
+    def load_patterns(self):
+        """Load original data patterns and course mapping, reusing a snapshot
+        
+        The extracted patterns are cached under PATTERN_CACHE_DIR keyed by a
+        content hash of the source files, so they are only re-extracted when
+        student_data.csv or course_and_subject.json change.
+        """
+        
+        mode = '_approx' if self.approximate_patterns else ''
+        snapshot_path = os.path.join(PATTERN_CACHE_DIR, f'patterns_{source_hash([ORIGINAL_DATA_PATH, COURSE_SUBJECT_PATH])}{mode}.json')
+        
+        if self.use_pattern_cache and os.path.exists(snapshot_path):
+            with open(snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            self.categorical_values = snapshot['categorical_values']
+            self.course_subjects = snapshot['course_subjects']
+            logger.info(f"✓ Reused cached pattern snapshot {snapshot_path}")
+            self.build_course_subject_index()
+            return
+        
+        self.extract_original_patterns()
+        self.load_course_subject_mapping()
+        
+        if self.use_pattern_cache:
+            os.makedirs(PATTERN_CACHE_DIR, exist_ok=True)
+            tmp_path = f'{snapshot_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'categorical_values': self.categorical_values,
+                    'course_subjects': self.course_subjects
+                }, f)
+            os.replace(tmp_path, snapshot_path)
+        
     def extract_original_patterns(self):
         """Extract patterns from original dataset"""
         
+        if self.approximate_patterns:
+            self.extract_sketched_patterns()
+            return
+        
         # Categorical value mappings
         self.categorical_values = {
             'course': self.original_df['course'].unique().tolist(),
@@ -59,12 +406,41 @@ class SyntheticStudentDataGenerator:
             'lecturer_referral': ['Attendance', 'Non Submission', 'Concern for Welfare']
         }
         
-        print("✓ Extracted categorical patterns from original dataset")
+        logger.info("✓ Extracted categorical patterns from original dataset")
+        
+    def extract_sketched_patterns(self):
+        """Extract the categorical patterns from a sketch-based profile
+        
+        The original file is read in chunks into constant-memory sketches
+        (see column_profiler), so the source can be far larger than memory.
+        Each value list holds the column's most frequent values, most
+        frequent first, followed by NaN if the column has missing values;
+        this ordering differs from the exact path's first-appearance order,
+        so the generated data differs too.
+        """
+        
+        columns = profile_dataset(ORIGINAL_DATA_PATH, approximate=True).report()['columns']
+        
+        def frequent_values(column):
+            profile = columns[column]
+            return list(profile['counts']) + ([np.nan] if profile['missing'] else [])
+        
+        self.categorical_values = {
+            column: frequent_values(column) for column in [
+                'course', 'student_cohort', 'academic_status', 'study_skills(attended)', 'referral',
+                'pp_meeting', 'self_assessment', 'readiness_assessment_results', 'follow_up', 'follow_up_type'
+            ]
+        }
+        self.categorical_values['failed_subjects'] = [None] + list(columns['failed_subjects']['counts'])
+        self.categorical_values['learn_jcu_issues'] = ['Access', 'No Access']
+        self.categorical_values['lecturer_referral'] = ['Attendance', 'Non Submission', 'Concern for Welfare']
+        
+        logger.info("✓ Extracted categorical patterns from sketches of the original dataset")
         
     def load_course_subject_mapping(self):
         """Load course and subject mapping from JSON file"""
         try:
-            with open('synthetic_data_gen/course_and_subject.json', 'r') as f:
+            with open(COURSE_SUBJECT_PATH, 'r') as f:
                 data = json.load(f)
             
             # Create mapping dictionary for easy lookup
@@ -74,662 +450,789 @@ class SyntheticStudentDataGenerator:
                 subjects = course_data['subject_list']
                 self.course_subjects[course_name] = subjects
             
-            print(f"✓ Loaded course-subject mapping for {len(self.course_subjects)} courses")
+            logger.info(f"✓ Loaded course-subject mapping for {len(self.course_subjects)} courses")
             
         except FileNotFoundError:
-            print("! Warning: course_and_subject.json not found, using fallback subject assignment")
+            logger.warning("! Warning: course_and_subject.json not found, using fallback subject assignment")
             self.course_subjects = {}
+        
+        self.build_course_subject_index()
+        
+    def build_course_subject_index(self):
+        """Resolve candidate subject codes once for every known course"""
+        
+        self.course_subject_index = {}
+        self.course_resolution = {}
+        
+        for course in dict.fromkeys(list(self.course_subjects) + self.categorical_values['course']):
+            self.resolve_course_subjects(course)
+        
+        unresolved = self.unresolved_courses()
+        logger.info(f"✓ Indexed candidate subjects for {len(self.course_subject_index)} courses ({len(unresolved)} unresolved)")
+        for course in unresolved:
+            logger.warning(f"! Warning: no subjects found for '{course}', using {DEFAULT_SUBJECT}")
             
-    def assign_subject_for_course(self, course_name, subject_number):
-        """Assign a subject code based on the student's course"""
+    def resolve_course_subjects(self, course_name):
+        """Return the candidate subject codes for a course, caching the result
+        
+        Tries an exact mapping match, then a partial name match, then the
+        course-type fallbacks, and finally DEFAULT_SUBJECT (recorded as
+        unresolved).
+        """
         
-        # Normalize course name to match JSON keys
-        course_key = course_name
+        if course_name in self.course_subject_index:
+            return self.course_subject_index[course_name]
+        
+        codes, resolution = None, 'unresolved'
+        course_lower = course_name.lower()
         
         # Try to find exact match first
-        if course_key in self.course_subjects:
-            subjects = self.course_subjects[course_key]
-            if subjects:
-                # Randomly select from available subjects for this course
-                selected_subject = random.choice(subjects)
-                return selected_subject['subject_code']
+        if self.course_subjects.get(course_name):
+            codes, resolution = self.course_subjects[course_name], 'exact'
         
         # Try partial matching for similar course names
-        for key in self.course_subjects.keys():
-            if course_name.lower() in key.lower() or key.lower() in course_name.lower():
-                subjects = self.course_subjects[key]
-                if subjects:
-                    selected_subject = random.choice(subjects)
-                    return selected_subject['subject_code']
-        
-        # Fallback: return a subject code based on course type
-        fallback_subjects = {
-            'business': ['LB5113', 'LB5202', 'LB5205'],
-            'information technology': ['CP5046', 'CP5047', 'CP5503'],
-            'data science': ['MA5831', 'MA5840', 'MA5851'],
-            'tourism': ['TO5101', 'TO5103', 'TO5104'],
-            'accounting': ['CO5117', 'CO5103', 'CO5109'],
-            'engineering': ['EG5200', 'EG5220', 'EG5310'],
-            'education': ['ED5097', 'ED5880', 'ED5882']
-        }
+        if codes is None:
+            for key, subjects in self.course_subjects.items():
+                if subjects and (course_lower in key.lower() or key.lower() in course_lower):
+                    codes, resolution = subjects, 'partial'
+                    break
+        
+        if codes is not None:
+            codes = [subject['subject_code'] for subject in codes]
+        
+        # Fallback: subject codes based on course type
+        if codes is None:
+            for category, subjects in FALLBACK_SUBJECTS.items():
+                if category in course_lower:
+                    codes, resolution = subjects, 'fallback'
+                    break
+        
+        if codes is None:
+            codes = [DEFAULT_SUBJECT]
+        
+        self.course_subject_index[course_name] = np.array(codes, dtype=object)
+        self.course_resolution[course_name] = resolution
+        self._category_domains = None
+        return self.course_subject_index[course_name]
+        
+    def unresolved_courses(self):
+        """Courses that had no mapping, partial or fallback match"""
+        return [course for course, resolution in self.course_resolution.items() if resolution == 'unresolved']
+            
+    def assign_subject_for_course(self, course_name, subject_number):
+        """Assign a subject code based on the student's course"""
         
-        course_lower = course_name.lower()
-        for category, subjects in fallback_subjects.items():
-            if category in course_lower:
-                return random.choice(subjects)
+        candidates = self.resolve_course_subjects(course_name)
+        return candidates[self.rng.integers(len(candidates))]
         
-        # Final fallback
-        return 'LB5113'  # Corporate Strategy as default
+    def assign_subjects(self, courses):
+        """Draw one subject code per student, batched by course"""
         
-    def assign_risk_levels(self):
-        """Assign risk levels to students based on distribution"""
+        course_codes, course_names = pd.factorize(courses)
+        subjects = np.empty(len(course_codes), dtype=object)
+        
+        for code, course_name in enumerate(course_names):
+            mask = course_codes == code
+            candidates = self.resolve_course_subjects(course_name)
+            subjects[mask] = candidates[self.rng.integers(len(candidates), size=int(mask.sum()))]
         
-        risk_levels = []
+        return subjects
         
-        # Calculate number of students per risk level
-        n_low = int(self.n_students * self.risk_distribution['low_risk'])
-        n_medium = int(self.n_students * self.risk_distribution['medium_risk'])
-        n_high = int(self.n_students * self.risk_distribution['high_risk'])
-        n_critical = self.n_students - n_low - n_medium - n_high  # Remainder
+    def risk_level_counts(self, n_students):
+        """Calculate exact number of students per risk level"""
+        return quota_counts(n_students, {level: self.risk_distribution[level] for level in RISK_LEVELS})
         
-        # Assign risk levels
-        risk_levels.extend(['low_risk'] * n_low)
-        risk_levels.extend(['medium_risk'] * n_medium)
-        risk_levels.extend(['high_risk'] * n_high)
-        risk_levels.extend(['critical_risk'] * n_critical)
+    def assign_risk_levels(self, counts=None):
+        """Assign risk levels to students based on distribution"""
         
-        # Shuffle to randomize order
-        random.shuffle(risk_levels)
+        if counts is None:
+            counts = self.risk_level_counts(self.n_students)
+        n_low, n_medium, n_high, n_critical = (counts[level] for level in RISK_LEVELS)
         
-        print(f"✓ Risk level distribution: Low={n_low}, Medium={n_medium}, High={n_high}, Critical={n_critical}")
+        # Assign risk levels in random order
+        risk_levels = assign_quota(self.rng, counts)
+        
+        logger.info(f"✓ Risk level distribution: Low={n_low}, Medium={n_medium}, High={n_high}, Critical={n_critical}")
         
         return risk_levels
         
+    def student_ids(self, n):
+        """Unique IDs for the next n students of the run
+        
+        IDs come from the positions id_offset .. id_offset + n - 1, so chunks
+        and shards get disjoint IDs without coordinating. The ID range is
+        id_range if given, else the smallest range of 5 or more digits that
+        holds n_students.
+        """
+        
+        id_range = self.id_range or id_range_for(self.n_students)
+        return StudentIdAllocator(id_range, self.random_state).ids(self.id_offset, n)
+        
     def generate_basic_profiles(self, risk_levels):
         """Generate basic student profiles"""
         
-        profiles = []
-        
-        for i, risk_level in enumerate(risk_levels):
-            profile = {
-                'student_id': random.randint(10000, 99999),
-                'risk_level': risk_level
-            }
-            
-            # Course selection (with some bias for risk levels)
-            if risk_level == 'critical_risk':
-                # Critical risk students more likely in challenging programs
-                profile['course'] = np.random.choice([
-                    'Master of Business Administration',
-                    'Master of Information Technology',
-                    'Master of Engineering Management'
-                ], p=[0.4, 0.3, 0.3])
-            else:
-                # Other students more evenly distributed
-                profile['course'] = np.random.choice(self.categorical_values['course'])
-            
-            # Student cohort with realistic weights
-            cohort_weights = {
-                'New': 0.20,
-                'First year': 0.18,
-                'Continuing': 0.15,
-                'Return to Study': 0.12,
-                'Transferred': 0.10,
-                'SRI to JCUB': 0.10,
-                'LOA': 0.08,
-                'Excluded': 0.07
-            }
-            
-            profile['student_cohort'] = np.random.choice(
-                list(cohort_weights.keys()),
-                p=list(cohort_weights.values())
-            )
-            
-            # Academic status mapping to risk levels
-            academic_status_mapping = {
-                'low_risk': np.random.choice(['Satisfactory', 'Conditional'], p=[0.7, 0.3]),
-                'medium_risk': np.random.choice(['Conditional', 'Academic Caution'], p=[0.6, 0.4]),
-                'high_risk': np.random.choice(['Academic Caution', 'At Risk'], p=[0.4, 0.6]),
-                'critical_risk': np.random.choice(['At Risk', 'Excluded'], p=[0.3, 0.7])
-            }
-            
-            profile['academic_status'] = academic_status_mapping[risk_level]
-            
-            # Failed subjects based on risk level
-            failed_subjects_prob = {
-                'low_risk': 0.05,      # 5% have failed subjects
-                'medium_risk': 0.20,   # 20% have failed subjects
-                'high_risk': 0.50,     # 50% have failed subjects
-                'critical_risk': 0.80  # 80% have failed subjects
-            }
-            
-            if np.random.random() < failed_subjects_prob[risk_level]:
-                profile['failed_subjects'] = np.random.choice([
-                    'CP5639', 'CP5633', 'CP1401', 'CP1404', 'CP1407', 'CP1406', 'CP5046', 'CP5047'
-                ])
-            else:
-                profile['failed_subjects'] = None
-                
-            profiles.append(profile)
-            
-        print(f"✓ Generated {len(profiles)} basic student profiles")
+        risk_levels = np.asarray(risk_levels, dtype=object)
+        codes = risk_codes(risk_levels)
+        n = len(risk_levels)
+        
+        profiles = pd.DataFrame({
+            'student_id': self.typed('student_id', self.student_ids(n)),
+            'risk_level': self.typed('risk_level', risk_levels)
+        })
+        
+        # Course selection (other students more evenly distributed)
+        course = self.rng.choice(np.array(self.categorical_values['course'], dtype=object), size=n)
+        
+        # Critical risk students more likely in challenging programs
+        critical = codes == RISK_LEVELS.index('critical_risk')
+        course[critical] = self.rng.choice(
+            np.array(list(CRITICAL_RISK_COURSES.keys()), dtype=object),
+            size=int(critical.sum()),
+            p=list(CRITICAL_RISK_COURSES.values())
+        )
+        profiles['course'] = self.typed('course', course)
+        
+        profiles['student_cohort'] = self.typed('student_cohort', self.rng.choice(
+            np.array(list(self.cohort_weights.keys()), dtype=object),
+            size=n,
+            p=list(self.cohort_weights.values())
+        ))
+        
+        profiles['academic_status'] = self.typed(
+            'academic_status', choice_by_risk(self.rng, self.academic_status_weights, codes)
+        )
+        
+        has_failed = self.rng.random(n) < per_risk(self.failed_subjects_prob, codes)
+        profiles['failed_subjects'] = self.typed('failed_subjects', choice_where(self.rng, FAILED_SUBJECT_CODES, has_failed))
+        
+        logger.info(f"✓ Generated {len(profiles)} basic student profiles")
         return profiles
         
     def generate_support_system_data(self, profiles):
         """Generate support system related data"""
         
-        for profile in profiles:
-            risk_level = profile['risk_level']
-            
-            # Study skills attendance (struggling students more likely to attend)
-            study_skills_prob = {
-                'low_risk': 0.10,      # 10% attend
-                'medium_risk': 0.30,   # 30% attend
-                'high_risk': 0.60,     # 60% attend
-                'critical_risk': 0.80  # 80% attend
-            }
-            
-            if np.random.random() < study_skills_prob[risk_level]:
-                profile['study_skills(attended)'] = np.random.choice(self.categorical_values['study_skills(attended)'])
-            else:
-                profile['study_skills(attended)'] = None
-                
-            # Referral system based on risk probability
-            referral_prob = {
-                'low_risk': 0.05,      # 5% get referrals
-                'medium_risk': 0.30,   # 30% get referrals
-                'high_risk': 0.70,     # 70% get referrals
-                'critical_risk': 0.90  # 90% get referrals
-            }
-            
-            if np.random.random() < referral_prob[risk_level]:
-                profile['referral'] = np.random.choice(self.categorical_values['referral'])
-            else:
-                profile['referral'] = None
-                
-            # PP meeting (reserved for highest risk - 8% of all students)
-            pp_meeting_prob = {
-                'low_risk': 0.01,      # 1% get PP meetings
-                'medium_risk': 0.05,   # 5% get PP meetings
-                'high_risk': 0.25,     # 25% get PP meetings
-                'critical_risk': 0.80  # 80% get PP meetings
-            }
-            
-            if np.random.random() < pp_meeting_prob[risk_level]:
-                profile['pp_meeting'] = np.random.choice(self.categorical_values['pp_meeting'])
-            else:
-                profile['pp_meeting'] = 'Not relevant'
-                
-            # Self assessment (students identify their own issues)
-            self_assessment_prob = {
-                'low_risk': 0.30,      # 30% do self assessment
-                'medium_risk': 0.50,   # 50% do self assessment
-                'high_risk': 0.70,     # 70% do self assessment
-                'critical_risk': 0.60  # 60% do self assessment (some too disengaged)
-            }
-            
-            profile['self_assessment'] = 'Yes' if np.random.random() < self_assessment_prob[risk_level] else 'No'
-            
-            # Readiness assessment results (institutional risk classification)
-            # Using original single value for consistency
-            profile['readiness_assessment_results'] = 'L/G:9/10 N:5/10 R:8/10'
-            
-            # Follow up (institutional response rates)
-            follow_up_prob = {
-                'low_risk': 0.20,      # 20% get follow up
-                'medium_risk': 0.50,   # 50% get follow up
-                'high_risk': 0.80,     # 80% get follow up
-                'critical_risk': 0.90  # 90% get follow up
-            }
-            
-            profile['follow_up'] = 'Yes' if np.random.random() < follow_up_prob[risk_level] else 'No'
-            
-            # Follow up type (if follow up exists)
-            if profile['follow_up'] == 'Yes':
-                profile['follow_up_type'] = np.random.choice(self.categorical_values['follow_up_type'])
-            else:
-                profile['follow_up_type'] = 'No Reply'
+        codes = risk_codes(profiles['risk_level'])
+        n = len(profiles)
+        
+        attended = self.rng.random(n) < per_risk(self.study_skills_prob, codes)
+        profiles['study_skills(attended)'] = self.typed(
+            'study_skills(attended)', choice_where(self.rng, self.categorical_values['study_skills(attended)'], attended)
+        )
+        
+        referred = self.rng.random(n) < per_risk(self.referral_prob, codes)
+        profiles['referral'] = self.typed('referral', choice_where(self.rng, self.categorical_values['referral'], referred))
+        
+        has_meeting = self.rng.random(n) < per_risk(self.pp_meeting_prob, codes)
+        profiles['pp_meeting'] = self.typed(
+            'pp_meeting', choice_where(self.rng, self.categorical_values['pp_meeting'], has_meeting, default='Not relevant')
+        )
+        
+        self_assessed = self.rng.random(n) < per_risk(self.self_assessment_prob, codes)
+        profiles['self_assessment'] = self.typed('self_assessment', np.where(self_assessed, 'Yes', 'No').astype(object))
+        
+        # Readiness assessment results (institutional risk classification)
+        # Using original single value for consistency
+        profiles['readiness_assessment_results'] = self.typed(
+            'readiness_assessment_results', np.full(n, 'L/G:9/10 N:5/10 R:8/10', dtype=object)
+        )
         
-        print("✓ Generated support system data")
+        followed_up = self.rng.random(n) < per_risk(self.follow_up_prob, codes)
+        profiles['follow_up'] = self.typed('follow_up', np.where(followed_up, 'Yes', 'No').astype(object))
+        
+        # Follow up type (if follow up exists)
+        profiles['follow_up_type'] = self.typed(
+            'follow_up_type',
+            choice_where(self.rng, self.categorical_values['follow_up_type'], followed_up, default='No Reply')
+        )
+        
+        logger.info("✓ Generated support system data")
         return profiles
     
-    def determine_submission_patterns(self, profiles):
+    def submission_pattern_counts(self, n_students):
+        """Calculate exact number of students per submission pattern"""
+        return quota_counts(n_students, self.submission_patterns)
+        
+    def determine_submission_patterns(self, profiles, counts=None):
         """Determine realistic submission patterns for each student"""
         
-        # Submission pattern distribution
-        submission_patterns = {
-            'both_submitted': 0.65,    # 65% submit both assessments
-            'assess1_only': 0.32,      # 32% submit only assessment 1
-            'none_submitted': 0.03     # 3% submit neither assessment
-        }
+        n_students = len(profiles)
         
         # Identify students eligible for non-submission (3%)
-        eligible_for_non_submission = []
-        for i, profile in enumerate(profiles):
-            is_eligible = (
-                profile['student_cohort'] in ['New', 'First year'] or
-                profile['failed_subjects'] is not None
-            )
-            if is_eligible:
-                eligible_for_non_submission.append(i)
+        eligible = (
+            profiles['student_cohort'].isin(['New', 'First year']).to_numpy() |
+            profiles['failed_subjects'].notna().to_numpy()
+        )
         
         # Calculate numbers for each pattern
-        n_students = len(profiles)
-        n_none = int(n_students * submission_patterns['none_submitted'])
-        n_assess1_only = int(n_students * submission_patterns['assess1_only'])
-        n_both = n_students - n_none - n_assess1_only
-        
-        # Assign patterns
-        submission_assignments = ['both_submitted'] * n_both
-        submission_assignments.extend(['assess1_only'] * n_assess1_only)
-        submission_assignments.extend(['none_submitted'] * n_none)
-        
-        # Shuffle the assignments
-        random.shuffle(submission_assignments)
-        
-        # Ensure non-submitters are from eligible students
-        if len(eligible_for_non_submission) >= n_none:
-            # Randomly select from eligible students for non-submission
-            non_submitter_indices = random.sample(eligible_for_non_submission, n_none)
-            
-            # Reset all to 'both_submitted' first
-            for i in range(n_students):
-                profiles[i]['submission_pattern'] = 'both_submitted'
-            
-            # Assign non-submission pattern to selected eligible students
-            for idx in non_submitter_indices:
-                profiles[idx]['submission_pattern'] = 'none_submitted'
-            
-            # Assign assess1_only to remaining students (excluding non-submitters)
-            remaining_indices = [i for i in range(n_students) if i not in non_submitter_indices]
-            assess1_only_indices = random.sample(remaining_indices, n_assess1_only)
-            
-            for idx in assess1_only_indices:
-                profiles[idx]['submission_pattern'] = 'assess1_only'
-        else:
-            # If not enough eligible students, assign patterns randomly
-            for i, pattern in enumerate(submission_assignments):
-                profiles[i]['submission_pattern'] = pattern
-        
-        # Count actual patterns
-        pattern_counts = {}
-        for profile in profiles:
-            pattern = profile['submission_pattern']
-            pattern_counts[pattern] = pattern_counts.get(pattern, 0) + 1
-        
-        print(f"✓ Submission patterns assigned:")
-        for pattern, count in pattern_counts.items():
+        if counts is None:
+            counts = self.submission_pattern_counts(n_students)
+        
+        # Non-submitters come from eligible students (topped up from the
+        # others only if there are not enough); the rest split at random
+        profiles['submission_pattern'] = self.typed('submission_pattern', assign_quota(
+            self.rng, counts, eligible={'none_submitted': eligible}
+        ))
+        
+        logger.info(f"✓ Submission patterns assigned:")
+        for pattern, count in profiles['submission_pattern'].value_counts(sort=False).items():
             percentage = (count / n_students) * 100
-            print(f"  {pattern}: {count} ({percentage:.1f}%)")
+            logger.info(f"  {pattern}: {count} ({percentage:.1f}%)")
         
         return profiles
         
-    def generate_academic_performance(self, profiles):
+    def generate_academic_performance(self, profiles, submission_counts=None):
         """Generate academic performance data with realistic submission patterns (mid-semester: only assess 1 & 2)"""
         
         # First determine submission patterns for each student
-        profiles = self.determine_submission_patterns(profiles)
+        profiles = self.determine_submission_patterns(profiles, submission_counts)
+        
+        codes = risk_codes(profiles['risk_level'])
+        n = len(profiles)
+        pattern = profiles['submission_pattern'].to_numpy()
+        submitted_1 = pattern != 'none_submitted'
+        submitted_2 = pattern == 'both_submitted'
         
-        for profile in profiles:
-            risk_level = profile['risk_level']
-            submission_pattern = profile['submission_pattern']
+        grade_mean = per_risk({k: v['mean'] for k, v in self.grade_params.items()}, codes)
+        grade_std = per_risk({k: v['std'] for k, v in self.grade_params.items()}, codes)
+        
+        # Students with intervention show 5-15% improvement
+        has_intervention = (
+            (profiles['follow_up'] == 'Yes').to_numpy() &
+            (profiles['pp_meeting'] != 'Not relevant').to_numpy()
+        )
+        
+        # Generate assessment scores for each subject
+        for subject_num in range(1, 4):  # subjects 1, 2, 3
             
-            # Define grade distributions by risk level (research-backed)
-            grade_params = {
-                'low_risk': {'mean': 75, 'std': 12},      # Good performance
-                'medium_risk': {'mean': 60, 'std': 15},   # Average performance
-                'high_risk': {'mean': 45, 'std': 18},     # Poor performance
-                'critical_risk': {'mean': 30, 'std': 20}  # Very poor performance
-            }
+            # Assign subject code based on course
+            profiles[f'subject_{subject_num}'] = self.typed(f'subject_{subject_num}', self.assign_subjects(profiles['course']))
+            
+            # Subject 1 typically lowest (foundational filter)
+            base_mean = grade_mean - 5 if subject_num == 1 else grade_mean
+            assess_1 = np.clip(self.rng.normal(base_mean, grade_std), 0, 100)
+            
+            # Assessment 2: Slight improvement if intervention
+            intervention_effect = np.where(has_intervention, self.rng.uniform(5, 15, n), 0)
+            assess_2 = assess_1 + intervention_effect/2 + self.rng.normal(0, 8, n)
+            assess_2 = np.clip(assess_2, 0, 100)
             
-            params = grade_params[risk_level]
+            # Unsubmitted assessments are left blank
+            profiles[f'subject_{subject_num}_assess_1'] = self.typed(
+                f'subject_{subject_num}_assess_1', np.where(submitted_1, np.round(assess_1, 2), np.nan)
+            )
+            profiles[f'subject_{subject_num}_assess_2'] = self.typed(
+                f'subject_{subject_num}_assess_2', np.where(submitted_2, np.round(assess_2, 2), np.nan)
+            )
             
-            # Generate assessment scores for each subject
-            for subject_num in range(1, 4):  # subjects 1, 2, 3
-                
-                # Assign subject code based on course
-                profile[f'subject_{subject_num}'] = self.assign_subject_for_course(profile['course'], subject_num)
-                
-                # Generate assessments based on submission pattern
-                if submission_pattern == 'none_submitted':
-                    # Student submitted neither assessment
-                    profile[f'subject_{subject_num}_assess_1'] = None
-                    profile[f'subject_{subject_num}_assess_2'] = None
-                    
-                elif submission_pattern == 'assess1_only':
-                    # Student submitted only assessment 1
-                    if subject_num == 1:
-                        # Subject 1 typically lowest (foundational filter)
-                        base_mean = params['mean'] - 5
-                    else:
-                        base_mean = params['mean']
-                        
-                    assess_1 = np.random.normal(base_mean, params['std'])
-                    assess_1 = np.clip(assess_1, 0, 100)
-                    
-                    profile[f'subject_{subject_num}_assess_1'] = round(assess_1, 2)
-                    profile[f'subject_{subject_num}_assess_2'] = None
-                    
-                else:  # both_submitted
-                    # Student submitted both assessments
-                    if subject_num == 1:
-                        # Subject 1 typically lowest (foundational filter)
-                        base_mean = params['mean'] - 5
-                    else:
-                        base_mean = params['mean']
-                        
-                    assess_1 = np.random.normal(base_mean, params['std'])
-                    assess_1 = np.clip(assess_1, 0, 100)
-                    
-                    # Subsequent assessments show patterns based on intervention
-                    intervention_effect = 0
-                    if profile['follow_up'] == 'Yes' and profile['pp_meeting'] != 'Not relevant':
-                        # Students with intervention show 5-15% improvement
-                        intervention_effect = np.random.uniform(5, 15)
-                    
-                    # Assessment 2: Slight improvement if intervention
-                    assess_2 = assess_1 + intervention_effect/2 + np.random.normal(0, 8)
-                    assess_2 = np.clip(assess_2, 0, 100)
-                    
-                    profile[f'subject_{subject_num}_assess_1'] = round(assess_1, 2)
-                    profile[f'subject_{subject_num}_assess_2'] = round(assess_2, 2)
-                
-                # Leave assessments 3 and 4 as None for mid-semester prediction
-                profile[f'subject_{subject_num}_assess_3'] = None
-                profile[f'subject_{subject_num}_assess_4'] = None
-        
-        print("✓ Generated academic performance data with realistic submission patterns (mid-semester)")
+            # Leave assessments 3 and 4 as None for mid-semester prediction
+            profiles[f'subject_{subject_num}_assess_3'] = self.typed(f'subject_{subject_num}_assess_3', np.full(n, np.nan))
+            profiles[f'subject_{subject_num}_assess_4'] = self.typed(f'subject_{subject_num}_assess_4', np.full(n, np.nan))
+        
+        logger.info("✓ Generated academic performance data with realistic submission patterns (mid-semester)")
         return profiles
         
     def generate_attendance_patterns(self, profiles):
         """Generate attendance patterns correlated with risk levels"""
         
-        for profile in profiles:
-            risk_level = profile['risk_level']
-            
-            # Attendance distributions by risk level (research-backed)
-            attendance_params = {
-                'low_risk': {'mean': 90, 'std': 8},       # 85-95% average
-                'medium_risk': {'mean': 77, 'std': 10},   # 70-85% average
-                'high_risk': {'mean': 60, 'std': 12},     # 50-70% average
-                'critical_risk': {'mean': 35, 'std': 15}  # <50% average
-            }
-            
-            params = attendance_params[risk_level]
-            
-            # Attendance_1 is most critical (first 3 weeks rule)
-            attendance_1 = np.random.normal(params['mean'], params['std'])
-            attendance_1 = np.clip(attendance_1, 0, 100)
-            
-            # Attendance patterns show decline for high-risk students
-            decline_factor = {
-                'low_risk': 0.98,      # Slight decline
-                'medium_risk': 0.95,   # Moderate decline
-                'high_risk': 0.90,     # Significant decline
-                'critical_risk': 0.85  # Major decline
-            }
-            
-            # Attendance 2: Shows decline pattern
-            attendance_2 = attendance_1 * decline_factor[risk_level] + np.random.normal(0, 5)
-            attendance_2 = np.clip(attendance_2, 0, 100)
-            
-            # Attendance 3: Further decline
-            attendance_3 = attendance_2 * decline_factor[risk_level] + np.random.normal(0, 6)
-            attendance_3 = np.clip(attendance_3, 0, 100)
-            
-            # Store attendance
-            profile['attendance_1'] = int(round(attendance_1))
-            profile['attendance_2'] = int(round(attendance_2))
-            profile['attendance_3'] = int(round(attendance_3))
+        codes = risk_codes(profiles['risk_level'])
+        n = len(profiles)
+        
+        mean = per_risk({k: v['mean'] for k, v in self.attendance_params.items()}, codes)
+        std = per_risk({k: v['std'] for k, v in self.attendance_params.items()}, codes)
+        decline = per_risk(self.decline_factor, codes)
+        
+        # Attendance_1 is most critical (first 3 weeks rule)
+        attendance_1 = np.clip(self.rng.normal(mean, std), 0, 100)
         
-        print("✓ Generated attendance patterns with risk-based correlations")
+        # Attendance 2: Shows decline pattern
+        attendance_2 = np.clip(attendance_1 * decline + self.rng.normal(0, 5, n), 0, 100)
+        
+        # Attendance 3: Further decline
+        attendance_3 = np.clip(attendance_2 * decline + self.rng.normal(0, 6, n), 0, 100)
+        
+        # Store attendance
+        profiles['attendance_1'] = self.typed('attendance_1', np.rint(attendance_1))
+        profiles['attendance_2'] = self.typed('attendance_2', np.rint(attendance_2))
+        profiles['attendance_3'] = self.typed('attendance_3', np.rint(attendance_3))
+        
+        logger.info("✓ Generated attendance patterns with risk-based correlations")
         return profiles
         
     def generate_behavioral_indicators(self, profiles):
         """Generate behavioral indicators and platform issues"""
         
-        for profile in profiles:
-            risk_level = profile['risk_level']
-            
-            # Platform access issues probability by risk level
-            access_prob = {
-                'low_risk': 0.25,      # 25% have access issues
-                'medium_risk': 0.35,   # 35% have access issues  
-                'high_risk': 0.50,     # 50% have access issues
-                'critical_risk': 0.70  # 70% have access issues
-            }
-            
-            # Generate learn_jcu_issues for each subject
-            for subject_num in range(1, 4):
-                if np.random.random() < access_prob[risk_level]:
-                    profile[f'learn_jcu_issues_{subject_num}'] = 'No Access'
-                else:
-                    profile[f'learn_jcu_issues_{subject_num}'] = 'Access'
-            
-            # Lecturer referral patterns based on performance and attendance
-            referral_categories = ['Attendance', 'Non Submission', 'Concern for Welfare']
-            
-            for subject_num in range(1, 4):
-                attendance = profile[f'attendance_{subject_num}']
-                assessment_score = profile[f'subject_{subject_num}_assess_1']
-                
-                # Determine referral type based on patterns
-                if attendance < 50:
-                    referral_type = 'Attendance'
-                elif assessment_score is None or assessment_score < 30:
-                    referral_type = 'Non Submission'
-                elif risk_level in ['high_risk', 'critical_risk']:
-                    referral_type = 'Concern for Welfare'
-                else:
-                    referral_type = np.random.choice(referral_categories)
-                
-                profile[f'lecturer_referral_{subject_num}'] = referral_type
+        codes = risk_codes(profiles['risk_level'])
+        n = len(profiles)
+        
+        # Generate learn_jcu_issues for each subject
+        access_prob = per_risk(self.access_prob, codes)
+        for subject_num in range(1, 4):
+            no_access = self.rng.random(n) < access_prob
+            profiles[f'learn_jcu_issues_{subject_num}'] = self.typed(
+                f'learn_jcu_issues_{subject_num}', np.where(no_access, 'No Access', 'Access').astype(object)
+            )
         
-        print("✓ Generated behavioral indicators and platform issues")
+        # Lecturer referral patterns based on performance and attendance
+        referral_categories = np.array(['Attendance', 'Non Submission', 'Concern for Welfare'], dtype=object)
+        elevated_risk = codes >= RISK_LEVELS.index('high_risk')
+        
+        for subject_num in range(1, 4):
+            attendance = profiles[f'attendance_{subject_num}'].to_numpy()
+            assessment_score = profiles[f'subject_{subject_num}_assess_1'].to_numpy()
+            
+            # Determine referral type based on patterns
+            profiles[f'lecturer_referral_{subject_num}'] = self.typed(f'lecturer_referral_{subject_num}', np.select(
+                [
+                    attendance < 50,
+                    np.isnan(assessment_score) | (assessment_score < 30),
+                    elevated_risk
+                ],
+                ['Attendance', 'Non Submission', 'Concern for Welfare'],
+                default=self.rng.choice(referral_categories, size=n)
+            ).astype(object))
+        
+        logger.info("✓ Generated behavioral indicators and platform issues")
         return profiles
         
     def generate_text_fields(self, profiles):
         """Generate realistic text fields (comments and identified issues)"""
         
-        # Sample comments for different risk levels and situations
-        comments_templates = {
-            'low_risk': [
-                "Week 3. Student performing well. Consistent attendance and engagement.",
-                "Week 5. Good progress on assessments. No concerns identified.",
-                "Week 7. Student maintaining good academic standards.",
-                "Week 8. Strong performance across all subjects. No intervention needed."
-            ],
-            'medium_risk': [
-                "Week 4. Student submitted first assessment late. Offered academic skills support and advised on extension procedures.",
-                "Week 6. Student submitted assessment late. Extension not requested in advance. Advised to submit future requests on time and referred to Academic Skills team.",
-                "Week 5. Low engagement in tutorials. Follow-up email sent with participation expectations and links to recorded sessions.",
-                "Week 7. Missed second assessment. Student contacted and reported feeling overwhelmed. Referred to Academic Support and encouraged to speak with Counsellor."
-            ],
-            'high_risk': [
-                "Week 3. Student enrolled late. Missing foundational content from Weeks 1–2. Provided links to recorded lectures and encouraged to attend tutorials for extra support.",
-                "Week 5. Student absent from multiple classes. Email sent to check in; student replied citing family issues. Offered flexibility and reminded of support services.",
-                "Week 6. Student reported working long hours. Referred to careers support for managing work–study balance.",
-                "Week 7. Student disclosed high stress levels and lack of sleep. Referred to Wellbeing team and reminded of available mental health support."
-            ],
-            'critical_risk': [
-                "Week 2. Student did not attend orientation. Contacted via email with essential course info and Moodle access guide. No response yet.",
-                "Week 3. First contact made. Student reported internet access issues at home. IT support referral provided.",
-                "Week 3 late enrolment. Student finding it difficult to catch up on Weeks 1 and 2. Week 4. Student contacted on lecturer referral. Student has been sick on arrival.",
-                "booked to see a doctor. Week 5. Student contacted for low attendance. Reminded of the importance of attending classes. Week 7. Student contacted for missing submission due date. Referred to Counsellor for check in for wellbeing as the student advised mental health challenges."
-            ]
-        }
-        
-        identified_issues_templates = {
-            'low_risk': ['Academic progression', 'Time management', 'Study skills'],
-            'medium_risk': ['Poor time management', 'Study skills', 'Late enrollment'],
-            'high_risk': ['Mental health', 'Poor time management', 'Late enrollment', 'Financial stress'],
-            'critical_risk': ['Mental health', 'Sickness', 'Death in family', 'Late enrollment', 'Financial stress']
-        }
-        
-        for profile in profiles:
-            risk_level = profile['risk_level']
-            
-            # Generate realistic comments
-            profile['comments'] = np.random.choice(comments_templates[risk_level])
-            
-            # Generate identified issues
-            profile['identified_issues'] = np.random.choice(identified_issues_templates[risk_level])
-        
-        print("✓ Generated realistic text fields")
+        codes = risk_codes(profiles['risk_level'])
+        
+        # Draw each risk level's texts from its own template list
+        profiles['comments'] = self.typed('comments', choice_by_risk(
+            self.rng,
+            {level: dict.fromkeys(templates, 1 / len(templates)) for level, templates in self.comments_templates.items()},
+            codes
+        ))
+        profiles['identified_issues'] = self.typed('identified_issues', choice_by_risk(
+            self.rng,
+            {level: dict.fromkeys(issues, 1 / len(issues)) for level, issues in self.identified_issues_templates.items()},
+            codes
+        ))
+        
+        logger.info("✓ Generated realistic text fields")
         return profiles
         
-    def generate_core_profiles(self):
-        """Generate core student profiles with risk-based distribution"""
+    def generate_core_profiles(self, risk_counts=None, submission_counts=None):
+        """Generate core student profiles with risk-based distribution
         
-        print("=== GENERATING CORE STUDENT PROFILES ===")
+        The optional counts fix the exact number of students per risk level
+        and submission pattern, which is how streamed chunks share one
+        whole-run quota.
+        """
+        
+        logger.info("=== GENERATING CORE STUDENT PROFILES ===")
+        self.stage_key = None
         
         # Step 1: Assign risk levels
-        risk_levels = self.assign_risk_levels()
+        risk_levels = self.run_stage('assign_risk_levels', self.assign_risk_levels, risk_counts)
         
         # Step 2: Generate basic profiles
-        profiles = self.generate_basic_profiles(risk_levels)
+        profiles = self.run_stage('generate_basic_profiles', self.generate_basic_profiles, risk_levels)
         
         # Step 3: Generate support system data
-        profiles = self.generate_support_system_data(profiles)
+        profiles = self.run_stage('generate_support_system_data', self.generate_support_system_data, profiles)
         
         # Step 4: Generate academic performance
-        profiles = self.generate_academic_performance(profiles)
+        profiles = self.run_stage('generate_academic_performance', self.generate_academic_performance,
+                                  profiles, submission_counts)
         
         # Step 5: Generate attendance patterns
-        profiles = self.generate_attendance_patterns(profiles)
+        profiles = self.run_stage('generate_attendance_patterns', self.generate_attendance_patterns, profiles)
         
         # Step 6: Generate behavioral indicators
-        profiles = self.generate_behavioral_indicators(profiles)
+        profiles = self.run_stage('generate_behavioral_indicators', self.generate_behavioral_indicators, profiles)
         
         # Step 7: Generate text fields
-        profiles = self.generate_text_fields(profiles)
+        profiles = self.run_stage('generate_text_fields', self.generate_text_fields, profiles)
         
-        print(f"✓ Generated {len(profiles)} complete core profiles")
+        logger.info(f"✓ Generated {len(profiles)} complete core profiles")
         return profiles
         
-    def validate_data_quality(self, profiles):
-        """Validate data quality and consistency"""
+    def set_parameters(self, **parameters):
+        """Replace generator tables or settings (e.g. follow_up_prob) for a what-if run
+        
+        Category domains are rebuilt, since tables such as the comment
+        templates define them. With a stage cache, only the stages that read
+        a changed parameter, and those downstream, run again.
+        """
+        
+        for name, value in parameters.items():
+            if not hasattr(self, name):
+                raise AttributeError(f"Generator has no parameter '{name}'")
+            setattr(self, name, value)
+        self._category_domains = None
+        
+    def stage_cache_key(self, stage, method, args):
+        """Cache key of a core profile stage about to run
+        
+        Frames and arrays among the arguments are upstream outputs, covered
+        by the upstream key; the random state pins the seed and chunk. The
+        code is the method's source plus that of STAGE_CODE_MODULES, so
+        editing a helper it calls also misses the cache.
+        """
+        
+        params = {name: getattr(self, name) for name in STAGE_PARAMETERS[stage]}
+        options = [arg for arg in args if not isinstance(arg, (pd.DataFrame, np.ndarray))]
+        here = os.path.dirname(os.path.abspath(__file__))
+        modules = code_digest([os.path.join(here, f'{module}.py') for module in STAGE_CODE_MODULES])
+        return stage_key(stage, inspect.getsource(method), modules, params, options, self.stage_key,
+                         self.rng.bit_generator.state)
+        
+    def run_stage(self, stage, method, *args):
+        """Run one pipeline stage between the registered stage hooks
+        
+        Hooks see the stage name and a context with the chunk index and, once
+        the stage is done, the number of rows it produced (or consumed, for
+        stages such as validation that do not return rows) and whether it was
+        served from the stage cache. A cache hit also restores the random
+        state the stage left behind, so downstream stages draw exactly what
+        they would have after running it.
+        """
+        
+        context = {'chunk': self.current_chunk, 'rows': None, 'cached': False}
+        for hook in self.stage_hooks:
+            hook.on_stage_start(stage, context)
+        
+        cache = self.stage_cache if stage in STAGE_PARAMETERS else None
+        cached = None
+        if cache is not None:
+            key = self.stage_cache_key(stage, method, args)
+            cached = cache.get(key)
+        if cached is not None:
+            result, self.rng.bit_generator.state = cached
+            context['cached'] = True
+            logger.info(f"✓ Reused cached {stage} output")
+        else:
+            result = method(*args)
+            if cache is not None:
+                cache.put(key, result, self.rng.bit_generator.state)
+        if cache is not None:
+            self.stage_key = key
         
-        print("=== DATA VALIDATION AND QUALITY CONTROL ===")
+        context['rows'] = len(result) if hasattr(result, '__len__') else len(args[0])
+        for hook in reversed(self.stage_hooks):
+            hook.on_stage_end(stage, context)
+        return result
+        
+    def validate_data_quality(self, profiles, report_path=None):
+        """Validate data quality and consistency
+        
+        The statistics come from a ValidationAccumulator, the same one the
+        streaming and sharded modes merge chunk by chunk. Pass report_path to
+        also write the report as JSON.
+        """
+        
+        logger.info("=== DATA VALIDATION AND QUALITY CONTROL ===")
         
         # Convert to DataFrame for easier analysis
         df = pd.DataFrame(profiles)
         
-        # Validation 1: Check attendance-grade correlation
-        correlation = df['attendance_1'].corr(df['subject_1_assess_1'])
-        print(f"✓ Attendance-grade correlation: {correlation:.3f} (target: ~0.44)")
+        self.validation = ValidationAccumulator().update(df)
+        self.report_validation(report_path)
         
-        # Validation 2: Check risk distribution
-        risk_counts = df['risk_level'].value_counts()
-        print(f"✓ Risk distribution:")
-        for risk, count in risk_counts.items():
-            percentage = (count / len(df)) * 100
-            print(f"  {risk}: {count} ({percentage:.1f}%)")
-            
-        # Validation 3: Check academic status mapping
-        print(f"✓ Academic status by risk level:")
-        status_risk = df.groupby('risk_level')['academic_status'].value_counts()
-        print(status_risk)
-        
-        # Validation 4: Check support system logic
-        high_risk_students = df[df['risk_level'].isin(['high_risk', 'critical_risk'])]
-        support_rate = (high_risk_students['follow_up'] == 'Yes').mean()
-        print(f"✓ High-risk students receiving follow-up: {support_rate:.1%}")
-        
-        # Validation 5: Check assessment progression (mid-semester: only 1-2 available)
-        print(f"✓ Assessment score progression (Subject 1):")
-        print(f"  Assess 1 mean: {df['subject_1_assess_1'].mean():.1f}")
-        print(f"  Assess 2 mean: {df['subject_1_assess_2'].mean():.1f}")
-        print(f"  Assess 3: Not available (mid-semester)")
-        print(f"  Assess 4: Not available (mid-semester)")
-        
-        # Validation 6: Check submission patterns
-        if 'submission_pattern' in df.columns:
-            print(f"✓ Submission pattern validation:")
-            submission_counts = df['submission_pattern'].value_counts()
-            for pattern, count in submission_counts.items():
-                percentage = (count / len(df)) * 100
-                print(f"  {pattern}: {count} ({percentage:.1f}%)")
-            
-            # Validate that non-submitters meet criteria
-            non_submitters = df[df['submission_pattern'] == 'none_submitted']
-            eligible_non_submitters = non_submitters[
-                (non_submitters['student_cohort'].isin(['New', 'First year'])) |
-                (non_submitters['failed_subjects'].notna())
-            ]
-            eligibility_rate = len(eligible_non_submitters) / len(non_submitters) if len(non_submitters) > 0 else 0
-            print(f"  Non-submitters meeting criteria: {len(eligible_non_submitters)}/{len(non_submitters)} ({eligibility_rate:.1%})")
+        return df
         
-        # Validation 7: Check missing data patterns
-        print(f"✓ Missing data patterns:")
-        print(f"  Failed subjects missing: {df['failed_subjects'].isnull().sum()}/{len(df)} ({df['failed_subjects'].isnull().mean():.1%})")
-        print(f"  Study skills missing: {df['study_skills(attended)'].isnull().sum()}/{len(df)} ({df['study_skills(attended)'].isnull().mean():.1%})")
-        print(f"  Referral missing: {df['referral'].isnull().sum()}/{len(df)} ({df['referral'].isnull().mean():.1%})")
+    def report_validation(self, report_path=None):
+        """Print (and optionally save) the accumulated validation report"""
+        
+        report = self.validation.report(self.course_resolution)
+        print_validation_report(report)
+        
+        if report_path:
+            self.validation.write_json(report_path, self.course_resolution)
+            logger.info(f"✓ Validation report written to {report_path}")
+        
+        return report
+        
+    def typed(self, column, values):
+        """Cast a generated column to its student_schema dtype"""
+        return cast_column(column, values, self.category_domains().get(column))
+        
+    def category_domains(self):
+        """Every value the generator can emit for each categorical column
+        
+        Used as the fixed category sets of the generated categoricals, so
+        every chunk (and columnar export) shares one dictionary per column.
+        Cached until the course-subject index changes.
+        """
+        
+        if self._category_domains is not None:
+            return self._category_domains
+        
+        def unique(*value_lists):
+            return [v for v in dict.fromkeys(v for values in value_lists for v in values) if pd.notna(v)]
+        
+        subjects = unique(*self.course_subject_index.values())
+        domains = {
+            'course': unique(self.categorical_values['course'], self.course_subjects, CRITICAL_RISK_COURSES),
+            'student_cohort': unique(self.cohort_weights),
+            'academic_status': unique(*self.academic_status_weights.values()),
+            'failed_subjects': unique(FAILED_SUBJECT_CODES),
+            'study_skills(attended)': unique(self.categorical_values['study_skills(attended)']),
+            'referral': unique(self.categorical_values['referral']),
+            'pp_meeting': unique(self.categorical_values['pp_meeting'], ['Not relevant']),
+            'self_assessment': ['Yes', 'No'],
+            'readiness_assessment_results': ['L/G:9/10 N:5/10 R:8/10'],
+            'follow_up': ['Yes', 'No'],
+            'follow_up_type': unique(self.categorical_values['follow_up_type'], ['No Reply']),
+            'comments': unique(*self.comments_templates.values()),
+            'identified_issues': unique(*self.identified_issues_templates.values()),
+            'risk_level': RISK_LEVELS,
+            'submission_pattern': unique(self.submission_patterns)
+        }
+        for subject_num in range(1, 4):
+            domains[f'subject_{subject_num}'] = subjects
+            domains[f'learn_jcu_issues_{subject_num}'] = unique(self.categorical_values['learn_jcu_issues'])
+            domains[f'lecturer_referral_{subject_num}'] = unique(self.categorical_values['lecturer_referral'])
         
-        # Validation 8: Check assessment submission patterns
-        assess1_missing = df['subject_1_assess_1'].isnull().sum()
-        assess2_missing = df['subject_1_assess_2'].isnull().sum()
-        print(f"  Assessment 1 missing: {assess1_missing}/{len(df)} ({assess1_missing/len(df):.1%})")
-        print(f"  Assessment 2 missing: {assess2_missing}/{len(df)} ({assess2_missing/len(df):.1%})")
+        self._category_domains = domains
+        return domains
         
-        return df
+    def export_columnar(self, df, filename, file_format='parquet', compression=None, writer=None):
+        """Export synthetic data to Parquet or Feather with compact dtypes
+        
+        Pass an open ColumnarWriter (or SplitDatasetWriter) to append a chunk
+        to a streamed file.
+        """
+        
+        df_export = apply_schema(df.reindex(columns=ORIGINAL_COLUMNS), self.category_domains())
+        
+        if writer is None:
+            with ColumnarWriter(filename, file_format, compression) as new_writer:
+                new_writer.write(df_export)
+        else:
+            writer.write(df_export)
+        logger.info(f"✓ Exported {len(df_export)} records to {filename} ({file_format})")
+        
+        return df_export
+        
+    def export_dataset(self, df, filename="synthetic_student_data.csv", file_format='csv', compression=None,
+                       splits=None):
+        """Export synthetic data in the requested format
+        
+        Pass a SplitAssigner as splits to write the train/test files (and any
+        fold manifest) in the same pass; their row counts are kept in
+        self.split_summary.
+        """
+        
+        filename = dataset_path(filename, file_format)
+        if splits is None:
+            if file_format == 'csv':
+                df_export = self.export_to_csv(df, filename)
+            else:
+                df_export = self.export_columnar(df, filename, file_format, compression)
+            if self.binary_cache:
+                with self.open_binary_cache(filename) as cache:
+                    cache.write(df_export)
+            return df_export
+        
+        with SplitDatasetWriter(filename, splits, file_format, compression, self.binary_cache,
+                                self.category_domains()) as writer:
+            if file_format == 'csv':
+                df_export = self.export_to_csv(df, filename, writer=writer)
+            else:
+                df_export = self.export_columnar(df, filename, file_format, writer=writer)
+        self.split_summary = writer.summary()
+        
+        return df_export
+        
+    def open_binary_cache(self, filename):
+        """Binary cache writer mirroring an exported file, with the generator's category domains"""
+        return BinaryCacheWriter(binary_cache_path(filename), self.category_domains(), source=filename)
         
-    def export_to_csv(self, df, filename="synthetic_student_data.csv"):
-        """Export synthetic data to CSV matching original format"""
-        
-        print("=== EXPORTING SYNTHETIC DATASET ===")
-        
-        # Remove internal columns (risk_level and submission_pattern)
-        columns_to_drop = ['risk_level']
-        if 'submission_pattern' in df.columns:
-            columns_to_drop.append('submission_pattern')
-        df_export = df.drop(columns_to_drop, axis=1)
-        
-        # Reorder columns to match original dataset
-        original_columns = [
-            'student_id', 'course', 'student_cohort', 'academic_status', 'failed_subjects',
-            'study_skills(attended)', 'referral', 'pp_meeting', 'self_assessment',
-            'readiness_assessment_results', 'follow_up', 'follow_up_type',
-            'subject_1', 'subject_1_assess_1', 'subject_1_assess_2', 'subject_1_assess_3', 'subject_1_assess_4',
-            'attendance_1', 'learn_jcu_issues_1', 'lecturer_referral_1',
-            'subject_2', 'subject_2_assess_1', 'subject_2_assess_2', 'subject_2_assess_3', 'subject_2_assess_4',
-            'attendance_2', 'learn_jcu_issues_2', 'lecturer_referral_2',
-            'subject_3', 'subject_3_assess_1', 'subject_3_assess_2', 'subject_3_assess_3', 'subject_3_assess_4',
-            'attendance_3', 'learn_jcu_issues_3', 'lecturer_referral_3',
-            'comments', 'identified_issues'
-        ]
+    def export_to_csv(self, df, filename="synthetic_student_data.csv", append=False, writer=None):
+        """Export synthetic data to CSV matching original format
         
+        With append=True the rows are added to an existing file without a
+        header, which is how streamed chunks are written. Pass an open writer
+        (e.g. a SplitDatasetWriter) to hand the rows to it instead.
+        """
+        
+        logger.info("=== EXPORTING SYNTHETIC DATASET ===")
+        
+        
+        # Remove internal columns (risk_level and submission_pattern) and
+        # reorder to match original dataset in a single copy
         # Note: Original has 'subject_4_assess_4' instead of 'subject_3_assess_4' - keeping original format
-        df_export = df_export.reindex(columns=original_columns)
+        df_export = df.reindex(columns=ORIGINAL_COLUMNS)
         
         # Export to CSV
-        df_export.to_csv(filename, index=False)
-        print(f"✓ Exported {len(df_export)} records to {filename}")
-        print(f"✓ Dataset shape: {df_export.shape}")
+        if writer is None:
+            text_frame(df_export).to_csv(filename, index=False, mode='a' if append else 'w', header=not append)
+        else:
+            writer.write(df_export)
+        logger.info(f"✓ Exported {len(df_export)} records to {filename}")
+        logger.info(f"✓ Dataset shape: {df_export.shape}")
         
         return df_export
         
-    def generate_full_dataset(self, n_students=2000):
-        """Generate complete synthetic dataset with validation"""
+    def plan_chunks(self, n_students, chunk_size):
+        """Split the whole-run quotas into per-chunk counts
+        
+        Risk-level and submission-pattern quotas are fixed for the whole run
+        and split across chunks without replacement, so the totals are exact
+        regardless of chunk_size. The plan depends only on random_state and
+        chunk_size, never on how the chunks are executed.
+        """
+        
+        planner = np.random.default_rng(np.random.SeedSequence(self.random_state, spawn_key=(0,)))
+        risk_remaining = self.risk_level_counts(n_students)
+        pattern_remaining = self.submission_pattern_counts(n_students)
+        
+        for index, start in enumerate(range(0, n_students, chunk_size)):
+            size = min(chunk_size, n_students - start)
+            yield {
+                'index': index,
+                'start': start,
+                'risk_counts': split_quota(planner, risk_remaining, size),
+                'submission_counts': split_quota(planner, pattern_remaining, size)
+            }
+            
+    def generate_chunk(self, plan):
+        """Generate one planned chunk from its own derived random stream"""
+        
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.random_state, spawn_key=(1, plan['index'])))
+        self.current_chunk = plan['index']
+        self.id_offset = plan['start']
+        return self.generate_core_profiles(plan['risk_counts'], plan['submission_counts'])
+        
+    def generate_profile_chunks(self, n_students, chunk_size, workers=1):
+        """Yield (profiles, validation) per chunk, in plan order
+        
+        With workers > 1 the chunks are generated as shards in a process pool,
+        each validated by its worker. Every chunk has its own seed, so the
+        output is identical for any number of workers.
+        """
+        
+        plans = self.plan_chunks(n_students, chunk_size)
+        
+        if workers <= 1:
+            for plan in plans:
+                profiles = self.generate_chunk(plan)
+                yield profiles, self.run_stage('validate_chunk', ValidationAccumulator().update, profiles)
+            self.current_chunk = None
+            self.id_offset = 0
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker, initargs=(self,)) as pool:
+            # Keep a bounded window of shards in flight to cap memory
+            pending = deque()
+            for plan in plans:
+                pending.append(pool.submit(_generate_shard, plan))
+                if len(pending) >= 2 * workers:
+                    yield self.collect_shard(pending.popleft().result())
+            while pending:
+                yield self.collect_shard(pending.popleft().result())
+            
+    def collect_shard(self, result):
+        """Hand a shard's hook records to the local hooks and return its output"""
+        
+        profiles, validation, hook_records = result
+        for hook, records in zip(self.stage_hooks, hook_records):
+            if records is not None:
+                hook.absorb(records)
+        return profiles, validation
+            
+    def stream_full_dataset(self, n_students, chunk_size=100000, filename="synthetic_student_data.csv", workers=1,
+                            file_format='csv', compression=None, report_path=None, splits=None):
+        """Generate the dataset in fixed-size chunks appended to the output file
+        
+        Only a bounded number of chunks is held in memory at a time. Each
+        chunk's validation statistics are merged into one accumulator, and
+        the resulting report for the whole run is returned. With splits (a
+        SplitAssigner) each chunk is also routed to the train/test files.
+        """
+        
+        filename = dataset_path(filename, file_format)
+        if splits is not None:
+            writer = SplitDatasetWriter(filename, splits, file_format, compression, self.binary_cache,
+                                        self.category_domains())
+        elif file_format != 'csv':
+            writer = ColumnarWriter(filename, file_format, compression)
+        else:
+            writer = None
+        cache = self.open_binary_cache(filename) if self.binary_cache and splits is None else None
+        logger.info(f"=== STREAMING FULL SYNTHETIC DATASET ({n_students} students, chunks of {chunk_size}, {workers} worker(s)) ===")
+        
+        self.n_students = n_students
+        self.validation = ValidationAccumulator()
         
-        print(f"=== GENERATING FULL SYNTHETIC DATASET ({n_students} students) ===")
+        try:
+            for i, (profiles, validation) in enumerate(self.generate_profile_chunks(n_students, chunk_size, workers)):
+                if file_format == 'csv':
+                    df_export = self.run_stage('export_chunk', self.export_to_csv, profiles, filename, i > 0, writer)
+                else:
+                    df_export = self.run_stage('export_chunk', self.export_columnar, profiles, filename, file_format,
+                                               None, writer)
+                if cache is not None:
+                    cache.write(df_export)
+                self.validation.merge(validation)
+        finally:
+            if writer is not None:
+                writer.close()
+            if cache is not None:
+                cache.close()
+        
+        if splits is not None:
+            self.split_summary = writer.summary()
+        logger.info(f"✓ Streamed {self.validation.rows} records to {filename}")
+        logger.info("=== DATA VALIDATION AND QUALITY CONTROL ===")
+        return self.report_validation(report_path)
+        
+    def generate_full_dataset(self, n_students=2000, chunk_size=None, workers=1, file_format='csv', compression=None,
+                              report_path=None, splits=None):
+        """Generate complete synthetic dataset with validation
+        
+        Passing chunk_size switches to streaming mode (see stream_full_dataset),
+        which keeps memory flat and returns the validation report instead of a
+        DataFrame. file_format is one of 'csv', 'parquet' or 'feather'. splits
+        (a SplitAssigner) writes the train/test files in the same pass.
+        """
+        
+        if chunk_size:
+            return self.stream_full_dataset(n_students, chunk_size, workers=workers, file_format=file_format,
+                                            compression=compression, report_path=report_path, splits=splits)
+        
+        logger.info(f"=== GENERATING FULL SYNTHETIC DATASET ({n_students} students) ===")
         
         # Update number of students
         self.n_students = n_students
+        self.id_offset = 0
         
         # Generate profiles
         profiles = self.generate_core_profiles()
         
         # Validate data quality
-        df = self.validate_data_quality(profiles)
+        df = self.run_stage('validate_data_quality', self.validate_data_quality, profiles, report_path)
         
-        # Export to CSV
-        df_export = self.export_to_csv(df)
+        # Export to CSV (or the requested columnar format)
+        df_export = self.run_stage('export_dataset', self.export_dataset, df, "synthetic_student_data.csv",
+                                   file_format, compression, splits)
         
         return df_export
 
+# Generator held by each shard worker process
+_shard_generator = None
+
+def _init_shard_worker(generator):
+    """Keep one generator per worker process and quieten its stage logging"""
+    global _shard_generator
+    _shard_generator = generator
+    logger.setLevel(logging.WARNING)
+
+def _generate_shard(plan):
+    """Generate and validate one shard, draining hook records to ship back"""
+    profiles = _shard_generator.generate_chunk(plan)
+    validation = _shard_generator.run_stage('validate_chunk', ValidationAccumulator().update, profiles)
+    hook_records = [hook.drain() if hasattr(hook, 'drain') else None for hook in _shard_generator.stage_hooks]
+    return profiles, validation, hook_records
+
 if __name__ == "__main__":
     # Test with small sample first
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    
     print("=== TESTING WITH SMALL SAMPLE ===")
     generator = SyntheticStudentDataGenerator(n_students=100)
     df_test = generator.generate_full_dataset(n_students=100)
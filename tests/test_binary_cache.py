@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+
+from binary_cache import BinaryCache, binary_cache_path, build_binary_cache, fresh_binary_cache
+from columnar_export import read_dataset
+
+
+def write_source(path):
+    pd.DataFrame({
+        'student_id': [10001, 10002, 10003],
+        'course': ['Bachelor of Business', 'Master of Data Science', 'Bachelor of Business'],
+        'attendance_1': [20, 85, 100],
+    }).to_csv(path, index=False)
+
+
+def edit_in_place(path):
+    """Same-size content change that keeps the modification time"""
+    stat = os.stat(path)
+    data = open(path, 'rb').read().replace(b'10002', b'10009')
+    with open(path, 'r+b') as f:
+        f.write(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_cache_is_used_while_source_is_unchanged(tmp_path):
+    source = str(tmp_path / 'students.csv')
+    write_source(source)
+    build_binary_cache(source)
+
+    cache = fresh_binary_cache(source)
+    assert cache is not None
+    assert read_dataset(source)['student_id'].tolist() == [10001, 10002, 10003]
+
+
+def test_content_change_invalidates_cache(tmp_path):
+    source = str(tmp_path / 'students.csv')
+    write_source(source)
+    build_binary_cache(source)
+
+    edit_in_place(source)
+    assert fresh_binary_cache(source) is None
+    assert read_dataset(source)['student_id'].tolist() == [10001, 10009, 10003]
+
+
+def test_touch_keeps_cache_and_refreshes_stamp(tmp_path):
+    source = str(tmp_path / 'students.csv')
+    write_source(source)
+    build_binary_cache(source)
+    old_stamp = BinaryCache(binary_cache_path(source)).manifest['source']
+
+    os.utime(source, ns=(0, 10**18))
+    assert fresh_binary_cache(source) is not None
+    new_stamp = BinaryCache(binary_cache_path(source)).manifest['source']
+    assert new_stamp['mtime_ns'] == 10**18
+    assert new_stamp['sha256'] == old_stamp['sha256']
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_splits import SplitAssigner, SplitDatasetWriter
+
+STATUSES = ['Good Standing', 'Academic Caution', 'At Risk', 'Excluded']
+
+
+def students(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'student_id': rng.permutation(np.arange(10000, 10000 + n)),
+        'academic_status': rng.choice(STATUSES, n, p=[0.6, 0.2, 0.15, 0.05]),
+        'attendance_1': rng.integers(0, 101, n),
+    })
+
+
+def assign_in_chunks(assigner, df, chunk_size):
+    parts = [assigner.assign(df.iloc[start:start + chunk_size]) for start in range(0, len(df), chunk_size)]
+    return np.concatenate([train for train, _ in parts]), np.concatenate([folds for _, folds in parts])
+
+
+@pytest.mark.parametrize('strategy', ['positional', 'stratified'])
+def test_folds_partition_the_training_rows_only(strategy):
+    df = students(1003)
+    train, folds = assign_in_chunks(SplitAssigner(len(df), 0.8, strategy, n_folds=5), df, 1003)
+
+    assert (folds[~train] == -1).all()
+    assert set(folds[train]) == set(range(5))
+    sizes = np.bincount(folds[train])
+    assert sizes.max() - sizes.min() <= (1 if strategy == 'positional' else len(STATUSES))
+    assert train.sum() == pytest.approx(0.8 * len(df), abs=len(STATUSES))
+
+
+@pytest.mark.parametrize('strategy', ['positional', 'stratified'])
+def test_chunked_assignment_matches_one_pass(strategy):
+    df = students(1000)
+    whole = assign_in_chunks(SplitAssigner(len(df), 0.8, strategy, n_folds=4), df, len(df))
+    chunked = assign_in_chunks(SplitAssigner(len(df), 0.8, strategy, n_folds=4), df, 137)
+
+    assert np.array_equal(whole[0], chunked[0])
+    assert np.array_equal(whole[1], chunked[1])
+
+
+def test_stratified_split_keeps_each_status_share():
+    df = students(2000)
+    train, _ = assign_in_chunks(SplitAssigner(len(df), 0.8, 'stratified'), df, 300)
+
+    for status in STATUSES:
+        stratum = (df['academic_status'] == status).to_numpy()
+        assert train[stratum].sum() == int(stratum.sum() * 0.8)
+
+
+def test_written_splits_are_disjoint_and_cover_the_dataset(tmp_path):
+    df = students(1000)
+    filename = str(tmp_path / 'students.csv')
+    with SplitDatasetWriter(filename, SplitAssigner(len(df), 0.8, 'stratified', n_folds=5)) as writer:
+        for start in range(0, len(df), 300):
+            writer.write(df.iloc[start:start + 300])
+
+    main = pd.read_csv(filename)
+    train = pd.read_csv(tmp_path / 'students_train.csv')
+    test = pd.read_csv(tmp_path / 'students_test.csv')
+    folds = pd.read_csv(tmp_path / 'students_folds.csv')
+
+    assert main.equals(df)
+    assert set(train['student_id']).isdisjoint(test['student_id'])
+    assert sorted(pd.concat([train, test])['student_id']) == sorted(df['student_id'])
+    assert set(folds.loc[folds['split'] == 'train', 'student_id']) == set(train['student_id'])
+    assert folds.loc[folds['split'] == 'test', 'fold'].isna().all()
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from event_stream import EVENT_TYPES, StudentEventStream, merge_sorted_runs
+from synthetic_data_generator import SyntheticStudentDataGenerator
+
+
+def test_merge_sorted_runs_is_sorted_and_bounded():
+    rng = np.random.default_rng(0)
+    runs = [np.sort(rng.integers(0, 10**6, size)) for size in (0, 1, 500, 3000, 7000)]
+    batches = list(merge_sorted_runs(runs, lambda values: values, batch_rows=200))
+
+    assert np.array_equal(np.concatenate(batches), np.sort(np.concatenate(runs)))
+    assert max(len(batch) for batch in batches) <= 200 + len(runs)
+
+
+def test_events_are_in_date_order_across_chunks(tmp_path):
+    stream = StudentEventStream(SyntheticStudentDataGenerator(600, 42))
+    stream.write(600, chunk_size=200, filename=str(tmp_path / 'events.csv'))
+    events = pd.read_csv(tmp_path / 'events.csv')
+
+    ordered = pd.DataFrame({
+        'date': pd.to_datetime(events['event_date']),
+        'student_id': events['student_id'],
+        'type': events['event_type'].map(EVENT_TYPES.index),
+    })
+    assert ordered.equals(ordered.sort_values(['date', 'student_id', 'type'], kind='stable'))
+    assert np.array_equal(events['event_id'], np.arange(len(events)))
+
+    # The same events as the chunk-by-chunk stream, which is not in date order
+    chunked = pd.concat(stream.iter_events(600, chunk_size=200), ignore_index=True)
+    assert len(chunked) == len(events)
+    assert chunked['event_date'].astype(str).tolist() != events['event_date'].tolist()
+    assert_frame_equal(event_rows(chunked), event_rows(events))
+
+
+def event_rows(events):
+    """Events as plain comparable values, in a fixed order"""
+    rows = pd.DataFrame({
+        'student_id': events['student_id'].astype('int64'),
+        'event_date': events['event_date'].astype(str),
+        'event_type': events['event_type'].astype(str),
+        'subject': events['subject'].astype('int64'),
+        'value': events['value'].astype('float64').round(2),
+        'detail': events['detail'].astype(object).fillna('').astype(str),
+    })
+    return rows.sort_values(list(rows.columns)).reset_index(drop=True)
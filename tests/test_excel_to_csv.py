@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'file_converter'))
+from excel_to_csv import convert_excel_to_csv
+
+WORKBOOK = Path(__file__).resolve().parent.parent / 'student_data.xlsx'
+
+
+def test_stream_and_parse_paths_write_identical_csv(tmp_path):
+    assert convert_excel_to_csv(str(WORKBOOK), str(tmp_path / 'parsed'))
+    assert convert_excel_to_csv(str(WORKBOOK), str(tmp_path / 'streamed'), stream=True)
+
+    parsed = (tmp_path / 'parsed' / 'student_data.csv').read_bytes()
+    streamed = (tmp_path / 'streamed' / 'student_data.csv').read_bytes()
+    assert streamed == parsed
+    # Integral cells (student_id, attendance) are written without '.0'
+    assert streamed.splitlines()[1].startswith(b'1,')
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from feature_store import FeatureStore
+from student_features import feature_columns
+from student_schema import apply_schema, read_student_csv
+
+
+@pytest.fixture(scope='module')
+def records():
+    return read_student_csv('file_converter/output_csv/student_data.csv').drop_duplicates('student_id')
+
+
+def weekly_deltas(records, rng):
+    """Deltas touching a few columns of some students, plus new students"""
+    base = records.iloc[:500]
+    yield base
+    for week in range(1, 7):
+        students = base.sample(40, random_state=week)
+        delta = pd.DataFrame({'student_id': students['student_id'].to_numpy()})
+        delta[f'attendance_{week % 3 + 1}'] = rng.integers(0, 101, len(delta))
+        delta['subject_1_assess_2'] = np.round(rng.uniform(0, 100, len(delta)), 1)
+        delta['referral'] = records['referral'].dropna().sample(len(delta), replace=True, random_state=week).to_numpy()
+        yield delta
+        if week % 2 == 0:
+            yield records.iloc[500 + 20 * week:520 + 20 * week]
+
+
+def recompute(state):
+    return pd.DataFrame(feature_columns(state), index=state.index)
+
+
+def test_features_as_of_match_a_full_recompute(tmp_path, records):
+    store = FeatureStore(str(tmp_path / 'store'), compact_every=3)
+    state = None
+    expected = {}
+    for week, delta in enumerate(weekly_deltas(records, np.random.default_rng(0))):
+        version = store.ingest(delta, week=week)
+        delta = apply_schema(delta).set_index('student_id')
+        if state is None:
+            state = delta
+        else:
+            state = pd.concat([state, delta.loc[delta.index.difference(state.index)]])
+            existing = delta.index.intersection(state.index)
+            for column in delta.columns:
+                state.loc[existing, column] = delta.loc[existing, column]
+        expected[version] = recompute(state)
+
+    assert len(expected) == 10 and store.base_version == 9
+    reopened = FeatureStore(str(tmp_path / 'store'), compact_every=3)
+    for version, features in expected.items():
+        assert_frame_equal(reopened.features_as_of(version).sort_index(), features.sort_index())
+    assert_frame_equal(reopened.features.sort_index(), expected[10].sort_index())
+
+
+def test_unchanged_delta_adds_no_version_and_history_follows_changes(tmp_path, records):
+    store = FeatureStore(str(tmp_path / 'store'), compact_every=2)
+    store.ingest(records.iloc[:100], week=1)
+    student_id = int(records['student_id'].iloc[0])
+
+    assert store.ingest(records.iloc[:100], week=2) == 1
+    for week, attendance in [(2, 10), (3, 10), (4, 95)]:
+        store.ingest(pd.DataFrame({'student_id': [student_id], 'attendance_1': [attendance]}), week=week)
+
+    history = FeatureStore(str(tmp_path / 'store')).history(student_id)
+    assert history['version'].tolist() == [1, 2, 3]
+    assert history['week'].tolist() == [1, 2, 4]
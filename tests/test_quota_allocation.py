@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from quota_allocation import assign_quota, quota_counts, split_quota
+
+RISK_DISTRIBUTION = {'low_risk': 0.45, 'medium_risk': 0.30, 'high_risk': 0.20, 'critical_risk': 0.05}
+
+
+@pytest.mark.parametrize('n', [0, 1, 7, 1000, 123457])
+def test_quota_counts_sum_to_n(n):
+    counts = quota_counts(n, RISK_DISTRIBUTION)
+    assert sum(counts.values()) == n
+    for category, proportion in RISK_DISTRIBUTION.items():
+        assert abs(counts[category] - proportion * n) < 1
+
+
+def test_split_quota_chunks_reproduce_the_totals():
+    rng = np.random.default_rng(0)
+    totals = quota_counts(10007, RISK_DISTRIBUTION)
+    remaining = dict(totals)
+    drawn = {category: 0 for category in totals}
+    for n in [3000, 3000, 3000, 1007]:
+        counts = split_quota(rng, remaining, n)
+        assert sum(counts.values()) == n
+        for category, count in counts.items():
+            drawn[category] += count
+
+    assert drawn == totals
+    assert all(count == 0 for count in remaining.values())
+
+
+def test_assign_quota_gives_exact_counts_and_respects_eligibility():
+    rng = np.random.default_rng(1)
+    counts = quota_counts(500, RISK_DISTRIBUTION)
+    eligible = {'critical_risk': np.arange(500) < 100}
+    labels = assign_quota(rng, counts, eligible)
+
+    values, found = np.unique(labels.astype(str), return_counts=True)
+    assert dict(zip(values, found.tolist())) == counts
+    assert (np.flatnonzero(labels == 'critical_risk') < 100).all()
+
+
+def test_assign_quota_tops_up_when_too_few_are_eligible():
+    rng = np.random.default_rng(2)
+    labels = assign_quota(rng, {'a': 10, 'b': 90}, {'a': np.arange(100) < 4})
+
+    assert (labels == 'a').sum() == 10
+    assert (labels[:4] == 'a').all()
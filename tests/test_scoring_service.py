@@ -0,0 +1,73 @@
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+
+from scoring_service import DIRECT_FOREST_ROWS, MicroBatcher, RiskScorer, forest_trees, make_handler
+
+
+class FailingScorer:
+    def check_records(self, records):
+        pass
+
+    def score_records(self, records):
+        raise RuntimeError('model exploded')
+
+
+@pytest.fixture
+def failing_server():
+    batcher = MicroBatcher(FailingScorer())
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(batcher))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+
+
+@pytest.mark.parametrize('payload', [{'student_id': 1}, [{'student_id': 1}]])
+def test_unexpected_scoring_error_is_a_json_500(failing_server, payload):
+    connection = http.client.HTTPConnection('127.0.0.1', failing_server, timeout=10)
+    connection.request('POST', '/score', json.dumps(payload))
+    response = connection.getresponse()
+
+    assert response.status == 500
+    assert 'model exploded' in json.loads(response.read())['error']
+
+
+def fitted_scorer(tmp_path, model):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6)).astype(np.float32)
+    y = (X[:, 0] + rng.normal(scale=0.5, size=400) > 0).astype(int)
+    joblib.dump(model.fit(X, y), tmp_path / 'model.pkl')
+    joblib.dump({}, tmp_path / 'pipeline.pkl')
+    return RiskScorer(tmp_path / 'pipeline.pkl', tmp_path / 'model.pkl')
+
+
+@pytest.mark.parametrize('model', [
+    RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0),
+    RandomForestClassifier(n_estimators=25, min_samples_leaf=5, class_weight='balanced', random_state=0),
+    ExtraTreesClassifier(n_estimators=25, random_state=0),
+    GradientBoostingClassifier(n_estimators=10, random_state=0),
+])
+@pytest.mark.parametrize('rows', [1, 17, DIRECT_FOREST_ROWS + 1])
+def test_predict_proba_matches_model_exactly(tmp_path, model, rows):
+    scorer = fitted_scorer(tmp_path, model)
+    features = np.random.default_rng(1).normal(size=(rows, 6)).astype(np.float32)
+
+    assert np.array_equal(scorer.predict_proba(features), scorer.model.predict_proba(features)[:, 1])
+
+
+def test_only_plain_forests_are_walked_directly():
+    class CalibratedForest(RandomForestClassifier):
+        pass
+
+    X, y = np.eye(4, dtype=np.float32), np.array([0, 1, 0, 1])
+    assert forest_trees(RandomForestClassifier(n_estimators=3).fit(X, y)) is not None
+    assert forest_trees(CalibratedForest(n_estimators=3).fit(X, y)) is None
+    assert forest_trees(GradientBoostingClassifier(n_estimators=3).fit(X, y)) is None
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import CountMinTopK, HyperLogLog, KllSketch
+
+
+def shards(values, n):
+    return np.array_split(values, n)
+
+
+@pytest.mark.parametrize('distinct', [50, 5000, 200000])
+def test_hyperloglog_estimate_is_within_the_error(distinct):
+    rng = np.random.default_rng(distinct)
+    values = rng.permutation(np.concatenate([np.arange(distinct), rng.integers(0, distinct, distinct)]))
+    whole = HyperLogLog(0.01).update(values)
+    merged = HyperLogLog(0.01)
+    for shard in shards(values, 7):
+        merged.merge(HyperLogLog(0.01).update(shard))
+
+    assert np.array_equal(merged.registers, whole.registers)
+    assert whole.estimate() == pytest.approx(distinct, rel=4 * whole.relative_error)
+
+
+def test_hyperloglog_ignores_missing_values_and_hashes_categories_by_value():
+    labels = pd.Series(['a', 'b', None, 'c', 'a'] * 100)
+    plain = HyperLogLog().update(labels)
+    categorical = HyperLogLog().update(labels.astype('category'))
+
+    assert np.array_equal(plain.registers, categorical.registers)
+    assert round(plain.estimate()) == 3
+
+
+def test_kll_quantiles_are_within_the_rank_error():
+    values = np.random.default_rng(0).lognormal(size=200000)
+    merged = KllSketch(0.01, seed=1)
+    for seed, shard in enumerate(shards(values, 5)):
+        merged.merge(KllSketch(0.01, seed=seed).update(shard))
+    ordered = np.sort(values)
+
+    assert merged.n == len(values)
+    assert sum(len(level) for level in merged.levels) < len(values) / 20
+    for q in np.linspace(0.01, 0.99, 25):
+        rank = np.searchsorted(ordered, merged.quantile(q), side='right') / len(values)
+        assert abs(rank - q) <= 0.02
+        assert merged.cdf(np.quantile(values, q)) == pytest.approx(q, abs=0.02)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+
+    edges = [0, 0.5, 1, 2, 5, np.inf]
+    exact = pd.Series(pd.cut(values, edges)).value_counts(sort=False).to_numpy()
+    assert np.abs(np.array(merged.bin_counts(edges)) - exact).max() <= 0.02 * len(values)
+
+
+def test_count_min_never_undercounts_and_finds_the_heavy_hitters():
+    rng = np.random.default_rng(0)
+    values = rng.zipf(1.5, 100000)
+    values = values[values < 10**6]
+    sketch = CountMinTopK(0.001, 0.01, top_k=10)
+    for shard in shards(values, 4):
+        sketch.merge(CountMinTopK(0.001, 0.01, top_k=10).update(shard))
+
+    true = pd.Series(values).value_counts()
+    estimates = sketch.estimate(true.index.to_numpy())
+    assert sketch.total == len(values)
+    assert (estimates >= true.to_numpy()).all()
+    assert (estimates <= true.to_numpy() + sketch.max_overcount).all()
+    assert list(sketch.top()) == true.index[:10].tolist()
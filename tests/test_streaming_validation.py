@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming_validation import NUMERIC_COLUMNS, RunningMoments, ValidationAccumulator
+from synthetic_data_generator import SyntheticStudentDataGenerator
+
+
+@pytest.fixture(scope='module')
+def profile_chunks():
+    generator = SyntheticStudentDataGenerator(900, 42)
+    return [profiles for profiles, _ in generator.generate_profile_chunks(900, 300)]
+
+
+def test_merged_shards_report_what_one_pass_does(profile_chunks):
+    whole = ValidationAccumulator().update(pd.concat(profile_chunks, ignore_index=True)).report()
+    shards = [ValidationAccumulator().update(chunk) for chunk in profile_chunks]
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    merged = merged.report()
+
+    numeric, merged_numeric = whole.pop('numeric'), merged.pop('numeric')
+    correlation, merged_correlation = whole.pop('attendance_grade_correlation'), merged.pop('attendance_grade_correlation')
+    assert merged == whole
+    assert merged_correlation == pytest.approx(correlation)
+    for column in NUMERIC_COLUMNS:
+        assert merged_numeric[column] == pytest.approx(numeric[column])
+
+
+def test_running_moments_match_pandas(profile_chunks):
+    values = pd.concat(profile_chunks, ignore_index=True)['attendance_1'].astype(float)
+    moments = RunningMoments()
+    for chunk in np.array_split(values.to_numpy(), 7):
+        moments.update(chunk)
+
+    summary = moments.to_dict()
+    assert summary['count'] == values.count()
+    assert summary['mean'] == pytest.approx(values.mean())
+    assert summary['std'] == pytest.approx(values.std())
+    assert (summary['min'], summary['max']) == (values.min(), values.max())
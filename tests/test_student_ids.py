@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from student_ids import StudentIdAllocator, id_range_for
+from synthetic_data_generator import SyntheticStudentDataGenerator
+
+
+@pytest.mark.parametrize('id_range', [(10000, 10037), (10000, 100000), (1000, 1256)])
+def test_full_range_is_an_exact_permutation(id_range):
+    low, high = id_range
+    ids = StudentIdAllocator(id_range, seed=7).ids(0, high - low)
+
+    assert np.array_equal(np.sort(ids), np.arange(low, high))
+    assert not np.array_equal(ids, np.arange(low, high))
+
+
+def test_chunks_compute_the_same_ids_as_one_pass():
+    allocator = StudentIdAllocator((10000, 100000), seed=3)
+    whole = allocator.ids(0, 20000)
+    starts = range(0, 20000, 1500)
+    chunks = np.concatenate([allocator.ids(start, min(1500, 20000 - start)) for start in starts])
+
+    assert np.array_equal(chunks, whole)
+    assert len(np.unique(whole)) == len(whole)
+    assert whole.min() >= 10000 and whole.max() < 100000
+
+
+def test_ids_depend_on_the_seed_only():
+    def ids(seed):
+        return StudentIdAllocator((10000, 100000), seed).ids(5, 50)
+
+    assert np.array_equal(ids(1), ids(1))
+    assert not np.array_equal(ids(1), ids(2))
+
+
+def test_positions_outside_the_range_are_rejected():
+    allocator = StudentIdAllocator((10000, 10100))
+    allocator.ids(90, 10)
+    with pytest.raises(ValueError):
+        allocator.ids(95, 10)
+    with pytest.raises(ValueError):
+        allocator.ids(-1, 2)
+    with pytest.raises(ValueError):
+        StudentIdAllocator((10000, 10000))
+
+
+def test_id_range_widens_with_the_run():
+    assert id_range_for(1) == (10000, 100000)
+    assert id_range_for(90000) == (10000, 100000)
+    assert id_range_for(90001) == (100000, 1000000)
+    assert id_range_for(900000000) == (100000000, 1000000000)
+    with pytest.raises(ValueError):
+        id_range_for(900000001)
+
+
+@pytest.mark.parametrize('random_state', [42, None])
+def test_generated_chunks_never_repeat_an_id(random_state):
+    generator = SyntheticStudentDataGenerator(2000, random_state)
+    ids = pd.concat([profiles['student_id'] for profiles, _ in generator.generate_profile_chunks(2000, 300)])
+
+    assert len(ids) == 2000
+    assert ids.is_unique
+    assert ids.between(10000, 99999).all()
@@ -0,0 +1,20 @@
+from text_flags import KeywordFlagger
+
+
+def flags_set(text):
+    flagger = KeywordFlagger()
+    return {flag for flag, hit in zip(flagger.flags, flagger.match(text)) if hit}
+
+
+def test_financial_stress_is_not_a_mental_health_flag():
+    assert flags_set('Financial stress') == {'financial_stress_flag'}
+
+
+def test_bare_stress_is_a_mental_health_flag():
+    assert flags_set('Student disclosed high stress levels') == {'mental_health_flag'}
+
+
+def test_rent_matches_whole_word_only():
+    assert flags_set('Behind on rent') == {'financial_stress_flag'}
+    assert flags_set('Rental agreement') == set()
+    assert flags_set('Parent contacted') == set()
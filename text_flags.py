@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Text Flags
+Keyword flags over the free-text comments and identified_issues columns
+(pipeline Steps 4.2 and 6.2). All keywords are compiled into one matcher,
+which runs once per distinct string; rows get their flags by indexing the
+per-string results with category codes.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+TEXT_COLUMNS = ['comments', 'identified_issues']
+
+# Flag name -> case-insensitive keywords (matched at word starts, so
+# 'translat' also finds 'translation')
+FLAG_KEYWORDS = {
+    'digital_literacy_flag': ['digital', 'laptop', 'computer', 'internet', 'it support', 'moodle access', 'no access'],
+    'language_support_flag': ['english', 'translat', 'language', 'interpreter'],
+    'financial_stress_flag': ['financial stress', 'financial', 'pt job', 'part-time job', 'part time job', 'working long hours',
+                              'work–study', 'work-study', 'transport', 'rent'],
+    'mental_health_flag': ['mental health', 'stress', 'anxiety', 'anxious', 'overwhelmed', 'wellbeing', 'counsellor',
+                           'lack of sleep', 'depress'],
+    'health_issue_flag': ['sick', 'doctor', 'illness', 'hospital'],
+    'family_issue_flag': ['family'],
+    'late_enrolment_flag': ['late enrol', 'enrolled late'],
+    'unresponsive_flag': ['unresponsive', 'no response', 'did not respond'],
+}
+
+# Keywords that must also end at a word boundary ('rent' but not 'rental')
+WHOLE_WORD_KEYWORDS = {'rent'}
+
+
+class KeywordFlagger:
+    """One compiled matcher for every flag's keywords, memoized per string
+
+    Keywords are tried longest first and matches do not overlap, so a
+    phrase listed for one flag ('financial stress') is consumed whole rather
+    than also matching a shorter keyword of another flag ('stress').
+    """
+
+    def __init__(self, flag_keywords=None):
+        self.flag_keywords = flag_keywords or FLAG_KEYWORDS
+        self.flags = list(self.flag_keywords)
+        keywords = sorted(((keyword, i) for i, words in enumerate(self.flag_keywords.values()) for keyword in words),
+                          key=lambda item: -len(item[0]))
+        self.keyword_flag = {keyword.lower(): i for keyword, i in keywords}
+        alternatives = [re.escape(keyword) + (r'\b' if keyword.lower() in WHOLE_WORD_KEYWORDS else '')
+                        for keyword, _ in keywords]
+        self.pattern = re.compile(r'\b(?:' + '|'.join(alternatives) + ')', re.IGNORECASE)
+        self.cache = {}
+
+    def match(self, text):
+        """Boolean flag vector for one string, computed at most once"""
+        flags = self.cache.get(text)
+        if flags is None:
+            flags = np.zeros(len(self.flags), dtype=bool)
+            for found in self.pattern.finditer(text):
+                flags[self.keyword_flag[found.group(0).lower()]] = True
+            self.cache[text] = flags
+        return flags
+
+    def flag_values(self, values):
+        """(n, flags) boolean matrix for a column; missing text has no flags"""
+
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            values = pd.Categorical(values)
+            codes, uniques = values.codes, values.categories
+        else:
+            codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        # Extra all-False row for the -1 (missing) code
+        table = np.zeros((len(uniques) + 1, len(self.flags)), dtype=bool)
+        for i, text in enumerate(uniques):
+            table[i] = self.match(str(text))
+        return table[codes]
+
+    def flag_columns(self, df, columns=TEXT_COLUMNS):
+        """Flag name -> boolean array; a flag is set if any text column present in df matches"""
+
+        flags = np.zeros((len(df), len(self.flags)), dtype=bool)
+        for column in columns:
+            if column in df.columns:
+                flags |= self.flag_values(df[column])
+        return {flag: flags[:, i] for i, flag in enumerate(self.flags)}
+
+    def flag_frame(self, df, columns=TEXT_COLUMNS):
+        return pd.DataFrame(self.flag_columns(df, columns), index=df.index)
+
+
+_default_flagger = None
+
+
+def default_flagger():
+    """One memoized matcher shared across calls"""
+    global _default_flagger
+    if _default_flagger is None:
+        _default_flagger = KeywordFlagger()
+    return _default_flagger
+
+
+def text_flag_columns(df, columns=TEXT_COLUMNS):
+    return default_flagger().flag_columns(df, columns)
+
+
+def text_features(df, columns=TEXT_COLUMNS):
+    """Keyword flags for df, one row per student"""
+    return default_flagger().flag_frame(df, columns)